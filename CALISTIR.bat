@@ -29,7 +29,7 @@ echo ========================================
 echo.
 
 REM Scripti calistir
-python instagram_stats.py
+python instagram_stats.py --json
 
 echo.
 echo ========================================
@@ -35,7 +35,7 @@ echo ========================================
 echo.
 
 REM Scripti calistir
-py -3.12 instagram_link_cekici.py
+py -3.12 instagram_link_cekici.py --json
 
 echo.
 echo ========================================
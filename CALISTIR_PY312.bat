@@ -37,7 +37,7 @@ echo ========================================
 echo.
 
 REM Scripti calistir
-py -3.12 instagram_stats.py
+py -3.12 instagram_stats.py --json
 
 echo.
 echo ========================================
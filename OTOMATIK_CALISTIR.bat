@@ -13,7 +13,7 @@ if errorlevel 1 (
 
 REM Scripti calistir ve loglara yaz
 echo [%date% %time%] Instagram istatistik scripti baslatiliyor... >> instagram_auto_log.txt
-python instagram_stats.py >> instagram_auto_log.txt 2>&1
+python instagram_stats.py --json >> instagram_auto_log.txt 2>&1
 
 if errorlevel 1 (
     echo [%date% %time%] HATA: Script basarisiz oldu! >> instagram_auto_log.txt
@@ -0,0 +1,442 @@
+"""
+Instagram Etkileşim Analizi
+Metrik geçmişini (instagram_metrics.db) tek sorguda NumPy dizilerine yükler ve tüm hesapları
+vektörel olarak özetler: etkileşim oranı, gönderi başına büyüme hızı, haftalık kayan ortalama,
+yüzdelikler ve hesap / hafta bazında en iyi gönderiler. Sonuçlar panelin doğrudan okuyacağı
+hazır özetler (rollup) olarak yazılır; panel ham satırlardan her istekte yeniden hesaplamaz.
+
+Tanımlar:
+    etkileşim      = beğeni + yorum + kaydedilme (gönderinin son ölçümü)
+    etkileşim oranı = etkileşim / erişim (erişim yoksa boş)
+    büyüme hızı    = son iki ölçüm arasındaki saatlik etkileşim artışı
+    hafta          = gönderinin paylaşıldığı haftanın pazartesisi
+
+NumPy isteğe bağlıdır (pip install numpy); sadece bu modül kullanır.
+
+Kullanım:
+    python instagram_analytics.py                       # instagram_rollups.json
+    python instagram_analytics.py --since-days 90 --top 10
+    python instagram_analytics.py --db                  # InstagramCreatorRollup / InstagramWeeklyRollup tabloları
+"""
+
+import os
+import json
+import time
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+
+from instagram_metrics_store import METRICS_DB_FILE
+
+ROLLUPS_FILE = os.getenv("INSTAGRAM_ROLLUPS_FILE", "instagram_rollups.json")
+# Hesap ve hafta başına listelenen en iyi gönderi sayısı
+DEFAULT_TOP = 5
+# Haftalık kayan ortalamanın kapsadığı takvim haftası sayısı
+ROLLING_WEEKS = int(os.getenv("INSTAGRAM_ROLLING_WEEKS", "4"))
+PERCENTILES = (0.5, 0.9)
+
+WEEK_SECONDS = 7 * 86400
+# 1970-01-01 perşembe; haftalar pazartesi başlar
+_WEEK_ORIGIN = 3 * 86400
+
+_SQLITE_ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS "InstagramCreatorRollup" (
+    username TEXT PRIMARY KEY,
+    "creatorId" TEXT,
+    posts INTEGER NOT NULL,
+    "totalEngagement" INTEGER NOT NULL,
+    "meanEngagement" REAL NOT NULL,
+    "medianEngagement" REAL NOT NULL,
+    "p90Engagement" REAL NOT NULL,
+    "meanEngagementRate" REAL,
+    "meanVelocity" REAL,
+    "topPosts" TEXT NOT NULL,
+    "fastestPosts" TEXT NOT NULL,
+    "computedAt" TIMESTAMP NOT NULL
+);
+CREATE TABLE IF NOT EXISTS "InstagramWeeklyRollup" (
+    username TEXT NOT NULL,
+    week TEXT NOT NULL,
+    posts INTEGER NOT NULL,
+    "totalEngagement" INTEGER NOT NULL,
+    "meanEngagement" REAL NOT NULL,
+    "rollingMeanEngagement" REAL NOT NULL,
+    "medianEngagement" REAL NOT NULL,
+    "p90Engagement" REAL NOT NULL,
+    "meanEngagementRate" REAL,
+    "topPosts" TEXT NOT NULL,
+    "computedAt" TIMESTAMP NOT NULL,
+    PRIMARY KEY (username, week)
+);
+"""
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise Exception("Analiz için numpy gerekli: pip install numpy")
+    return numpy
+
+
+def load_snapshots(path=METRICS_DB_FILE, since=None):
+    """
+    Metrik geçmişini tek sorguda, gönderi ve ölçüm zamanına göre sıralı sütun dizilerine yükler.
+
+    Gönderilerin paylaşım zamanı yenileme zamanlayıcısının tablosundan ayrıca okunur.
+
+    Args:
+        path: Metrik veritabanı
+        since: Sadece bu zamandan (unix) sonra ölçülen kayıtlar
+
+    Returns:
+        dict: Sütun adı -> NumPy dizisi (shortcode, username, scraped_at, metrikler) ve
+              "taken_at": {shortcode: paylaşım zamanı}
+    """
+    np = _numpy()
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        rows, taken_at = [], {}
+        if "snapshots" in tables:
+            # Gönderi ve zamana göre sıralı gelir; gönderi sınırları NumPy'da komşu karşılaştırmasıyla bulunur
+            sql = "SELECT shortcode, username, scraped_at, likes, comments, saves, plays, reach, impressions FROM snapshots"
+            params = ()
+            if since is not None:
+                sql += " WHERE scraped_at >= ?"
+                params = (since,)
+            rows = conn.execute(sql + " ORDER BY shortcode, scraped_at", params).fetchall()
+        if "refresh_schedule" in tables:
+            taken_at = dict(conn.execute("SELECT shortcode, taken_at FROM refresh_schedule WHERE taken_at IS NOT NULL"))
+    finally:
+        conn.close()
+
+    names = ("shortcode", "username", "scraped_at", "likes", "comments", "saves", "plays", "reach", "impressions")
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+    snapshots = {}
+    for name, values in zip(names, columns):
+        # NULL değerler NaN olur
+        snapshots[name] = np.array(values, dtype=object if name in ("shortcode", "username") else float)
+    snapshots["taken_at"] = taken_at
+    return snapshots
+
+
+def post_metrics(snapshots):
+    """
+    Her gönderinin son ölçümünden etkileşimini, oranını ve büyüme hızını hesaplar.
+
+    Args:
+        snapshots: load_snapshots sonucu (gönderi ve ölçüm zamanına göre sıralı)
+
+    Returns:
+        dict: Gönderi başına sütun dizileri (shortcode, username, taken_at, week, engagement,
+              engagement_rate, velocity, likes, comments, saves, plays)
+    """
+    np = _numpy()
+    shortcode = snapshots["shortcode"]
+    if not len(shortcode):
+        return None
+    boundary = shortcode[1:] != shortcode[:-1]
+    last = np.flatnonzero(np.r_[boundary, True])
+    first = np.flatnonzero(np.r_[True, boundary])
+
+    engagement = np.nan_to_num(snapshots["likes"]) + np.nan_to_num(snapshots["comments"]) + np.nan_to_num(snapshots["saves"])
+    # Son iki ölçüm aynı gönderiye aitse saatlik artış
+    previous = last - 1
+    has_previous = last > first
+    previous[~has_previous] = last[~has_previous]
+    hours = (snapshots["scraped_at"][last] - snapshots["scraped_at"][previous]) / 3600
+    with np.errstate(divide="ignore", invalid="ignore"):
+        velocity = np.where(
+            has_previous & (hours > 0),
+            np.maximum(engagement[last] - engagement[previous], 0) / hours,
+            np.nan,
+        )
+        reach = snapshots["reach"][last]
+        engagement_rate = np.where(reach > 0, engagement[last] / reach, np.nan)
+
+    # Paylaşım zamanı bilinmiyorsa ilk ölçüm zamanı kullanılır
+    shortcodes = shortcode[last]
+    known = snapshots["taken_at"]
+    taken_at = np.array([known.get(code) for code in shortcodes], dtype=float)
+    taken_at = np.where(np.isnan(taken_at), snapshots["scraped_at"][first], taken_at)
+    offset = datetime.now().astimezone().utcoffset().total_seconds()
+    week = np.floor((taken_at + offset + _WEEK_ORIGIN) / WEEK_SECONDS).astype(np.int64)
+
+    return {
+        "shortcode": shortcodes,
+        "username": snapshots["username"][last],
+        "taken_at": taken_at,
+        "week": week,
+        "engagement": engagement[last],
+        "engagement_rate": engagement_rate,
+        "velocity": velocity,
+        "likes": np.nan_to_num(snapshots["likes"][last]),
+        "comments": np.nan_to_num(snapshots["comments"][last]),
+        "saves": np.nan_to_num(snapshots["saves"][last]),
+        "plays": snapshots["plays"][last],
+    }
+
+
+def group_stats(groups, count, values):
+    """
+    Gruplara göre toplam, ortalama ve yüzdelikleri tek sıralamayla hesaplar.
+
+    Args:
+        groups: Her satırın grup numarası (0..count-1)
+        count: Grup sayısı
+        values: Değerler (NaN'lar ortalamaya ve yüzdeliklere katılmaz)
+
+    Returns:
+        dict: "n", "sum", "mean" ve her yüzdelik için dizi (grup başına)
+    """
+    np = _numpy()
+    valid = ~np.isnan(values)
+    groups, values = groups[valid], values[valid]
+    n = np.bincount(groups, minlength=count)
+    total = np.bincount(groups, weights=values, minlength=count)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stats = {"n": n, "sum": total, "mean": np.where(n > 0, total / n, np.nan)}
+
+    ordered = values[np.lexsort((values, groups))]
+    starts = np.cumsum(n) - n
+    for q in PERCENTILES:
+        # Doğrusal ara değer (numpy.percentile ile aynı)
+        position = starts + np.maximum(n - 1, 0) * q
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        if len(ordered):
+            low, high = np.minimum(low, len(ordered) - 1), np.minimum(high, len(ordered) - 1)
+            value = ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+        else:
+            value = np.zeros(count)
+        stats[f"p{int(q * 100)}"] = np.where(n > 0, value, np.nan)
+    return stats
+
+
+def top_n(groups, count, values, n):
+    """
+    Her grubun en yüksek değerli `n` satırının indekslerini döndürür (NaN'lar atlanır).
+
+    Returns:
+        list: Grup başına satır indeksi dizisi (büyükten küçüğe)
+    """
+    np = _numpy()
+    rows = np.flatnonzero(~np.isnan(values))
+    rows = rows[np.lexsort((-values[rows], groups[rows]))]
+    sizes = np.bincount(groups[rows], minlength=count)
+    starts = np.cumsum(sizes) - sizes
+    rank = np.arange(len(rows)) - np.repeat(starts, sizes)
+    keep = rank < n
+    return np.split(rows[keep], np.cumsum(np.minimum(sizes, n))[:-1])
+
+
+def _week_label(week):
+    return (datetime(1970, 1, 1) + timedelta(seconds=int(week) * WEEK_SECONDS - _WEEK_ORIGIN)).date().isoformat()
+
+
+def _number(value, digits=4):
+    return None if value != value else round(float(value), digits)
+
+
+def _post_list(posts, rows, metric):
+    return [
+        {"shortcode": posts["shortcode"][i], metric: _number(posts[metric][i])}
+        for i in rows
+    ]
+
+
+def compute_rollups(posts, top=DEFAULT_TOP, rolling_weeks=ROLLING_WEEKS):
+    """
+    Gönderi metriklerinden hesap ve hafta bazında özetleri hesaplar.
+
+    Haftalık kayan ortalama, son `rolling_weeks` takvim haftasında paylaşılan gönderilerin
+    ortalama etkileşimidir (gönderi paylaşılmayan haftalar da pencereye dahildir).
+
+    Args:
+        posts: post_metrics sonucu
+        top: Hesap / hafta başına en iyi gönderi sayısı
+        rolling_weeks: Kayan ortalamanın hafta sayısı
+
+    Returns:
+        dict: {"creators": [...], "weeks": [...]}
+    """
+    np = _numpy()
+    if posts is None:
+        return {"creators": [], "weeks": []}
+    usernames, user = np.unique(posts["username"].astype(str), return_inverse=True)
+    engagement = posts["engagement"]
+
+    creator_stats = group_stats(user, len(usernames), engagement)
+    creator_rate = group_stats(user, len(usernames), posts["engagement_rate"])
+    creator_velocity = group_stats(user, len(usernames), posts["velocity"])
+    creator_top = top_n(user, len(usernames), engagement, top)
+    creator_fastest = top_n(user, len(usernames), posts["velocity"], top)
+    creators = []
+    for g, username in enumerate(usernames):
+        creators.append({
+            "username": str(username),
+            "posts": int(creator_stats["n"][g]),
+            "total_engagement": int(creator_stats["sum"][g]),
+            "mean_engagement": _number(creator_stats["mean"][g], 2),
+            "median_engagement": _number(creator_stats["p50"][g], 2),
+            "p90_engagement": _number(creator_stats["p90"][g], 2),
+            "mean_engagement_rate": _number(creator_rate["mean"][g]),
+            "mean_velocity": _number(creator_velocity["mean"][g], 2),
+            "top_posts": _post_list(posts, creator_top[g], "engagement"),
+            "fastest_posts": _post_list(posts, creator_fastest[g], "velocity"),
+        })
+
+    # Hesap + hafta anahtarı; pencere başı bir önceki hesabın haftalarına taşmasın diye kaydırılır
+    week = posts["week"] - posts["week"].min() + rolling_weeks
+    span = int(week.max()) + 1
+    keys, weekly = np.unique(user.astype(np.int64) * span + week, return_inverse=True)
+    week_stats = group_stats(weekly, len(keys), engagement)
+    week_rate = group_stats(weekly, len(keys), posts["engagement_rate"])
+    week_top = top_n(weekly, len(keys), engagement, top)
+
+    # Kayan ortalama: takvim penceresinin ilk haftasının yeri ikili aramayla bulunur
+    totals = np.r_[0.0, np.cumsum(week_stats["sum"])]
+    counts = np.r_[0, np.cumsum(week_stats["n"])]
+    start = np.searchsorted(keys, keys - (rolling_weeks - 1), side="left")
+    end = np.arange(1, len(keys) + 1)
+    rolling = (totals[end] - totals[start]) / (counts[end] - counts[start])
+
+    base_week = int(posts["week"].min()) - rolling_weeks
+    weeks = []
+    for g, key in enumerate(keys):
+        weeks.append({
+            "username": str(usernames[key // span]),
+            "week": _week_label(base_week + key % span),
+            "posts": int(week_stats["n"][g]),
+            "total_engagement": int(week_stats["sum"][g]),
+            "mean_engagement": _number(week_stats["mean"][g], 2),
+            "rolling_mean_engagement": _number(rolling[g], 2),
+            "median_engagement": _number(week_stats["p50"][g], 2),
+            "p90_engagement": _number(week_stats["p90"][g], 2),
+            "mean_engagement_rate": _number(week_rate["mean"][g]),
+            "top_posts": _post_list(posts, week_top[g], "engagement"),
+        })
+    return {"creators": creators, "weeks": weeks}
+
+
+def build_rollups(path=METRICS_DB_FILE, since=None, top=DEFAULT_TOP):
+    """
+    Metrik geçmişinden özetleri üretir.
+
+    Returns:
+        dict: {"computed_at", "posts", "creators", "weeks"}
+    """
+    posts = post_metrics(load_snapshots(path, since))
+    rollups = compute_rollups(posts, top)
+    rollups["computed_at"] = datetime.now().isoformat(timespec="seconds")
+    rollups["posts"] = 0 if posts is None else len(posts["shortcode"])
+    return rollups
+
+
+def write_rollups_json(rollups, path=ROLLUPS_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(rollups, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def write_rollups_to_db(rollups, database_url):
+    """
+    Özetleri panelin okuduğu tablolara yazar; tablolar tek işlemde yenilenir.
+
+    PostgreSQL'de tablolar migration_instagram_rollups.sql ile oluşturulur,
+    SQLite'ta (test) yoksa oluşturulur. Hesaplar `ContentCreator` kayıtlarıyla eşleştirilir.
+    """
+    from instagram_db_writer import ContentWriter
+
+    writer = ContentWriter(database_url)
+    try:
+        if writer.dialect == "sqlite":
+            with writer.connection() as conn:
+                conn.executescript(_SQLITE_ROLLUP_SCHEMA)
+            placeholder, json_placeholder = "?", "?"
+        else:
+            placeholder, json_placeholder = "%s", "%s::jsonb"
+        try:
+            creator_ids = {creator["username"].lower(): creator["creator_id"] for creator in writer.instagram_creators()}
+        except Exception as e:
+            print(f"⚠ İçerik üreticileri okunamadı, özetler hesaplara atanmadan yazılıyor: {str(e)[:100]}")
+            creator_ids = {}
+        computed_at = rollups["computed_at"]
+
+        creator_rows = [
+            (c["username"], creator_ids.get(c["username"].lower()), c["posts"], c["total_engagement"],
+             c["mean_engagement"], c["median_engagement"], c["p90_engagement"], c["mean_engagement_rate"],
+             c["mean_velocity"], json.dumps(c["top_posts"]), json.dumps(c["fastest_posts"]), computed_at)
+            for c in rollups["creators"]
+        ]
+        week_rows = [
+            (w["username"], w["week"], w["posts"], w["total_engagement"], w["mean_engagement"],
+             w["rolling_mean_engagement"], w["median_engagement"], w["p90_engagement"],
+             w["mean_engagement_rate"], json.dumps(w["top_posts"]), computed_at)
+            for w in rollups["weeks"]
+        ]
+        values = lambda count, json_columns: ", ".join(
+            json_placeholder if i in json_columns else placeholder for i in range(count)
+        )
+        with writer.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM "InstagramCreatorRollup"')
+            cursor.executemany(
+                'INSERT INTO "InstagramCreatorRollup" (username, "creatorId", posts, "totalEngagement", '
+                '"meanEngagement", "medianEngagement", "p90Engagement", "meanEngagementRate", "meanVelocity", '
+                f'"topPosts", "fastestPosts", "computedAt") VALUES ({values(12, (9, 10))})',
+                creator_rows,
+            )
+            cursor.execute('DELETE FROM "InstagramWeeklyRollup"')
+            cursor.executemany(
+                'INSERT INTO "InstagramWeeklyRollup" (username, week, posts, "totalEngagement", "meanEngagement", '
+                '"rollingMeanEngagement", "medianEngagement", "p90Engagement", "meanEngagementRate", "topPosts", '
+                f'"computedAt") VALUES ({values(11, (9,))})',
+                week_rows,
+            )
+            cursor.close()
+    finally:
+        writer.close()
+    print(f"✓ Veritabanı: {len(creator_rows)} hesap, {len(week_rows)} haftalık özet yazıldı")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Instagram etkileşim analizi ve panel özetleri")
+    parser.add_argument("--since-days", type=int, default=None, help="Sadece son N günde ölçülen kayıtlar")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help=f"Hesap / hafta başına en iyi gönderi sayısı (varsayılan: {DEFAULT_TOP})")
+    parser.add_argument("--output", default=ROLLUPS_FILE, help=f"Özet dosyası (varsayılan: {ROLLUPS_FILE})")
+    parser.add_argument("--db", action="store_true", help="Özetleri InstagramCreatorRollup / InstagramWeeklyRollup tablolarına yaz")
+    parser.add_argument("--database-url", default=None, help="Varsayılan: INSTAGRAM_SYNC_DATABASE_URL veya DATABASE_URL")
+    args = parser.parse_args(argv)
+
+    try:
+        started = time.perf_counter()
+        since = time.time() - args.since_days * 86400 if args.since_days else None
+        rollups = build_rollups(since=since, top=args.top)
+        write_rollups_json(rollups, args.output)
+        elapsed = time.perf_counter() - started
+        print(f"✓ {rollups['posts']} gönderi, {len(rollups['creators'])} hesap, {len(rollups['weeks'])} hafta "
+              f"özetlendi ({elapsed:.2f} sn) -> {args.output}")
+        for creator in rollups["creators"]:
+            rate = creator["mean_engagement_rate"]
+            print(f"  {creator['username']:<24} {creator['posts']:>6} gönderi, ort. etkileşim {creator['mean_engagement']}, "
+                  f"medyan {creator['median_engagement']}, oran {'-' if rate is None else f'%{rate * 100:.2f}'}")
+
+        if args.db:
+            from dotenv import load_dotenv
+            from instagram_db_writer import default_database_url
+            load_dotenv()
+            database_url = args.database_url or default_database_url()
+            if not database_url:
+                raise Exception("DATABASE_URL tanımlı değil!")
+            write_rollups_to_db(rollups, database_url)
+    except Exception as e:
+        print(f"\n✗ HATA: {str(e)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,467 @@
+"""
+Instagram Mikro Benchmark
+Gönderi başına işlem yolunun (shortcode çıkarma, istatistik çıkarma, linkten medya çekme, JSON
+çıktısı) yerel CPU maliyetini ölçer. Instagram'a istek atılmaz: kayıtlı gönderilerden oluşan
+sahte bir client kullanılır. Durum dosyaları (önbellek, yöntem istatistikleri) geçici bir
+klasöre yönlendirilir.
+
+Her aşama için 10, 1.000 ve 100.000 gönderilik gruplarda işlem başına süre (ns/op) ve bellek
+ayırma (bayt/op) raporlanır. Ayrıca her grup boyutunda geriye dönük tarama (sayfa sayfa çekme,
+PostRecord'a çevirme, NDJSON'a yazma) ayrı bir süreçte çalıştırılıp en yüksek RSS ölçülür.
+Sonuçlar kayıtlı bir referansla karşılaştırılır; eşikten fazla yavaşlama veya bellek artışı
+varsa script 1 ile çıkar.
+
+`--startup` ile ağ gerektirmeyen komutların (`instagram_cli.py ... --help`) açılış süresi
+ölçülür; süre bütçeyi (varsayılan 100 ms) aşarsa veya ağır paketler yüklenirse script 1 ile çıkar.
+
+Kullanım:
+    python instagram_benchmark.py                      # ölç ve referansla karşılaştır
+    python instagram_benchmark.py --save-baseline      # mevcut sonuçları referans olarak kaydet
+    python instagram_benchmark.py --sizes 10 1000 --threshold 0.5
+    python instagram_benchmark.py --startup            # açılış süresi kontrolü
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import subprocess
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+
+BASELINE_FILE = "instagram_benchmark_baseline.json"
+DEFAULT_SIZES = (10, 1000, 100000)
+# Bu orandan fazla yavaşlama gerileme sayılır (0.25 = %25)
+DEFAULT_THRESHOLD = float(os.getenv("INSTAGRAM_BENCH_THRESHOLD", "0.25"))
+# Küçük gruplar en az bu süre boyunca tekrarlanır (saniye)
+MIN_TIME = 0.2
+# Bellek ölçümü (tracemalloc yavaş olduğu için) en fazla bu kadar gönderiyle yapılır
+ALLOC_SAMPLE = 10000
+# Geriye dönük tarama ölçümünde sayfa başına gönderi sayısı
+BACKFILL_PAGE_SIZE = 50
+
+# Ağ gerektirmeyen komutların açılış süresi bütçesi (milisaniye)
+STARTUP_BUDGET_MS = float(os.getenv("INSTAGRAM_STARTUP_BUDGET_MS", "100"))
+STARTUP_RUNS = 5
+STARTUP_COMMANDS = (
+    ("--help",),
+    ("stats", "--help"),
+    ("multi", "--help"),
+    ("link", "--help"),
+    ("alternatif", "--help"),
+    ("manuel", "--help"),
+    ("selenium",),
+    ("metrics", "--help"),
+    ("refresh", "--help"),
+    ("delta", "--help"),
+    ("analytics", "--help"),
+    ("captions", "--help"),
+    ("media", "--help"),
+    ("db", "--help"),
+    ("embed", "--help"),
+    ("telemetry", "--help"),
+    ("worker", "--help"),
+)
+# Bu komutlarda yüklenmemesi gereken paketler
+HEAVY_MODULES = ("instagrapi", "pydantic", "requests", "dotenv", "asyncio", "selenium", "psycopg2", "numpy")
+# Komutu çalıştırıp yüklenen ağır paketleri stderr'e yazan alt süreç kodu
+_STARTUP_PROBE = (
+    "import sys\n"
+    "import instagram_cli\n"
+    "try:\n"
+    "    instagram_cli.main(sys.argv[1:])\n"
+    "except SystemExit:\n"
+    "    pass\n"
+    "sys.stderr.write(','.join(m for m in {heavy!r} if m in sys.modules))\n"
+)
+
+# Gerçek hesaptan kaydedilmiş gönderi örnekleri (gönderi başına işlem yolu için gereken alanlar)
+RECORDED_MEDIA = [
+    {
+        "pk": 3521480011352885475, "media_type": 1, "taken_at": 1735121400,
+        "caption_text": "Yeni video yayında! 🎮 Turnuva özeti ve en iyi anlar. #arhaval #espor",
+        "like_count": 1234, "comment_count": 56, "saved_count": None, "play_count": None,
+    },
+    {
+        "pk": 3480219935170713189, "media_type": 2, "taken_at": 1728000000,
+        "caption_text": "Maç sonu röportajı \"kaçırmayın\" link bio'da " * 5,
+        "like_count": 98765, "comment_count": 4321, "saved_count": 812, "play_count": 1500000,
+    },
+    {
+        "pk": 3555000123456789012, "media_type": 8, "taken_at": 1740000000,
+        "caption_text": "",
+        "like_count": 20500, "comment_count": 310, "saved_count": None, "play_count": None,
+    },
+]
+
+
+class RecordedMedia:
+    """
+    instagrapi `Media` objesinin işlem yolunda kullanılan alanları.
+    """
+
+    def __init__(self, pk, code, media_type, taken_at, caption_text, like_count, comment_count, saved_count, play_count):
+        self.pk = pk
+        self.id = f"{pk}_1458236"
+        self.code = code
+        self.media_type = media_type
+        self.taken_at = taken_at
+        self.caption_text = caption_text
+        self.like_count = like_count
+        self.comment_count = comment_count
+        self.saved_count = saved_count
+        self.play_count = play_count
+
+
+class ClientForbiddenError(Exception):
+    """
+    instagrapi'nin HTTP 403 hatasının yerine geçer (insights tespiti hataları adıyla eşleştirir).
+    """
+
+
+class FakeClient:
+    """
+    Kayıtlı gönderileri döndüren sahte instagrapi `Client`.
+
+    `media_insights` kişisel hesaptaki gibi HTTP 403 verir; insights tespiti hesabı desteksiz
+    sayar ve önbellekler.
+    """
+
+    def __init__(self, medias):
+        self.username = "benchmark"
+        self._by_pk = {str(media.pk): media for media in medias}
+        self._by_code = {media.code: media for media in medias}
+
+    def media_info(self, media_pk):
+        return self._by_pk[str(media_pk).split("_")[0]]
+
+    def media_id(self, media_pk):
+        return self._by_pk[str(media_pk)].id
+
+    def media_pk_from_code(self, code):
+        return self._by_code[code].pk
+
+    def media_insights(self, media_pk):
+        raise ClientForbiddenError("Insights desteklenmiyor (benchmark)")
+
+
+def build_medias(count):
+    """
+    Kayıtlı örneklerden benzersiz shortcode'lu `count` gönderi üretir.
+    """
+    medias = []
+    for page in iter_media_pages(count):
+        medias.extend(page)
+    return medias
+
+
+def iter_media_pages(count, page_size=BACKFILL_PAGE_SIZE):
+    """
+    Kayıtlı örneklerden `count` gönderiyi sayfa sayfa üretir (user_medias_paginated gibi).
+    """
+    from instagram_id_cache import pk_to_shortcode
+
+    for start in range(0, count, page_size):
+        page = []
+        for i in range(start, min(start + page_size, count)):
+            record = dict(RECORDED_MEDIA[i % len(RECORDED_MEDIA)])
+            record["pk"] += i
+            page.append(RecordedMedia(code=pk_to_shortcode(record["pk"]), **record))
+        yield page
+
+
+def _backfill_probe(count, work_dir):
+    """
+    Alt süreçte çalışır: geriye dönük taramayı simüle eder ve en yüksek RSS'i (KB) yazdırır.
+    """
+    import resource
+    from instagram_ndjson import NdjsonWriter
+    from instagram_stats import to_records
+
+    def peak_kb():
+        # Linux'ta ru_maxrss fork ile üst süreçten devralınır; VmHWM exec sonrası sıfırlanır
+        try:
+            with open("/proc/self/status", "r", encoding="ascii") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS bayt, Linux KB döndürür
+        return peak // 1024 if sys.platform == "darwin" else peak
+
+    baseline = peak_kb()
+    records = []
+    for page in iter_media_pages(count):
+        records.extend(to_records(page))
+    with NdjsonWriter(os.path.join(work_dir, "backfill.ndjson")) as writer:
+        for record in records:
+            writer.write(record)
+    print(json.dumps({"peak_rss_kb": peak_kb(), "baseline_rss_kb": baseline}))
+
+
+def measure_backfill_rss(count, work_dir):
+    """
+    Geriye dönük taramanın en yüksek RSS'ini ayrı bir süreçte ölçer.
+
+    Returns:
+        dict: {"peak_rss_kb": ..., "bytes_per_post": ...}, platform desteklemiyorsa None
+    """
+    try:
+        import resource  # noqa: F401 (Windows'ta yok)
+    except ImportError:
+        return None
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--backfill-probe", str(count), "--work-dir", work_dir],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, env=os.environ.copy(),
+    )
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        return None
+    probe = json.loads(lines[-1])
+    return {
+        "peak_rss_kb": probe["peak_rss_kb"],
+        "bytes_per_post": round((probe["peak_rss_kb"] - probe["baseline_rss_kb"]) * 1024 / count, 1),
+    }
+
+
+def _stage_functions(medias, work_dir):
+    """
+    Her aşama için (girdi listesi, grubu işleyen fonksiyon) ikilisini döndürür.
+    """
+    from instagram_id_cache import extract_shortcode_from_url
+    from instagram_link_cekici import get_media_from_link
+    from instagram_ndjson import NdjsonWriter, latest_records, write_json
+    from instagram_stats import extract_media_stats
+
+    cl = FakeClient(medias)
+    urls = [f"https://www.instagram.com/p/{media.code}/?igsh=benchmark" for media in medias]
+    stats = [extract_media_stats(cl, media) for media in medias]
+    ndjson_path = os.path.join(work_dir, "benchmark.ndjson")
+    json_path = os.path.join(work_dir, "benchmark.json")
+
+    def json_output(items):
+        with NdjsonWriter(ndjson_path) as writer:
+            for item in items:
+                writer.write(item)
+        header = {"username": "benchmark", "scraped_at": "", "total_posts": len(items), "method": "benchmark"}
+        write_json(json_path, header, latest_records(ndjson_path, "shortcode"))
+
+    return {
+        "extract_shortcode_from_url": (urls, lambda items: [extract_shortcode_from_url(url) for url in items]),
+        "extract_media_stats": (medias, lambda items: [extract_media_stats(cl, media) for media in items]),
+        "get_media_from_link": (urls, lambda items: [get_media_from_link(cl, url, cl.username) for url in items]),
+        "json_output": (stats, json_output),
+    }
+
+
+def _output_errors(outputs):
+    """
+    Aşama çıktılarındaki hata kayıtlarını döndürür (hata veren bir yolu ölçmek anlamsızdır).
+    """
+    errors = []
+    for output in outputs or ():
+        error = output.get("error") if isinstance(output, dict) else getattr(output, "error", None)
+        if error:
+            errors.append(error)
+    return errors
+
+
+def _time_batch(function, items):
+    """
+    Grubu en az MIN_TIME boyunca tekrarlar ve işlem başına nanosaniyeyi döndürür.
+    """
+    operations = 0
+    started = time.perf_counter_ns()
+    while True:
+        function(items)
+        operations += len(items)
+        elapsed = time.perf_counter_ns() - started
+        if elapsed >= MIN_TIME * 1e9:
+            return elapsed / operations
+
+
+def _alloc_batch(function, items):
+    """
+    Grubun işlem başına ayırdığı en yüksek bellek miktarını (bayt) döndürür.
+    """
+    items = items[:ALLOC_SAMPLE]
+    tracemalloc.start()
+    try:
+        function(items)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / len(items)
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, stages=None):
+    """
+    Tüm aşamaları verilen grup boyutlarıyla ölçer.
+
+    Returns:
+        dict: {"aşama/boyut": {"ns_per_op": ..., "bytes_per_op": ..., "errors": hata kaydı sayısı}}
+    """
+    work_dir = tempfile.mkdtemp(prefix="instagram_bench_")
+    # Önbellek ve istatistik dosyaları gerçek çalışma dosyalarını etkilemesin
+    os.environ["INSTAGRAM_ID_CACHE"] = os.path.join(work_dir, "id_cache.db")
+    os.environ["INSTAGRAM_METHOD_STATS"] = os.path.join(work_dir, "method_stats.json")
+    os.environ["INSTAGRAM_CAPABILITIES"] = os.path.join(work_dir, "capabilities.json")
+    os.environ["INSTAGRAM_METRICS_DB"] = os.path.join(work_dir, "metrics.db")
+
+    results = {}
+    try:
+        for size in sizes:
+            medias = build_medias(size)
+            with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+                stages_for_size = _stage_functions(medias, work_dir)
+                for name, (items, function) in stages_for_size.items():
+                    if stages and name not in stages:
+                        continue
+                    # Isınma (import, önbellek, regex derleme) ve çıktı kontrolü
+                    errors = _output_errors(function(items))
+                    ns_per_op = _time_batch(function, items)
+                    bytes_per_op = _alloc_batch(function, items)
+                    results[f"{name}/{size}"] = {"ns_per_op": round(ns_per_op, 1), "bytes_per_op": round(bytes_per_op, 1)}
+                    if errors:
+                        results[f"{name}/{size}"]["errors"] = len(errors)
+                        results[f"{name}/{size}"]["error"] = str(errors[0])[:120]
+            for key in [key for key in results if key.endswith(f"/{size}")]:
+                print(f"{key:<36} {results[key]['ns_per_op']:>14,.0f} ns/op {results[key]['bytes_per_op']:>12,.0f} B/op")
+                if results[key].get("errors"):
+                    print(f"  ✗ {results[key]['errors']} çıktı hata içeriyor: {results[key]['error']}")
+            if not stages or "backfill_rss" in stages:
+                rss = measure_backfill_rss(size, work_dir)
+                if rss is None:
+                    print(f"{'backfill_rss/' + str(size):<36} ⚠ en yüksek RSS bu platformda ölçülemedi")
+                else:
+                    results[f"backfill_rss/{size}"] = rss
+                    print(f"{'backfill_rss/' + str(size):<36} {rss['peak_rss_kb'] / 1024:>11,.1f} MB RSS "
+                          f"{rss['bytes_per_post']:>12,.0f} B/gönderi")
+    finally:
+        # Yöntem istatistikleri zamanlayıcıyla yazılır; kalanlar çalışma dizini silinmeden yazılır
+        from instagram_method_selector import flush_selectors
+        flush_selectors()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def check_startup(budget_ms=STARTUP_BUDGET_MS, runs=STARTUP_RUNS):
+    """
+    Ağ gerektirmeyen CLI komutlarının açılış süresini (yorumlayıcı dahil) ölçer.
+
+    Returns:
+        list: Bütçeyi aşan veya ağır paket yükleyen komutlar [(komut, ms, yüklenen paketler)]
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    code = _STARTUP_PROBE.format(heavy=HEAVY_MODULES)
+    failures = []
+    for command in STARTUP_COMMANDS:
+        timings = []
+        loaded = ""
+        for _ in range(runs):
+            started = time.perf_counter()
+            completed = subprocess.run(
+                [sys.executable, "-c", code, *command],
+                cwd=script_dir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+            )
+            timings.append((time.perf_counter() - started) * 1000)
+            loaded = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else ""
+        median = sorted(timings)[len(timings) // 2]
+        label = " ".join(command)
+        status = "✓" if median <= budget_ms and not loaded else "✗"
+        print(f"{status} {label:<22} {median:>7.1f} ms" + (f"  (yüklenen: {loaded})" if loaded else ""))
+        if status == "✗":
+            failures.append((label, median, loaded))
+    return failures
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Sonuçları referansla karşılaştırır.
+
+    Süre (ns/op) ve geriye dönük taramanın en yüksek RSS'i karşılaştırılır.
+
+    Returns:
+        list: Gerilemeler [(anahtar, ölçüt, referans, yeni)]
+    """
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if not reference:
+            continue
+        for metric in ("ns_per_op", "peak_rss_kb"):
+            if metric in result and metric in reference and result[metric] > reference[metric] * (1 + threshold):
+                regressions.append((key, metric, reference[metric], result[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gönderi başına işlem yolunun mikro benchmark'ı")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Grup boyutları")
+    parser.add_argument("--stage", action="append", help="Sadece bu aşamayı ölç (birden fazla verilebilir)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Referans dosyası")
+    parser.add_argument("--save-baseline", action="store_true", help="Sonuçları referans olarak kaydet")
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD,
+        help="Gerileme eşiği, oran olarak (varsayılan: 0.25 = %%25)"
+    )
+    parser.add_argument("--startup", action="store_true", help="Sadece komutların açılış süresini kontrol et")
+    # measure_backfill_rss'in alt süreci için
+    parser.add_argument("--backfill-probe", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.backfill_probe:
+        _backfill_probe(args.backfill_probe, args.work_dir or tempfile.gettempdir())
+        return 0
+
+    if args.startup:
+        failures = check_startup()
+        if failures:
+            print(f"\n✗ {len(failures)} komut açılış bütçesini ({STARTUP_BUDGET_MS:.0f} ms) aştı veya ağır paket yükledi")
+            return 1
+        print(f"\n✓ Tüm komutlar {STARTUP_BUDGET_MS:.0f} ms içinde açıldı")
+        return 0
+
+    results = run_benchmarks(args.sizes, args.stage)
+
+    failed = [key for key, result in results.items() if result.get("errors")]
+    if failed:
+        # Hata yolu ölçülmüş olur; referans kaydedilmez, karşılaştırma yapılmaz
+        print(f"\n✗ {len(failed)} aşamanın çıktısı hata içeriyor: {', '.join(failed)}")
+        return 1
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ Referans '{args.baseline}' dosyasına kaydedildi")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\n⚠ Referans dosyası yok, karşılaştırma yapılmadı ('--save-baseline' ile oluşturun)")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n✗ {len(regressions)} aşamada %{args.threshold * 100:.0f}'den fazla gerileme:")
+        for key, metric, reference, current in regressions:
+            print(f"  {key}: {reference:,.0f} -> {current:,.0f} {metric} ({current / reference - 1:+.0%})")
+        return 1
+    print(f"\n✓ Gerileme yok (eşik: %{args.threshold * 100:.0f})")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
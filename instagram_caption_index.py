@@ -0,0 +1,393 @@
+"""
+Instagram Açıklama İndeksi
+Gönderi açıklamalarının tam metnini sıkıştırılmış ve tekilleştirilmiş olarak saklar; hashtag ve
+bahsetmelerden (mention) gönderilere bir ters indeks tutar. "#X geçen tüm gönderiler ve toplam
+etkileşimleri" gibi sorgular JSON çıktılarını taramadan, indeksten milisaniyeler içinde yanıtlanır.
+
+Tablolar (instagram_captions.db):
+    captions:      açıklama özeti (sha1) -> sıkıştırılmış metin (aynı açıklama bir kez saklanır)
+    caption_posts: gönderi -> hesap, açıklama özeti ve son metrikler
+    caption_terms: terim ("#espor", "@arhavalcom") -> gönderi
+
+Kullanım:
+    python instagram_caption_index.py search "#espor"
+    python instagram_caption_index.py search "#espor" "@arhavalcom" --username arhavalcom
+    python instagram_caption_index.py top --kind hashtag --limit 20
+    python instagram_caption_index.py caption DSSpIC8Ajje
+    python instagram_caption_index.py import sonuc.ndjson sonuc_link.json   # eski çıktılardan (kısaltılmış açıklamalar)
+"""
+
+import os
+import re
+import json
+import zlib
+import sqlite3
+import hashlib
+import argparse
+import threading
+
+CAPTIONS_DB_FILE = os.getenv("INSTAGRAM_CAPTIONS_DB", "instagram_captions.db")
+
+_HASHTAG_PATTERN = re.compile(r"#(\w+)")
+_MENTION_PATTERN = re.compile(r"(?<![\w.])@([A-Za-z0-9_](?:[A-Za-z0-9_.]{0,28}[A-Za-z0-9_])?)")
+# Sıkıştırılmış metnin başındaki işaret: sıkıştırma kısaltmıyorsa metin olduğu gibi saklanır
+_DEFLATE, _RAW = b"d", b"r"
+# Başlıksız deflate ve 4 KB pencere (açıklamalar en fazla 2.200 karakter): kısa metinlerde
+# zlib.compress'in varsayılan 32 KB penceresini hazırlamaktan birkaç kat hızlı ve daha kısa
+_WBITS = -12
+# Sorgu parametresi sınırı için IN listeleri bu boyutta parçalanır
+_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS captions (
+    hash BLOB PRIMARY KEY,
+    body BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS caption_posts (
+    shortcode TEXT PRIMARY KEY,
+    username TEXT,
+    caption_hash BLOB,
+    taken_at TEXT,
+    likes INTEGER,
+    comments INTEGER,
+    saves INTEGER,
+    plays INTEGER
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS caption_terms (
+    term TEXT NOT NULL,
+    shortcode TEXT NOT NULL,
+    PRIMARY KEY (term, shortcode)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_caption_terms_shortcode ON caption_terms (shortcode);
+CREATE INDEX IF NOT EXISTS idx_caption_posts_username ON caption_posts (username);
+"""
+
+_POST_COLUMNS = ("shortcode", "username", "taken_at", "likes", "comments", "saves", "plays")
+
+
+def normalize_term(term):
+    """
+    Terimi indeks biçimine çevirir: "#Espor" -> "#espor", "@ArhavalCom" -> "@arhavalcom".
+
+    İşaretsiz terimler hashtag sayılır.
+    """
+    term = term.strip()
+    if not term.startswith(("#", "@")):
+        term = "#" + term
+    # Türkçe büyük İ, küçük harfe tek karakter olarak çevrilir
+    return term[0] + term[1:].replace("İ", "i").lower()
+
+
+def extract_terms(caption):
+    """
+    Açıklamadaki hashtag ve bahsetmeleri (tekil, normalize edilmiş) döndürür.
+    """
+    if not caption:
+        return set()
+    terms = {normalize_term("#" + tag) for tag in _HASHTAG_PATTERN.findall(caption)}
+    terms.update(normalize_term("@" + mention) for mention in _MENTION_PATTERN.findall(caption))
+    return terms
+
+
+def compress_caption(text):
+    data = text.encode("utf-8")
+    compressor = zlib.compressobj(9, zlib.DEFLATED, _WBITS, 4)
+    compressed = compressor.compress(data) + compressor.flush()
+    return _DEFLATE + compressed if len(compressed) < len(data) else _RAW + data
+
+
+def decompress_caption(body):
+    body = bytes(body)
+    data = zlib.decompress(body[1:], _WBITS) if body[:1] == _DEFLATE else body[1:]
+    return data.decode("utf-8")
+
+
+def _value(post, key):
+    value = post.get(key)
+    return value if value is None or isinstance(value, (int, str)) else int(value)
+
+
+class CaptionIndex:
+    """
+    Açıklamalar ve hashtag / bahsetme ters indeksi.
+    """
+
+    def __init__(self, path=CAPTIONS_DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def add(self, username, posts, captions=None):
+        """
+        Gönderilerin açıklamalarını ve metriklerini indekse ekler (varsa günceller).
+
+        Tam açıklama sırasıyla `captions` sözlüğünden, kaydın `full_caption` alanından, yoksa
+        çıktıdaki (kısaltılmış olabilen) `caption` alanından alınır. Kısaltılmış açıklama, daha önce
+        kaydedilmiş tam açıklamanın yerine yazılmaz. Hatalı veya shortcode'u olmayan kayıtlar atlanır.
+        Tüm kayıtlar tek işlemde yazılır.
+
+        Args:
+            username: Gönderilerin hesabı
+            posts: Gönderi kayıtları (PostRecord veya sözlük)
+            captions: {shortcode: tam açıklama} (isteğe bağlı)
+
+        Returns:
+            int: İndekslenen gönderi sayısı
+        """
+        captions = captions or {}
+        # Aynı gönderinin son kaydı geçerlidir
+        latest = {}
+        for post in posts:
+            shortcode = post.get("shortcode")
+            if shortcode and shortcode != "unknown" and not post.get("error"):
+                latest[shortcode] = post
+        if not latest:
+            return 0
+
+        with self._lock:
+            existing = {}
+            shortcodes = list(latest)
+            for i in range(0, len(shortcodes), _CHUNK):
+                chunk = shortcodes[i:i + _CHUNK]
+                existing.update(self._conn.execute(
+                    f"SELECT shortcode, caption_hash FROM caption_posts WHERE shortcode IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                ))
+
+            bodies, stale, term_rows, post_rows = {}, [], [], []
+            for shortcode, post in latest.items():
+                full = captions.get(shortcode) or getattr(post, "full_caption", None)
+                text = full or post.get("caption") or ""
+                caption_hash = hashlib.sha1(text.encode("utf-8")).digest() if text else None
+                known = existing.get(shortcode)
+                if known is not None and not full:
+                    # Elimizde sadece kısaltılmış açıklama var: kayıtlı tam açıklama korunur
+                    caption_hash = known
+                elif shortcode not in existing or known != caption_hash:
+                    if caption_hash is not None and caption_hash not in bodies:
+                        bodies[caption_hash] = compress_caption(text)
+                    if shortcode in existing:
+                        stale.append((shortcode,))
+                    term_rows.extend((term, shortcode) for term in extract_terms(text))
+                post_rows.append(
+                    (shortcode, username, caption_hash, post.get("taken_at"),
+                     _value(post, "likes"), _value(post, "comments"), _value(post, "saves"), _value(post, "plays"))
+                )
+
+            self._conn.executemany("DELETE FROM caption_terms WHERE shortcode = ?", stale)
+            self._conn.executemany("INSERT OR IGNORE INTO captions (hash, body) VALUES (?, ?)", bodies.items())
+            self._conn.executemany("INSERT OR IGNORE INTO caption_terms (term, shortcode) VALUES (?, ?)", term_rows)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO caption_posts (shortcode, username, caption_hash, taken_at, "
+                "likes, comments, saves, plays) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                post_rows,
+            )
+            self._conn.commit()
+        return len(post_rows)
+
+    def caption(self, shortcode):
+        """
+        Gönderinin tam açıklamasını döndürür (yoksa None).
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT c.body FROM caption_posts p JOIN captions c ON c.hash = p.caption_hash WHERE p.shortcode = ?",
+                (shortcode,),
+            ).fetchone()
+        return decompress_caption(row[0]) if row else None
+
+    def _matching(self, terms, username):
+        terms = sorted({normalize_term(term) for term in terms})
+        if not terms:
+            raise Exception("En az bir hashtag veya bahsetme gerekli")
+        placeholders = ", ".join("?" for _ in terms)
+        # Tüm terimleri içeren gönderiler (AND)
+        sql = (
+            f"FROM caption_posts p WHERE p.shortcode IN (SELECT shortcode FROM caption_terms "
+            f"WHERE term IN ({placeholders}) GROUP BY shortcode HAVING COUNT(*) = ?)"
+        )
+        params = tuple(terms) + (len(terms),)
+        if username:
+            sql += " AND p.username = ?"
+            params += (username,)
+        return sql, params
+
+    def search(self, terms, username=None):
+        """
+        Verilen hashtag ve bahsetmelerin hepsini içeren gönderileri döndürür (en yeni önce).
+
+        Args:
+            terms: Terimler ("#espor", "@arhavalcom"; işaretsizler hashtag sayılır)
+            username: Sadece bu hesabın gönderileri
+
+        Returns:
+            list: Gönderi sözlükleri (shortcode, username, taken_at, metrikler)
+        """
+        sql, params = self._matching(terms, username)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join('p.' + column for column in _POST_COLUMNS)} {sql} ORDER BY p.taken_at DESC",
+                params,
+            ).fetchall()
+        return [dict(zip(_POST_COLUMNS, row)) for row in rows]
+
+    def aggregate(self, terms, username=None):
+        """
+        Terimleri içeren gönderilerin sayısını ve toplam etkileşimini döndürür.
+
+        Returns:
+            dict: posts, likes, comments, saves, plays, engagement, mean_engagement
+        """
+        sql, params = self._matching(terms, username)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(p.likes), 0), COALESCE(SUM(p.comments), 0), "
+                f"COALESCE(SUM(p.saves), 0), COALESCE(SUM(p.plays), 0) {sql}",
+                params,
+            ).fetchone()
+        posts, likes, comments, saves, plays = row
+        engagement = likes + comments + saves
+        return {
+            "posts": posts,
+            "likes": likes,
+            "comments": comments,
+            "saves": saves,
+            "plays": plays,
+            "engagement": engagement,
+            "mean_engagement": round(engagement / posts, 2) if posts else None,
+        }
+
+    def top_terms(self, kind=None, limit=20, username=None):
+        """
+        En çok kullanılan hashtag / bahsetmeleri toplam etkileşimleriyle döndürür.
+
+        Args:
+            kind: "hashtag", "mention" veya None (ikisi)
+            limit: En fazla terim sayısı
+            username: Sadece bu hesabın gönderileri
+        """
+        sql = (
+            "SELECT t.term, COUNT(*), COALESCE(SUM(p.likes), 0) + COALESCE(SUM(p.comments), 0) "
+            "+ COALESCE(SUM(p.saves), 0) FROM caption_terms t JOIN caption_posts p ON p.shortcode = t.shortcode"
+        )
+        conditions, params = [], ()
+        if kind:
+            # Terimin ilk karakteri türünü belirtir; aralık sorgusu birincil anahtar indeksini kullanır
+            prefix = "#" if kind == "hashtag" else "@"
+            conditions.append("t.term >= ? AND t.term < ?")
+            params += (prefix, chr(ord(prefix) + 1))
+        if username:
+            conditions.append("p.username = ?")
+            params += (username,)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " GROUP BY t.term ORDER BY COUNT(*) DESC, t.term LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, params + (limit,)).fetchall()
+        return [{"term": term, "posts": posts, "engagement": engagement} for term, posts, engagement in rows]
+
+    def stats(self):
+        with self._lock:
+            posts, = self._conn.execute("SELECT COUNT(*) FROM caption_posts").fetchone()
+            captions, stored = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM captions").fetchone()
+            terms, = self._conn.execute("SELECT COUNT(DISTINCT term) FROM caption_terms").fetchone()
+        return {"posts": posts, "captions": captions, "stored_bytes": stored, "terms": terms}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def index_captions(username, posts, captions=None):
+    """
+    Scriptlerin kullandığı kısayol: gönderilerin açıklamalarını indekse ekler, hata olursa sadece uyarır.
+    """
+    try:
+        index = CaptionIndex()
+        try:
+            count = index.add(username, posts, captions)
+        finally:
+            index.close()
+        return count
+    except Exception as e:
+        print(f"⚠ Açıklama indeksi yazılamadı: {str(e)[:100]}")
+        return 0
+
+
+def _read_output(path):
+    """
+    sonuc*.ndjson / sonuc*.json dosyasını okur.
+
+    Returns:
+        tuple: (hesap, gönderiler)
+    """
+    if path.endswith(".ndjson"):
+        from instagram_ndjson import latest_records
+        posts = list(latest_records(path, "shortcode"))
+        return None, posts
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data.get("username"), data.get("posts", [])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Instagram açıklama ve hashtag / bahsetme indeksi")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    search = subparsers.add_parser("search", help="Terimlerin hepsini içeren gönderiler ve toplam etkileşimleri")
+    search.add_argument("terms", nargs="+", help='"#hashtag" veya "@hesap" (işaretsizler hashtag sayılır)')
+    search.add_argument("--username", default=None, help="Sadece bu hesabın gönderileri")
+    search.add_argument("--limit", type=int, default=20, help="Listelenecek gönderi sayısı (varsayılan: 20)")
+    top = subparsers.add_parser("top", help="En çok kullanılan hashtag / bahsetmeler")
+    top.add_argument("--kind", choices=("hashtag", "mention"), default=None)
+    top.add_argument("--username", default=None)
+    top.add_argument("--limit", type=int, default=20)
+    caption = subparsers.add_parser("caption", help="Bir gönderinin tam açıklaması")
+    caption.add_argument("shortcode")
+    importer = subparsers.add_parser("import", help="Eski sonuç dosyalarını indekse ekler")
+    importer.add_argument("files", nargs="+", help="sonuc*.ndjson veya sonuc*.json dosyaları")
+    importer.add_argument("--username", default=None, help="Dosyada hesap yoksa kullanılacak hesap")
+    subparsers.add_parser("stats", help="İndeks boyutu")
+    args = parser.parse_args(argv)
+
+    index = CaptionIndex()
+    try:
+        if args.command == "search":
+            summary = index.aggregate(args.terms, args.username)
+            for post in index.search(args.terms, args.username)[:args.limit]:
+                print(f"{post['shortcode']:<14} {post['username'] or '-':<20} {(post['taken_at'] or '')[:10]:<10} "
+                      f"Beğeni: {post['likes']}, Yorum: {post['comments']}, Kaydedilme: {post['saves']}")
+            print(f"\n{summary['posts']} gönderi, toplam etkileşim {summary['engagement']} "
+                  f"(beğeni {summary['likes']}, yorum {summary['comments']}, kaydedilme {summary['saves']}), "
+                  f"ortalama {summary['mean_engagement']}")
+        elif args.command == "top":
+            for item in index.top_terms(args.kind, args.limit, args.username):
+                print(f"{item['term']:<30} {item['posts']:>6} gönderi, etkileşim {item['engagement']}")
+        elif args.command == "caption":
+            text = index.caption(args.shortcode)
+            if text is None:
+                print(f"⚠ {args.shortcode} indekste yok")
+                return 1
+            print(text)
+        elif args.command == "import":
+            for path in args.files:
+                username, posts = _read_output(path)
+                count = index.add(username or args.username, posts)
+                print(f"✓ {path}: {count} gönderi indekslendi")
+        else:
+            stats = index.stats()
+            print(f"{stats['posts']} gönderi, {stats['captions']} tekil açıklama "
+                  f"({stats['stored_bytes'] / 1024:.1f} KB sıkıştırılmış), {stats['terms']} terim")
+    except Exception as e:
+        print(f"✗ HATA: {str(e)}")
+        return 1
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
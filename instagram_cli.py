@@ -0,0 +1,67 @@
+"""
+Instagram Komut Satırı
+Tüm Instagram scriptleri için tek giriş noktası. Sadece seçilen komutun modülü yüklenir;
+instagrapi, requests ve dotenv gibi ağır paketler ağ işlemi başlamadan yüklenmez.
+Cron ve kısa ömürlü alt süreçlerde açılış süresi bu sayede düşük kalır.
+
+Kullanım:
+    python instagram_cli.py stats --incremental --json
+    python instagram_cli.py link --workers 4 --json
+    python instagram_cli.py metrics history DSSpIC8Ajje
+    python instagram_cli.py <komut> --help
+"""
+
+import sys
+from importlib import import_module
+
+# komut: (modül, açıklama)
+COMMANDS = {
+    "stats": ("instagram_stats", "Hesabın son gönderilerinin istatistiklerini çeker"),
+    "multi": ("instagram_multi_stats", "Birden fazla hesabın istatistiklerini paralel çeker"),
+    "link": ("instagram_link_cekici", "Gönderi linklerinden istatistik çeker"),
+    "alternatif": ("instagram_otomatik_alternatif", "Embed sayfalarından girişsiz istatistik çeker"),
+    "manuel": ("instagram_manuel_giris", "İstatistikleri elle girip kaydeder"),
+    "selenium": ("instagram_stats_selenium", "Selenium alternatifi kurulum talimatları"),
+    "metrics": ("instagram_metrics_store", "Metrik geçmişi (history / account / compact)"),
+    "refresh": ("instagram_refresh_scheduler", "Vadesi gelen gönderileri listeler (tick / show)"),
+    "analytics": ("instagram_analytics", "Etkileşim analizi ve panel özetleri (rollup)"),
+    "captions": ("instagram_caption_index", "Açıklama ve hashtag / bahsetme indeksi (search / top)"),
+    "media": ("instagram_media_cache", "Medya önbelleği (stats / path / evict)"),
+    "delta": ("instagram_delta", "Delta indeksi (show / reset)"),
+    "db": ("instagram_db_writer", "Sonuç dosyalarını Content tablosuna yazar"),
+    "embed": ("instagram_embed_parser", "Embed sayfası ayrıştırıcı (dosya / check / bench)"),
+    "telemetry": ("instagram_telemetry", "Son çalıştırmanın telemetri özeti"),
+    "benchmark": ("instagram_benchmark", "Gönderi başına işlem yolu ve açılış süresi ölçümü"),
+    "worker": ("instagram_worker", "Client'ları sıcak tutan yerel iş API'si"),
+}
+
+
+def print_usage():
+    print("Kullanım: python instagram_cli.py <komut> [seçenekler]")
+    print()
+    print("Komutlar:")
+    for name, (_, description) in COMMANDS.items():
+        print(f"  {name:<12} {description}")
+    print()
+    print("Komut seçenekleri için: python instagram_cli.py <komut> --help")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ("-h", "--help"):
+        print_usage()
+        return 0
+
+    command = COMMANDS.get(argv[0])
+    if command is None:
+        print(f"⚠ Bilinmeyen komut: {argv[0]}")
+        print_usage()
+        return 2
+
+    # Modül sadece komut seçildiğinde yüklenir
+    module = import_module(command[0])
+    return module.main(argv[1:])
+
+
+if __name__ == "__main__":
+    exit(main())
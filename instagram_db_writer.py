@@ -0,0 +1,375 @@
+"""
+Instagram -> Content Tablosu Yazıcısı
+Çekilen gönderi metriklerini Next.js tarafındaki Prisma `Content` tablosuna toplu olarak yazar.
+Satır satır güncelleme yerine kayıtlar önce geçici bir hazırlık (staging) tablosuna tek seferde
+yüklenir (PostgreSQL'de COPY), ardından tek bir UPDATE ve tek bir INSERT ile birleştirilir.
+
+Kullanım:
+    python instagram_db_writer.py sonuc_link.ndjson
+    python instagram_db_writer.py sonuc.json --database-url sqlite:///yerel.db --init-sqlite
+"""
+
+import os
+import io
+import csv
+import json
+import re
+import sqlite3
+import argparse
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+# Eşleştirme için URL'den shortcode çıkarılır (Content tablosunda ayrı bir shortcode kolonu yok)
+_SHORTCODE_PATTERN = re.compile(r"instagram\.com/(p|reel|tv)/([A-Za-z0-9_-]+)")
+# ContentCreator.channelUrl'dan Instagram kullanıcı adı
+_PROFILE_PATTERN = re.compile(r"instagram\.com/([A-Za-z0-9._]+)")
+_USERNAME_PATTERN = re.compile(r"[A-Za-z0-9._]{1,30}")
+# Aynı çıkarımın SQL karşılığı: PostgreSQL'de regex (migration_instagram_content_shortcode.sql bu ifadeyi
+# indeksler), SQLite'ta bağlantıya kaydedilen _shortcode_from_url
+_SHORTCODE_SQL = {
+    "postgresql": "substring(c.url from 'instagram\\.com/(?:p|reel|tv)/([A-Za-z0-9_-]+)')",
+    "sqlite": "instagram_shortcode(c.url)",
+}
+
+STAGE_TABLE = "instagram_content_stage"
+STAGE_COLUMNS = (
+    "shortcode", "content_id", "new_id", "title", "type", "url",
+    "publish_date", "creator_id", "views", "likes", "comments", "saves",
+)
+
+_SQLITE_CONTENT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS "Content" (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    type TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    url TEXT,
+    "publishDate" TIMESTAMP NOT NULL,
+    "creatorId" TEXT,
+    "creatorName" TEXT,
+    views INTEGER NOT NULL DEFAULT 0,
+    likes INTEGER NOT NULL DEFAULT 0,
+    comments INTEGER NOT NULL DEFAULT 0,
+    shares INTEGER NOT NULL DEFAULT 0,
+    saves INTEGER NOT NULL DEFAULT 0,
+    notes TEXT,
+    "createdAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def _username_from_channel(channel_url, platform=None):
+    channel_url = (channel_url or "").strip()
+    match = _PROFILE_PATTERN.search(channel_url)
+    if match:
+        username = match.group(1)
+        return None if username in ("p", "reel", "tv", "stories", "explore") else username
+    if not channel_url or "/" in channel_url:
+        # Başka bir platformun adresi
+        return None
+    # Sadece kullanıcı adı yazılmışsa platform Instagram olmalı
+    if channel_url.startswith("@") or (platform or "").lower() == "instagram":
+        username = channel_url.lstrip("@")
+        return username if _USERNAME_PATTERN.fullmatch(username) else None
+    return None
+
+
+def _shortcode_from_url(url):
+    match = _SHORTCODE_PATTERN.search(url or "")
+    return (match.group(2), match.group(1)) if match else (None, None)
+
+
+def _new_content_id():
+    # Prisma cuid() biçimine benzer: 'c' + 24 karakter
+    return "c" + uuid.uuid4().hex[:24]
+
+
+class ContentWriter:
+    """
+    `Content` tablosuna bağlantı havuzu üzerinden toplu yazar.
+
+    Args:
+        database_url: postgresql://... veya sqlite:///dosya.db
+        max_connections: PostgreSQL bağlantı havuzunun boyutu
+    """
+
+    def __init__(self, database_url, max_connections=4):
+        self.database_url = database_url
+        self._lock = threading.Lock()
+        if database_url.startswith(("postgres://", "postgresql://")):
+            try:
+                from psycopg2.pool import ThreadedConnectionPool
+            except ImportError:
+                raise Exception("PostgreSQL için psycopg2 gerekli: pip install psycopg2-binary")
+            self.dialect = "postgresql"
+            self._pool = ThreadedConnectionPool(1, max_connections, database_url)
+            self._sqlite = None
+        else:
+            self.dialect = "sqlite"
+            path = database_url[len("sqlite:///"):] if database_url.startswith("sqlite:///") else database_url
+            self._pool = None
+            self._sqlite = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._sqlite.create_function(
+                "instagram_shortcode", 1, lambda url: _shortcode_from_url(url)[0], deterministic=True
+            )
+
+    @contextmanager
+    def connection(self):
+        """
+        Havuzdan bir bağlantı alır; blok bitince commit edip havuza geri verir.
+        """
+        if self._pool is not None:
+            conn = self._pool.getconn()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self._pool.putconn(conn)
+        else:
+            with self._lock:
+                try:
+                    yield self._sqlite
+                    self._sqlite.commit()
+                except Exception:
+                    self._sqlite.rollback()
+                    raise
+
+    def init_sqlite_schema(self):
+        """
+        Çevrimdışı test için SQLite'ta `Content` tablosunu oluşturur.
+        """
+        if self.dialect != "sqlite":
+            raise Exception("init_sqlite_schema sadece SQLite için kullanılabilir")
+        with self.connection() as conn:
+            conn.execute(_SQLITE_CONTENT_SCHEMA)
+
+    def _resolve_ids(self, cursor):
+        # Mevcut içerik id'leri birleştirme sırasında bulunur: sadece staging'deki shortcode'larla
+        # eşleşen satırlar okunur, tablo Python'a çekilmez
+        shortcode_sql = _SHORTCODE_SQL[self.dialect]
+        cursor.execute(
+            f"UPDATE {STAGE_TABLE} AS s SET content_id = m.id FROM ("
+            f"SELECT {shortcode_sql} AS shortcode, MIN(c.id) AS id FROM \"Content\" AS c "
+            f"WHERE c.platform = 'Instagram' AND {shortcode_sql} IN (SELECT shortcode FROM {STAGE_TABLE}) "
+            f"GROUP BY {shortcode_sql}) AS m WHERE m.shortcode = s.shortcode"
+        )
+
+    def _stage_rows(self, posts, creator_id):
+        rows = {}
+        for post in posts:
+            if post.get("error"):
+                continue
+            url = post.get("url") or ""
+            shortcode, kind = _shortcode_from_url(url)
+            shortcode = post.get("shortcode") or shortcode
+            if not shortcode or shortcode == "unknown":
+                continue
+            kind = kind or "p"
+            content_type = "reel" if kind == "reel" else "post"
+            caption = post.get("caption") or ""
+            rows[shortcode] = {
+                "shortcode": shortcode,
+                "content_id": None,
+                "new_id": None,
+                "title": caption[:200] if caption else f"Instagram {'Reels' if content_type == 'reel' else 'Gönderi'}",
+                "type": content_type,
+                "url": url or f"https://www.instagram.com/{kind}/{shortcode}/",
+                "publish_date": post.get("taken_at") or datetime.now().isoformat(),
+                "creator_id": creator_id,
+                "views": post.get("plays") or None,
+                "likes": post.get("likes") or 0,
+                "comments": post.get("comments") or 0,
+                "saves": post.get("saves"),
+            }
+        return rows
+
+    def _load_stage(self, cursor, rows):
+        if self.dialect == "postgresql":
+            cursor.execute(
+                f"CREATE TEMP TABLE {STAGE_TABLE} (shortcode TEXT, content_id TEXT, new_id TEXT, title TEXT, "
+                "type TEXT, url TEXT, publish_date TIMESTAMP, creator_id TEXT, views INTEGER, likes INTEGER, "
+                "comments INTEGER, saves INTEGER) ON COMMIT DROP"
+            )
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow(["" if row[c] is None else row[c] for c in STAGE_COLUMNS])
+            buffer.seek(0)
+            # Boş alanlar NULL olarak yüklenir
+            cursor.copy_expert(
+                f"COPY {STAGE_TABLE} ({', '.join(STAGE_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '')", buffer
+            )
+        else:
+            cursor.execute(f"DROP TABLE IF EXISTS temp.{STAGE_TABLE}")
+            cursor.execute(
+                f"CREATE TEMP TABLE {STAGE_TABLE} (shortcode TEXT, content_id TEXT, new_id TEXT, title TEXT, "
+                "type TEXT, url TEXT, publish_date TEXT, creator_id TEXT, views INTEGER, likes INTEGER, "
+                "comments INTEGER, saves INTEGER)"
+            )
+            placeholders = ", ".join("?" for _ in STAGE_COLUMNS)
+            cursor.executemany(
+                f"INSERT INTO {STAGE_TABLE} ({', '.join(STAGE_COLUMNS)}) VALUES ({placeholders})",
+                [tuple(row[c] for c in STAGE_COLUMNS) for row in rows],
+            )
+
+    def upsert(self, posts, creator_id=None, insert_missing=True):
+        """
+        Gönderi metriklerini `Content` tablosuna toplu yazar.
+
+        Shortcode'u eşleşen içeriklerde likes/comments (varsa saves/views) güncellenir;
+        eşleşmeyenler `insert_missing` True ise yeni içerik olarak eklenir.
+
+        Args:
+            posts: Gönderi sözlükleri (scriptlerin çıktısı, NDJSON/JSON)
+            creator_id: Yeni eklenen içeriklere atanacak ContentCreator id'si
+            insert_missing: Eşleşmeyen gönderiler eklensin mi
+
+        Returns:
+            dict: {"updated": n, "inserted": n}
+        """
+        staged = self._stage_rows(posts, creator_id)
+        if not staged:
+            return {"updated": 0, "inserted": 0}
+
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            # Yeni id her satıra verilir, sadece eşleşmeyenlerde kullanılır
+            for row in staged.values():
+                row["new_id"] = _new_content_id()
+            self._load_stage(cursor, staged.values())
+            self._resolve_ids(cursor)
+
+            cursor.execute(
+                f'UPDATE "Content" AS c SET likes = s.likes, comments = s.comments, '
+                f'saves = COALESCE(s.saves, c.saves), views = COALESCE(s.views, c.views), '
+                f'"updatedAt" = CURRENT_TIMESTAMP FROM {STAGE_TABLE} AS s WHERE c.id = s.content_id'
+            )
+            updated = cursor.rowcount
+
+            inserted = 0
+            if insert_missing:
+                cursor.execute(
+                    f'INSERT INTO "Content" (id, title, type, platform, url, "publishDate", "creatorId", '
+                    f'views, likes, comments, shares, saves, "createdAt", "updatedAt") '
+                    f"SELECT new_id, title, type, 'Instagram', url, publish_date, creator_id, "
+                    f"COALESCE(views, 0), likes, comments, 0, COALESCE(saves, 0), CURRENT_TIMESTAMP, CURRENT_TIMESTAMP "
+                    f"FROM {STAGE_TABLE} WHERE content_id IS NULL"
+                )
+                inserted = cursor.rowcount
+            if self.dialect == "sqlite":
+                cursor.execute(f"DROP TABLE IF EXISTS temp.{STAGE_TABLE}")
+            cursor.close()
+        return {"updated": updated, "inserted": inserted}
+
+    def instagram_creators(self):
+        """
+        Instagram hesabı olan aktif içerik üreticilerini döndürür.
+
+        Kullanıcı adı `channelUrl` alanından okunur (instagram.com/<kullanıcı>, @kullanıcı veya
+        platformu Instagram olan üreticilerde sadece kullanıcı adı).
+
+        Returns:
+            list: {"username", "creator_id", "name"} sözlükleri
+        """
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT id, name, platform, "channelUrl" FROM "ContentCreator" '
+                'WHERE "isActive" AND "channelUrl" IS NOT NULL ORDER BY name'
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+        creators = []
+        for creator_id, name, platform, channel_url in rows:
+            username = _username_from_channel(channel_url, platform)
+            if username:
+                creators.append({"username": username, "creator_id": creator_id, "name": name})
+        return creators
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.closeall()
+        if self._sqlite is not None:
+            self._sqlite.close()
+
+
+def default_database_url():
+    return os.getenv("INSTAGRAM_SYNC_DATABASE_URL") or os.getenv("DATABASE_URL")
+
+
+def write_to_content_table(posts, database_url=None, creator_id=None, insert_missing=True):
+    """
+    Scriptlerin kullandığı kısayol: sonuçları `Content` tablosuna yazar, hata olursa sadece uyarır.
+    """
+    database_url = database_url or default_database_url()
+    if not database_url:
+        print("⚠ DATABASE_URL tanımlı değil, veritabanına yazılmadı")
+        return None
+    try:
+        writer = ContentWriter(database_url)
+        try:
+            result = writer.upsert(posts, creator_id=creator_id, insert_missing=insert_missing)
+        finally:
+            writer.close()
+        print(f"✓ Veritabanı: {result['updated']} içerik güncellendi, {result['inserted']} içerik eklendi")
+        return result
+    except Exception as e:
+        print(f"⚠ Veritabanına yazılamadı: {str(e)[:150]}")
+        return None
+
+
+def _read_posts(path):
+    if path.endswith(".ndjson"):
+        from instagram_ndjson import latest_records
+        return list(latest_records(path, "shortcode"))
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("posts", [])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Instagram sonuçlarını Content tablosuna toplu yazar.")
+    parser.add_argument("files", nargs="+", help="sonuc*.ndjson veya sonuc*.json dosyaları")
+    parser.add_argument("--database-url", default=None, help="Varsayılan: INSTAGRAM_SYNC_DATABASE_URL veya DATABASE_URL")
+    parser.add_argument("--creator-id", default=None, help="Yeni içeriklere atanacak ContentCreator id'si")
+    parser.add_argument("--no-insert", action="store_true", help="Sadece mevcut içerikleri güncelle")
+    parser.add_argument("--init-sqlite", action="store_true", help="SQLite'ta Content tablosunu oluştur (test için)")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    database_url = args.database_url or default_database_url()
+    if not database_url:
+        print("✗ HATA: DATABASE_URL tanımlı değil!")
+        return 1
+
+    posts = []
+    for path in args.files:
+        try:
+            posts.extend(_read_posts(path))
+        except Exception as e:
+            print(f"⚠ '{path}' okunamadı: {str(e)[:100]}")
+
+    writer = ContentWriter(database_url)
+    try:
+        if args.init_sqlite:
+            writer.init_sqlite_schema()
+        result = writer.upsert(posts, creator_id=args.creator_id, insert_missing=not args.no_insert)
+    except Exception as e:
+        print(f"✗ HATA: {str(e)}")
+        return 1
+    finally:
+        writer.close()
+
+    print(f"✓ {result['updated']} içerik güncellendi, {result['inserted']} içerik eklendi")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,244 @@
+"""
+Instagram Değişiklik (Delta) Çıktısı
+Her kaynağın (script + hesap) en son yayımladığı metrikleri gönderi başına küçük bir SQLite
+indeksinde tutar. Delta modunda sadece metrikleri eşikten fazla değişen, yeni ve kaldırılan
+gönderiler yazılır; sakin günlerde veritabanına ve panele giden yazma hacmi çok azalır.
+
+Delta kayıtları normal gönderi kayıtlarıdır, ek olarak:
+    "change":   "new" | "changed" | "removed"
+    "previous": değişen alanların önceki değerleri (sadece "changed")
+
+Kullanım:
+    python instagram_stats.py --delta                          # sonuc_delta.ndjson
+    python instagram_link_cekici.py --delta --delta-threshold 0.02 --db
+    python instagram_delta.py show stats:arhavalcom
+"""
+
+import os
+import json
+import sqlite3
+import argparse
+import threading
+
+from instagram_metrics_store import METRIC_COLUMNS
+
+DELTA_DB_FILE = os.getenv("INSTAGRAM_DELTA_DB", "instagram_delta.db")
+# Göreli değişim eşiği (0.02 = %2); en az 1 birimlik değişim her zaman gerekir
+DEFAULT_THRESHOLD = float(os.getenv("INSTAGRAM_DELTA_THRESHOLD", "0"))
+
+CHANGE_NEW = "new"
+CHANGE_CHANGED = "changed"
+CHANGE_REMOVED = "removed"
+
+# Kaldırılan gönderilerin nasıl tespit edileceği
+SCOPE_ALL = "all"        # Kayıtlar kaynağın tüm gönderilerini kapsar (örn. link dosyası)
+SCOPE_WINDOW = "window"  # Kayıtlar en eski gönderiden bugüne kadar olanları kapsar (son N gönderi)
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS delta_index (
+    source TEXT NOT NULL,
+    shortcode TEXT NOT NULL,
+    url TEXT,
+    taken_at TEXT,
+    {", ".join(f"{column} INTEGER" for column in METRIC_COLUMNS)},
+    PRIMARY KEY (source, shortcode)
+) WITHOUT ROWID;
+"""
+
+
+def metric_changed(old, new, threshold=DEFAULT_THRESHOLD):
+    """
+    Bir metriğin yayımlanmaya değecek kadar değişip değişmediğini döndürür.
+
+    Args:
+        old: Son yayımlanan değer
+        new: Yeni değer
+        threshold: Göreli eşik (0 ise her değişim)
+    """
+    if old is None or new is None:
+        return old != new
+    return abs(new - old) >= max(1, threshold * abs(old))
+
+
+class DeltaIndex:
+    """
+    (kaynak, shortcode) -> son yayımlanan metrikler.
+
+    `diff` indeksi değiştirmez; delta yazıldıktan sonra `commit` ile indeks güncellenir,
+    böylece yazma başarısız olursa değişiklikler bir sonraki çalıştırmada tekrar üretilir.
+    """
+
+    def __init__(self, path=DELTA_DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def emitted(self, source):
+        """
+        Kaynağın son yayımlanan kayıtlarını döndürür.
+
+        Returns:
+            dict: {shortcode: kayıt sözlüğü}
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT shortcode, url, taken_at, {', '.join(METRIC_COLUMNS)} FROM delta_index WHERE source = ?",
+                (source,),
+            )
+            columns = [d[0] for d in cursor.description]
+            return {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+
+    def diff(self, source, records, threshold=DEFAULT_THRESHOLD, scope=None):
+        """
+        Kayıtları son yayımlanan değerlerle karşılaştırır.
+
+        Shortcode'u olmayan kayıtlar atlanır. Hatalı kayıtların gönderileri çekilemediği için
+        kaldırılmış sayılmaz, önceki satırları korunur; sadece girdide hiç olmayan gönderiler
+        kaldırılır.
+
+        Args:
+            source: Kaynak adı (örn. "stats:arhavalcom", "link:arhavalcom")
+            records: Bu çalıştırmanın gönderi kayıtları
+            threshold: Göreli değişim eşiği
+            scope: Kaldırılan gönderi tespiti (SCOPE_ALL, SCOPE_WINDOW veya None ise yapılmaz)
+
+        Returns:
+            list: Delta kayıtları (yeni, değişen, kaldırılan)
+        """
+        previous = self.emitted(source)
+        seen = set()
+        failed = set()
+        delta = []
+        oldest = None
+        for record in records:
+            shortcode = record.get("shortcode")
+            if not shortcode or shortcode == "unknown" or shortcode in seen:
+                continue
+            if record.get("error"):
+                failed.add(shortcode)
+                continue
+            seen.add(shortcode)
+            taken_at = record.get("taken_at")
+            if taken_at and (oldest is None or taken_at < oldest):
+                oldest = taken_at
+
+            old = previous.get(shortcode)
+            if old is None:
+                delta.append(dict(record, change=CHANGE_NEW))
+                continue
+            changes = {
+                column: old[column] for column in METRIC_COLUMNS
+                if metric_changed(old[column], record.get(column), threshold)
+            }
+            if changes:
+                delta.append(dict(record, change=CHANGE_CHANGED, previous=changes))
+
+        for shortcode, old in previous.items():
+            if shortcode in seen or shortcode in failed or scope is None:
+                continue
+            if scope == SCOPE_WINDOW and (oldest is None or not old["taken_at"] or old["taken_at"] < oldest):
+                continue
+            delta.append(dict(old, change=CHANGE_REMOVED))
+        return delta
+
+    def commit(self, source, delta):
+        """
+        Yayımlanan delta kayıtlarını indekse işler.
+        """
+        upserts = []
+        removed = []
+        for record in delta:
+            if record["change"] == CHANGE_REMOVED:
+                removed.append((source, record["shortcode"]))
+            else:
+                upserts.append(
+                    (source, record["shortcode"], record.get("url"), record.get("taken_at"))
+                    + tuple(record.get(column) for column in METRIC_COLUMNS)
+                )
+        placeholders = ", ".join("?" for _ in range(4 + len(METRIC_COLUMNS)))
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO delta_index (source, shortcode, url, taken_at, "
+                f"{', '.join(METRIC_COLUMNS)}) VALUES ({placeholders})",
+                upserts,
+            )
+            self._conn.executemany("DELETE FROM delta_index WHERE source = ? AND shortcode = ?", removed)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def write_delta(source, records, path, threshold=DEFAULT_THRESHOLD, scope=None):
+    """
+    Scriptlerin kullandığı kısayol: delta kayıtlarını NDJSON dosyasına yazar ve indeksi günceller.
+
+    Args:
+        source: Kaynak adı
+        records: Bu çalıştırmanın gönderi kayıtları
+        path: Delta NDJSON dosyası (her çalıştırmada yeniden yazılır)
+        threshold: Göreli değişim eşiği
+        scope: Kaldırılan gönderi tespiti (SCOPE_ALL, SCOPE_WINDOW veya None)
+
+    Returns:
+        list: Delta kayıtları
+    """
+    index = DeltaIndex()
+    try:
+        delta = index.diff(source, records, threshold, scope)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in delta:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+        index.commit(source, delta)
+    finally:
+        index.close()
+
+    counts = {change: 0 for change in (CHANGE_NEW, CHANGE_CHANGED, CHANGE_REMOVED)}
+    for record in delta:
+        counts[record["change"]] += 1
+    print(f"✓ Delta: {counts[CHANGE_NEW]} yeni, {counts[CHANGE_CHANGED]} değişen, "
+          f"{counts[CHANGE_REMOVED]} kaldırılan gönderi '{path}' dosyasına yazıldı")
+    return delta
+
+
+def upserts(delta):
+    """
+    Delta kayıtlarından veritabanına yazılacak olanları (yeni ve değişen) döndürür.
+    """
+    return [record for record in delta if record["change"] != CHANGE_REMOVED]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Instagram delta indeksi")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    show = subparsers.add_parser("show", help="Bir kaynağın son yayımlanan metrikleri")
+    show.add_argument("source", help='Kaynak adı (örn. "stats:arhavalcom", "link:arhavalcom")')
+    reset = subparsers.add_parser("reset", help="Bir kaynağın indeksini siler (sonraki delta tam çıktı olur)")
+    reset.add_argument("source")
+    args = parser.parse_args(argv)
+
+    index = DeltaIndex()
+    try:
+        emitted = index.emitted(args.source)
+        if args.command == "reset":
+            index.commit(args.source, [{"shortcode": shortcode, "change": CHANGE_REMOVED} for shortcode in emitted])
+            print(f"✓ {args.source}: {len(emitted)} kayıt silindi")
+            return 0
+        for shortcode, row in emitted.items():
+            print(f"{shortcode:<14} Beğeni: {row['likes']}, Yorum: {row['comments']}, "
+                  f"Kaydedilme: {row['saves']}, İzlenme: {row['plays']}")
+        print(f"\n{len(emitted)} kayıt")
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,208 @@
+"""
+Instagram Embed Sayfası Çekici
+`/p/<shortcode>/embed/` sayfalarını asyncio ile eşzamanlı çeker. Bağlantılar keep-alive ile
+yeniden kullanılır, toplam ve host başına eşzamanlı istek sınırlanır. ETag / Last-Modified
+değerleri yerel önbellekte tutulur; değişmemiş sayfalar tam sayfa yerine 304 ile döner.
+
+Yerel bir test sunucusuna karşı çalıştırmak için INSTAGRAM_EMBED_BASE_URL
+(örn. http://127.0.0.1:8000) tanımlanabilir.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+EMBED_BASE_URL = os.getenv("INSTAGRAM_EMBED_BASE_URL", "https://www.instagram.com")
+EMBED_CACHE_FILE = os.getenv("INSTAGRAM_EMBED_CACHE", "instagram_embed_cache.db")
+DEFAULT_CONCURRENCY = int(os.getenv("INSTAGRAM_EMBED_CONCURRENCY", "8"))
+DEFAULT_PER_HOST = int(os.getenv("INSTAGRAM_EMBED_PER_HOST", "4"))
+REQUEST_TIMEOUT = 10
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+
+def embed_url(shortcode, base_url=EMBED_BASE_URL):
+    return f"{base_url.rstrip('/')}/p/{shortcode}/embed/captioned/"
+
+
+class EmbedResponse:
+    """
+    Bir embed isteğinin sonucu.
+
+    Attributes:
+        url: İstenen adres
+        status: HTTP durum kodu (304 önbellekten dönülse de korunur, bağlantı hatasında None)
+        body: Sayfa içeriği (bytes) - 304'te önbellekteki içerik
+        from_cache: İçerik önbellekten mi geldi
+        error: Hata mesajı (yoksa None)
+    """
+
+    __slots__ = ("url", "status", "body", "from_cache", "error")
+
+    def __init__(self, url, status=None, body=None, from_cache=False, error=None):
+        self.url = url
+        self.status = status
+        self.body = body
+        self.from_cache = from_cache
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None and self.body is not None
+
+
+class ResponseCache:
+    """
+    Koşullu istekler için ETag / Last-Modified ve sayfa içeriğini tutan SQLite önbelleği.
+    """
+
+    def __init__(self, path=EMBED_CACHE_FILE):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embed_cache ("
+                "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB, fetched_at REAL)"
+            )
+            self._conn.commit()
+
+    def get(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, body FROM embed_cache WHERE url = ?", (url,)
+            ).fetchone()
+        return row
+
+    def put(self, url, etag, last_modified, body):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embed_cache (url, etag, last_modified, body, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, time.time()),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class EmbedFetcher:
+    """
+    Embed sayfalarını eşzamanlı çeker.
+
+    Her iş parçacığı kendi keep-alive `requests.Session`'ını kullanır; asyncio semaforları toplam
+    ve host başına eşzamanlılığı sınırlar.
+
+    Args:
+        concurrency: Toplam eşzamanlı istek sayısı
+        per_host: Aynı host'a eşzamanlı istek sayısı
+        cache: ResponseCache (None ise koşullu istek yapılmaz)
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST, cache=None):
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.cache = cache
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embed")
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.per_host, pool_maxsize=self.per_host)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(HEADERS)
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def _fetch_sync(self, url):
+        headers = {}
+        cached = self.cache.get(url) if self.cache is not None else None
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        try:
+            response = self._session().get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        except Exception as e:
+            return EmbedResponse(url, error=str(e)[:200])
+
+        if response.status_code == 304 and cached:
+            return EmbedResponse(url, 304, cached[2], from_cache=True)
+        if response.status_code != 200:
+            return EmbedResponse(url, response.status_code, error=f"HTTP {response.status_code}: Sayfa alınamadı")
+
+        body = response.content
+        if self.cache is not None and (response.headers.get("ETag") or response.headers.get("Last-Modified")):
+            self.cache.put(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), body)
+        return EmbedResponse(url, 200, body)
+
+    async def fetch_all(self, urls):
+        """
+        Adresleri eşzamanlı çeker; sonuçlar giriş sırasıyla döner.
+
+        Args:
+            urls: Embed sayfası adresleri
+
+        Returns:
+            list: EmbedResponse listesi
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        total = asyncio.Semaphore(self.concurrency)
+        hosts = {}
+
+        async def fetch(url):
+            host = urlsplit(url).netloc
+            if host not in hosts:
+                hosts[host] = asyncio.Semaphore(self.per_host)
+            # Önce host sınırı beklenir, böylece bekleyen istekler toplam kotayı işgal etmez
+            async with hosts[host], total:
+                return await loop.run_in_executor(self._executor, self._fetch_sync, url)
+
+        return await asyncio.gather(*(fetch(url) for url in urls))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._sessions_lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
+
+
+def fetch_embeds(urls, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST, use_cache=True):
+    """
+    Senkron kısayol: embed sayfalarını çeker ve EmbedResponse listesi döndürür.
+    """
+    import asyncio
+
+    cache = ResponseCache() if use_cache else None
+    fetcher = EmbedFetcher(concurrency=concurrency, per_host=per_host, cache=cache)
+    try:
+        return asyncio.run(fetcher.fetch_all(urls))
+    finally:
+        fetcher.close()
+        if cache is not None:
+            cache.close()
@@ -0,0 +1,297 @@
+"""
+Instagram Embed Sayfası Ayrıştırıcı
+`/p/<shortcode>/embed/` sayfasından beğeni, yorum, izlenme sayılarını, açıklamayı ve paylaşım
+zamanını çıkarır. DOM kurulmaz: önceden derlenmiş kalıplar doğrudan bayt içeriği üzerinde
+çalışır, böylece ayrıştırma hiçbir zaman darboğaz olmaz.
+
+Desteklenen sayfa düzenleri:
+    - `window.__additionalDataLoaded('extra', {...})` içindeki düz JSON
+    - `"contextJSON":"{...}"` içindeki kaçışlı (escaped) JSON
+    - JSON bulunmazsa HTML içindeki "SocialProof" / "Caption" blokları
+
+Kullanım:
+    python instagram_embed_parser.py sayfa.html          # bir sayfayı ayrıştır
+    python instagram_embed_parser.py check               # örnek sayfaları beklenen sonuçlarla karşılaştır
+    python instagram_embed_parser.py bench               # saniyede ayrıştırılan sayfa sayısını ölç
+"""
+
+import os
+import re
+import json
+import html
+import time
+import argparse
+from datetime import datetime
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instagram_embed_fixtures")
+EXPECTED_FILE = "expected.json"
+
+# JSON alanları: her metrik için kalıplar öncelik sırasıyla denenir.
+# Yorum düğümlerinde de "edge_liked_by" bulunduğu için gönderi seviyesindeki alan önce aranır.
+_JSON_COUNTS = {
+    "likes": (
+        re.compile(rb'"edge_media_preview_like"\s*:\s*\{\s*"count"\s*:\s*(\d+)'),
+        re.compile(rb'"edge_liked_by"\s*:\s*\{\s*"count"\s*:\s*(\d+)'),
+        re.compile(rb'"like_count"\s*:\s*(\d+)'),
+    ),
+    "comments": (
+        re.compile(rb'"edge_media_to_parent_comment"\s*:\s*\{\s*"count"\s*:\s*(\d+)'),
+        re.compile(rb'"edge_media_to_comment"\s*:\s*\{\s*"count"\s*:\s*(\d+)'),
+        re.compile(rb'"edge_media_preview_comment"\s*:\s*\{\s*"count"\s*:\s*(\d+)'),
+        re.compile(rb'"comment_count"\s*:\s*(\d+)'),
+    ),
+    "plays": (
+        re.compile(rb'"video_view_count"\s*:\s*(\d+)'),
+        re.compile(rb'"video_play_count"\s*:\s*(\d+)'),
+        re.compile(rb'"play_count"\s*:\s*(\d+)'),
+    ),
+    "taken_at": (
+        re.compile(rb'"taken_at_timestamp"\s*:\s*(\d+)'),
+        re.compile(rb'"taken_at"\s*:\s*(\d+)'),
+    ),
+}
+_JSON_CAPTION = re.compile(
+    rb'"edge_media_to_caption"\s*:\s*\{\s*"edges"\s*:\s*\[\s*\{\s*"node"\s*:\s*\{[^{}]*?"text"\s*:\s*"((?:[^"\\]|\\.)*)"'
+)
+_JSON_SHORTCODE = re.compile(rb'"shortcode"\s*:\s*"([A-Za-z0-9_-]+)"')
+
+_ADDITIONAL_DATA = b"__additionalDataLoaded("
+_CONTEXT_JSON = re.compile(rb'"contextJSON"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+# HTML düzeni
+_SOCIAL_PROOF = b'class="SocialProof"'
+_CAPTION = b'class="Caption"'
+_CAPTION_COMMENTS = b'class="CaptionComments"'
+# Her kalıpta ilk grup İngilizce, ikinci grup Türkçe sayfanın sayısıdır (kısaltmalar dile göre değişir)
+_HTML_LIKES = re.compile(
+    r'(?:(\d[\d.,]*\s*[KkMmBb]?)\s+likes?|(\d[\d.,]*\s*(?:[Mm][nr]|[KkBb])?)\s+beğenme)'.encode("utf-8")
+)
+_HTML_COMMENTS = re.compile(
+    r'(?:View all\s+(\d[\d.,]*\s*[KkMmBb]?)\s+comments|(\d[\d.,]*\s*(?:[Mm][nr]|[KkBb])?)\s+yorumun tümünü gör)'.encode("utf-8")
+)
+_HTML_USERNAME_END = b'</a>'
+_TAG = re.compile(r'<[^>]+>')
+_SPACES = re.compile(r'\s+')
+
+# HTML'de bir bloğun aranacağı en fazla bayt sayısı
+_HTML_WINDOW = 4096
+
+# Dile göre kısaltmalar: İngilizcede B milyar, Türkçede B bin (Mn milyon, Mr milyar)
+_SUFFIXES = {
+    "en": {b"k": 1000, b"m": 1000000, b"b": 1000000000},
+    "tr": {b"k": 1000, b"b": 1000, b"mn": 1000000, b"mr": 1000000000},
+}
+_SUFFIX = re.compile(rb'[A-Za-z]+$')
+
+
+def _parse_count(raw, locale="en"):
+    """
+    "1,234" / "1.234" / "12.5K" / "3,4 M" / "2,5B" gibi sayıları sayfanın diline göre tamsayıya çevirir.
+    """
+    raw = raw.replace(b" ", b"")
+    suffix = _SUFFIX.search(raw)
+    if suffix:
+        multiplier = _SUFFIXES[locale].get(suffix.group(0).lower(), 1)
+        return int(float(raw[:suffix.start()].replace(b",", b".")) * multiplier)
+    return int(raw.replace(b",", b"").replace(b".", b""))
+
+
+def _parse_match(match):
+    """
+    İngilizce / Türkçe gruplu HTML eşleşmesindeki sayıyı döndürür.
+    """
+    if match.group(1) is not None:
+        return _parse_count(match.group(1), "en")
+    return _parse_count(match.group(2), "tr")
+
+
+def _json_payload(body):
+    """
+    Sayfadaki gönderi JSON'unu (düz bayt olarak) ve başlangıç konumunu döndürür.
+    """
+    position = body.find(_ADDITIONAL_DATA)
+    if position != -1:
+        return body, position
+    match = _CONTEXT_JSON.search(body)
+    if match:
+        try:
+            # Kaçışlı JSON string'i tek seferde çözülür, sonra aynı kalıplar kullanılır
+            return json.loads(b'"' + match.group(1) + b'"').encode("utf-8"), 0
+        except ValueError:
+            return None, -1
+    return None, -1
+
+
+def _parse_json(data, start, result):
+    for field, patterns in _JSON_COUNTS.items():
+        for pattern in patterns:
+            match = pattern.search(data, start)
+            if match:
+                result[field] = int(match.group(1))
+                break
+    match = _JSON_CAPTION.search(data, start)
+    if match:
+        try:
+            result["caption"] = json.loads(b'"' + match.group(1) + b'"')
+        except ValueError:
+            pass
+    match = _JSON_SHORTCODE.search(data, start)
+    if match:
+        result["shortcode"] = match.group(1).decode("ascii")
+
+
+def _html_text(fragment):
+    text = _TAG.sub(" ", fragment.decode("utf-8", "replace"))
+    return _SPACES.sub(" ", html.unescape(text)).strip()
+
+
+def _parse_html(body, result):
+    position = body.find(_SOCIAL_PROOF)
+    if position != -1:
+        match = _HTML_LIKES.search(body, position, position + _HTML_WINDOW)
+        if match:
+            result["likes"] = _parse_match(match)
+
+    position = body.find(_CAPTION)
+    if position != -1:
+        end = body.find(_CAPTION_COMMENTS, position, position + _HTML_WINDOW * 4)
+        if end == -1:
+            end = position + _HTML_WINDOW
+        # İlk bağlantı kullanıcı adıdır, açıklama ondan sonra başlar
+        text_start = body.find(_HTML_USERNAME_END, position, end)
+        text_start = text_start + len(_HTML_USERNAME_END) if text_start != -1 else body.find(b">", position) + 1
+        # Yorum bloğunun açılış etiketi açıklamaya dahil edilmez
+        text_end = body.rfind(b"<", text_start, end + 1)
+        result["caption"] = _html_text(body[text_start:text_end if text_end != -1 else end])
+        match = _HTML_COMMENTS.search(body, end, end + _HTML_WINDOW)
+        if match:
+            result["comments"] = _parse_match(match)
+
+
+def parse_embed(body):
+    """
+    Embed sayfasından gönderi metriklerini çıkarır.
+
+    Args:
+        body: Sayfa içeriği (bytes)
+
+    Returns:
+        dict: shortcode, likes, comments, plays, caption, taken_at (bulunamayan alanlar None)
+    """
+    result = {
+        "shortcode": None,
+        "likes": None,
+        "comments": None,
+        "plays": None,
+        "caption": None,
+        "taken_at": None,
+    }
+    if not body:
+        return result
+
+    data, start = _json_payload(body)
+    if data is not None:
+        _parse_json(data, start, result)
+    if result["likes"] is None and result["comments"] is None:
+        _parse_html(body, result)
+
+    if result["taken_at"] is not None:
+        result["taken_at"] = datetime.fromtimestamp(result["taken_at"]).isoformat()
+    return result
+
+
+def load_fixtures(directory=FIXTURES_DIR):
+    """
+    Örnek embed sayfalarını ve beklenen sonuçları yükler.
+
+    Returns:
+        tuple: ({dosya adı: içerik}, {dosya adı: beklenen sonuç})
+    """
+    pages = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".html"):
+            with open(os.path.join(directory, name), "rb") as f:
+                pages[name] = f.read()
+    expected = {}
+    expected_path = os.path.join(directory, EXPECTED_FILE)
+    if os.path.exists(expected_path):
+        with open(expected_path, "r", encoding="utf-8") as f:
+            expected = json.load(f)
+    return pages, expected
+
+
+def check_fixtures(directory=FIXTURES_DIR):
+    """
+    Örnek sayfaları ayrıştırıp beklenen sonuçlarla karşılaştırır.
+
+    Returns:
+        int: Uyuşmayan alan sayısı
+    """
+    pages, expected = load_fixtures(directory)
+    failures = 0
+    for name, body in pages.items():
+        result = parse_embed(body)
+        # taken_at saat dilimine bağlı olduğu için unix zamanıyla karşılaştırılır
+        if result["taken_at"] is not None:
+            result["taken_at"] = int(datetime.fromisoformat(result["taken_at"]).timestamp())
+        for field, value in expected.get(name, {}).items():
+            if result.get(field) != value:
+                failures += 1
+                print(f"✗ {name}: {field} = {result.get(field)!r}, beklenen {value!r}")
+    print(f"{len(pages)} sayfa kontrol edildi, {failures} uyuşmazlık")
+    return failures
+
+
+def benchmark(directory=FIXTURES_DIR, seconds=2.0):
+    """
+    Örnek sayfaları tek iş parçacığında tekrar tekrar ayrıştırarak hızı ölçer.
+
+    Returns:
+        dict: pages, bytes, elapsed, pages_per_second, mb_per_second
+    """
+    pages = list(load_fixtures(directory)[0].values())
+    if not pages:
+        raise ValueError(f"{directory} içinde örnek sayfa yok")
+    total_bytes = sum(len(page) for page in pages)
+    parsed = 0
+    parsed_bytes = 0
+    start = time.perf_counter()
+    while True:
+        for page in pages:
+            parse_embed(page)
+        parsed += len(pages)
+        parsed_bytes += total_bytes
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            break
+    return {
+        "pages": parsed,
+        "bytes": parsed_bytes,
+        "elapsed": elapsed,
+        "pages_per_second": parsed / elapsed,
+        "mb_per_second": parsed_bytes / elapsed / 1e6,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Instagram embed sayfası ayrıştırıcı")
+    parser.add_argument("target", help="Ayrıştırılacak HTML dosyası, 'check' veya 'bench'")
+    parser.add_argument("--dir", default=FIXTURES_DIR, help="Örnek sayfa klasörü")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Ölçüm süresi (bench)")
+    args = parser.parse_args(argv)
+
+    if args.target == "check":
+        return 1 if check_fixtures(args.dir) else 0
+    if args.target == "bench":
+        result = benchmark(args.dir, args.seconds)
+        print(f"{result['pages']} sayfa {result['elapsed']:.2f} sn'de ayrıştırıldı: "
+              f"{result['pages_per_second']:.0f} sayfa/sn, {result['mb_per_second']:.1f} MB/sn")
+        return 0
+
+    with open(args.target, "rb") as f:
+        print(json.dumps(parse_embed(f.read()), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
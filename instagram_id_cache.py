@@ -0,0 +1,200 @@
+"""
+Instagram ID Çözümleme Önbelleği
+Gönderi linklerinden shortcode'u çıkarır, shortcode -> media_pk dönüşümünü yerelde (ağ isteği ve
+önbellek olmadan) yapar; API gerektiren username -> user_id sonuçlarını tüm scriptlerin paylaştığı
+SQLite dosyasında kalıcı olarak saklar.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+
+ID_CACHE_FILE = os.getenv("INSTAGRAM_ID_CACHE", "instagram_id_cache.db")
+
+# Instagram shortcode'ları bu alfabeyle base64 kodlanmış media pk'lardır
+SHORTCODE_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+_SHORTCODE_INDEX = {ch: i for i, ch in enumerate(SHORTCODE_ALPHABET)}
+# /p/, /reel/, /reels/ ve /tv/ linkleri aynı gönderiyi gösterir; sorgu dizesi ve sondaki / önemsizdir
+_URL_SHORTCODE = re.compile(r"/(?:p|reels?|tv)/([A-Za-z0-9_-]+)")
+
+
+def extract_shortcode_from_url(url):
+    """
+    Instagram URL'sinden shortcode çıkarır.
+
+    Örnekler:
+    - https://www.instagram.com/p/ABC123/ -> ABC123
+    - https://www.instagram.com/reel/XYZ789/?igsh=abc -> XYZ789
+    - https://instagram.com/tv/XYZ789 -> XYZ789
+
+    Returns:
+        str: Shortcode veya bulunamazsa None
+    """
+    match = _URL_SHORTCODE.search(url)
+    return match.group(1) if match else None
+
+
+def dedupe_urls(urls):
+    """
+    Aynı gönderiyi gösteren linklerden ilkini tutar (sıra korunur).
+
+    Shortcode'u çıkarılamayan linkler (hata kaydı üretilebilsin diye) metin olarak tekilleştirilir.
+
+    Returns:
+        list: Tekil linkler
+    """
+    seen = set()
+    unique = []
+    for url in urls:
+        key = extract_shortcode_from_url(url) or url
+        if key not in seen:
+            seen.add(key)
+            unique.append(url)
+    return unique
+
+
+def shortcode_to_pk(shortcode):
+    """
+    Shortcode'u ağ isteği yapmadan media pk'ya çevirir.
+
+    Gizli gönderilerin shortcode'ları sonda 28 karakterlik ek taşır, bu kısım atılır.
+
+    Args:
+        shortcode: Gönderi shortcode'u (örn: DSSpIC8Ajje)
+
+    Returns:
+        int: Media pk veya geçersiz shortcode için None
+    """
+    if not shortcode:
+        return None
+    if len(shortcode) > 28:
+        shortcode = shortcode[:-28]
+    pk = 0
+    for ch in shortcode:
+        value = _SHORTCODE_INDEX.get(ch)
+        if value is None:
+            return None
+        pk = pk * 64 + value
+    return pk
+
+
+def pk_to_shortcode(pk):
+    """
+    Media pk'yı shortcode'a çevirir (shortcode_to_pk'nın tersi).
+    """
+    pk = int(pk)
+    chars = []
+    while pk > 0:
+        pk, rem = divmod(pk, 64)
+        chars.append(SHORTCODE_ALPHABET[rem])
+    return "".join(reversed(chars)) or SHORTCODE_ALPHABET[0]
+
+
+class IdCache:
+    """
+    username -> user_id eşlemelerini tutan SQLite önbelleği.
+
+    Bu ID'ler hiç değişmediği için kayıtların süresi dolmaz.
+    """
+
+    def __init__(self, path=ID_CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock:
+            # WAL: birden fazla süreç aynı anda okuyup yazabilir
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS user_ids ("
+                "username TEXT PRIMARY KEY, user_id TEXT NOT NULL, resolved_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def _get(self, table, key_column, value_column, key):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {value_column} FROM {table} WHERE {key_column} = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, table, key_column, value_column, key, value):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {table} ({key_column}, {value_column}, resolved_at) VALUES (?, ?, ?)",
+                (key, str(value), time.time()),
+            )
+            self._conn.commit()
+
+    def get_user_id(self, username):
+        return self._get("user_ids", "username", "user_id", username.lower())
+
+    def set_user_id(self, username, user_id):
+        self._set("user_ids", "username", "user_id", username.lower(), user_id)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_id_cache():
+    """
+    Süreç genelinde paylaşılan IdCache nesnesini döndürür.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = IdCache()
+        return _cache
+
+
+def resolve_user_id(cl, username):
+    """
+    Kullanıcı adından user_id'yi bulur; önce önbelleğe bakar, yoksa API'ye sorar.
+
+    Args:
+        cl: Instagram client objesi
+        username: Instagram kullanıcı adı
+
+    Returns:
+        str: user_id
+    """
+    cache = get_id_cache()
+    user_id = cache.get_user_id(username)
+    if user_id:
+        return user_id
+
+    try:
+        user_id = cl.user_id_from_username(username)
+    except Exception as e:
+        print(f"⚠ user_id_from_username hatası: {str(e)}")
+        # Alternatif yöntem dene
+        try:
+            user_info = cl.user_info_by_username(username)
+            user_id = user_info.pk
+        except Exception as e2:
+            raise Exception(f"Kullanıcı bilgisi alınamadı: {str(e2)}")
+
+    cache.set_user_id(username, user_id)
+    return str(user_id)
+
+
+def resolve_media_pk(shortcode):
+    """
+    Shortcode'dan media pk'yı yerelde çözer.
+
+    Çözümleme ağ isteği yapmadığı ve bir SQLite yazımından ucuz olduğu için önbelleğe yazılmaz.
+
+    Args:
+        shortcode: Gönderi shortcode'u
+
+    Returns:
+        str: Media pk veya geçersiz shortcode için None
+    """
+    media_pk = shortcode_to_pk(shortcode)
+    return str(media_pk) if media_pk is not None else None
@@ -0,0 +1,193 @@
+"""
+Instagram Insights
+Hesabın insights (reach/impressions) verisine erişip erişemediğini bir kez tespit edip önbellekler.
+Erişim yoksa gönderi başına boşa istek atılmaz; varsa insights ayrı ve eşzamanlı bir aşamada çekilir.
+Tespit sonuçları `instagram_capabilities.json` dosyasında saklanır.
+"""
+
+import os
+import json
+import threading
+import time
+from instagram_rate_limiter import is_throttle_error
+
+CAPABILITIES_FILE = os.getenv("INSTAGRAM_CAPABILITIES", "instagram_capabilities.json")
+# Hesap türü değişebileceği için tespit bu süre sonunda tekrarlanır (saniye)
+CAPABILITY_TTL = 7 * 86400
+INSIGHTS_WORKERS = int(os.getenv("INSTAGRAM_INSIGHTS_WORKERS", "4"))
+
+
+# Hesabın insights desteği olmadığını kesin gösteren hatalar (instagrapi yüklenmeden, adıyla eşleştirilir);
+# diğer hatalar (session, ağ, kısıtlama ...) destek hakkında bilgi vermez, sonuç önbelleğe yazılmaz
+NO_INSIGHTS_ERRORS = frozenset({
+    "ClientUnauthorizedError",
+    "ClientForbiddenError",
+})
+# instagrapi'nin yanıtta insights verisi olmadığında (kişisel hesap) verdiği MediaError mesajları
+NO_INSIGHTS_MESSAGES = (
+    "Instagram did not return insight data",
+    "Instagram returned media metadata without inline insights data",
+)
+
+
+def _is_no_insights_error(error):
+    """
+    Hatanın hesabın insights desteği olmadığını kesin gösterip göstermediğini döndürür.
+    """
+    if type(error).__name__ in NO_INSIGHTS_ERRORS:
+        return True
+    if type(error).__name__ == "MediaError" and str(error).startswith(NO_INSIGHTS_MESSAGES):
+        return True
+    return 403 in (getattr(error, "code", None), getattr(getattr(error, "response", None), "status_code", None))
+
+
+_lock = threading.Lock()
+_capabilities = None
+
+
+def _load_capabilities():
+    global _capabilities
+    if _capabilities is None:
+        _capabilities = {}
+        if os.path.exists(CAPABILITIES_FILE):
+            try:
+                with open(CAPABILITIES_FILE, "r", encoding="utf-8") as f:
+                    _capabilities = json.load(f)
+            except Exception:
+                _capabilities = {}
+    return _capabilities
+
+
+def _save_capability(username, available):
+    capabilities = _load_capabilities()
+    capabilities[username] = {"insights": available, "checked_at": time.time()}
+    tmp_path = f"{CAPABILITIES_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(capabilities, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, CAPABILITIES_FILE)
+    except Exception as e:
+        print(f"⚠ Insights tespiti kaydedilemedi: {str(e)[:80]}")
+
+
+def cached_insights_available(username):
+    """
+    Önbellekteki tespit sonucunu döndürür.
+
+    Returns:
+        bool: Tespit edildiyse True/False, henüz bilinmiyorsa None
+    """
+    with _lock:
+        entry = _load_capabilities().get(username)
+    if entry and time.time() - entry.get("checked_at", 0) < CAPABILITY_TTL:
+        return entry.get("insights")
+    return None
+
+
+def probe_insights(cl, username, media_pk):
+    """
+    Tek bir gönderi üzerinde insights isteği atarak hesabın desteğini tespit eder.
+
+    Args:
+        cl: Instagram client objesi
+        username: Hesap kullanıcı adı
+        media_pk: Deneme için kullanılacak gönderi pk'sı
+
+    Returns:
+        tuple: (destek var mı, deneme isteğinin insights sonucu veya None)
+    """
+    try:
+        insights = cl.media_insights(media_pk)
+    except Exception as e:
+        if not _is_no_insights_error(e):
+            reason = "kısıtlama" if is_throttle_error(e) else "geçici hata"
+            print(f"⚠ Insights tespiti yapılamadı ({reason}): {str(e)[:80]}")
+            return False, None
+        print(f"⚠ {username} hesabında insights yok (Business/Creator hesabı gerekebilir): {str(e)[:80]}")
+        with _lock:
+            _save_capability(username, False)
+        return False, None
+
+    with _lock:
+        _save_capability(username, True)
+    print(f"✓ {username} hesabında insights mevcut")
+    return True, insights
+
+
+def insights_available(cl, username, media_pk):
+    """
+    Hesabın insights desteğini önbellekten, yoksa tek bir deneme isteğiyle döndürür.
+
+    Returns:
+        tuple: (destek var mı, deneme isteği yapıldıysa sonucu)
+    """
+    available = cached_insights_available(username)
+    if available is not None:
+        return available, None
+    return probe_insights(cl, username, media_pk)
+
+
+def fetch_insights_batch(cl, username, media_pks, workers=INSIGHTS_WORKERS):
+    """
+    Birden fazla gönderinin insights verisini ayrı bir aşamada, eşzamanlı çeker.
+
+    İlk gönderi hesabın desteğini tespit etmek için kullanılır; destek yoksa başka istek atılmaz.
+
+    Args:
+        cl: Instagram client objesi
+        username: Hesap kullanıcı adı (önbellek anahtarı)
+        media_pks: Gönderi pk listesi
+        workers: Eşzamanlı istek sayısı
+
+    Returns:
+        dict: {media_pk: insights sözlüğü}
+    """
+    media_pks = list(media_pks)
+    if not media_pks:
+        return {}
+
+    # Her media_insights çağrısı client sarmalayıcısında hesabın sınırlayıcısından geçer
+    results = {}
+    available, probe_result = insights_available(cl, username, media_pks[0])
+    if not available:
+        return results
+    if probe_result is not None:
+        results[media_pks[0]] = probe_result
+        media_pks = media_pks[1:]
+
+    # Client thread-safe değildir: her iş parçacığı aynı session ile kendi kopyasını kullanır
+    local = threading.local()
+
+    def thread_client():
+        if not hasattr(local, "client"):
+            local.client = cl
+            if workers > 1 and callable(getattr(cl, "get_settings", None)):
+                from instagram_session import clone_client
+                local.client = clone_client(cl, on_login_required=getattr(cl, "_on_login_required", None))
+        return local.client
+
+    def fetch(media_pk):
+        try:
+            return media_pk, thread_client().media_insights(media_pk)
+        except Exception as e:
+            print(f"⚠ Gönderi {media_pk} için insights çekilemedi: {str(e)[:80]}")
+            return media_pk, None
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for media_pk, insights in executor.map(fetch, media_pks):
+            if insights:
+                results[media_pk] = insights
+    return results
+
+
+def apply_insights(stats, insights):
+    """
+    Insights verisini istatistik sözlüğüne işler (formatı değişebildiği için alternatif alanlar kontrol edilir).
+    """
+    if insights and isinstance(insights, dict):
+        stats["reach"] = insights.get("reach", insights.get("accounts_engaged", None))
+        stats["impressions"] = insights.get("impressions", insights.get("profile_visits", None))
+        stats["saves"] = insights.get("saves", stats.get("saves", 0))
+    return stats
@@ -4,48 +4,108 @@ Gönderi linkini verin, istatistikleri çeksin.
 """
 
 import os
-import json
-import re
-import requests
+import argparse
+import threading
 from datetime import datetime
-from dotenv import load_dotenv
-from instagrapi import Client
-from instagrapi.exceptions import LoginRequired
+from instagram_method_selector import get_selector
 
-load_dotenv()
-
-def extract_shortcode_from_url(url):
+class InFlight:
     """
-    Instagram URL'sinden shortcode çıkarır.
+    Aynı anahtar için eşzamanlı çağrıları tek çağrıda birleştirir.
     
-    Örnekler:
-    - https://www.instagram.com/p/ABC123/ -> ABC123
-    - https://www.instagram.com/reel/XYZ789/ -> XYZ789
+    Bir gönderi çekilirken aynı gönderi için gelen diğer çağrılar (eşzamanlı linkler, worker'daki
+    farklı işler) yeni istek atmaz, ilk çağrının sonucunu (veya hatasını) bekler. Çağrı bitince
+    anahtar bırakılır; sonuç önbelleklenmez.
     """
-    patterns = [
-        r'/p/([A-Za-z0-9_-]+)',
-        r'/reel/([A-Za-z0-9_-]+)',
-        r'/tv/([A-Za-z0-9_-]+)',
-    ]
     
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
     
-    return None
+    def do(self, key, function):
+        """
+        Returns:
+            tuple: (sonuç, başka bir çağrıyla birleştirildi mi)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": threading.Event(), "result": None, "error": None}
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"], True
+        try:
+            call["result"] = function()
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+        return call["result"], False
+
+# Süreç genelinde süren gönderi çekimleri (shortcode ile)
+_in_flight = InFlight()
 
-def get_media_from_link(cl, url):
+def get_media_from_link(cl, url, username=None, captions=None, media_urls=None):
     """
     Instagram gönderi linkinden medya bilgilerini çeker.
     
+    Aynı gönderi (/p/, /reel/, /tv/ farketmez) için süren bir çekim varsa yeni istek atılmaz,
+    onun sonucu kullanılır.
+    
     Args:
         cl: Instagram client objesi
         url: Instagram gönderi URL'si
+        username: Client'ın hesabı (insights desteği önbelleği için)
+        captions: Verilirse kısaltılmamış açıklama {shortcode: açıklama} olarak eklenir (açıklama indeksi için)
+        media_urls: Verilirse kapak görseli / video adresleri {shortcode: {"thumbnail", "video"}} olarak eklenir (medya önbelleği için)
     
     Returns:
         dict: Gönderi istatistikleri
     """
+    from instagram_id_cache import extract_shortcode_from_url
+
+    shortcode = extract_shortcode_from_url(url)
+    if not shortcode:
+        return _fetch_media(cl, url, username)
+    
+    def fetch():
+        extra_captions, extra_urls = {}, {}
+        stats = _fetch_media(cl, url, username, extra_captions, extra_urls)
+        return stats, extra_captions, extra_urls
+    
+    (stats, extra_captions, extra_urls), shared = _in_flight.do(shortcode, fetch)
+    if shared:
+        print(f"  ↻ {shortcode} süren bir istekle birleştirildi")
+    if captions is not None:
+        captions.update(extra_captions)
+    if media_urls is not None:
+        media_urls.update(extra_urls)
+    # Sonuç birleştirilen çağrılar arasında paylaşılır; her çağrı kendi linkiyle bir kopya alır
+    return dict(stats, url=url)
+
+def _fetch_media(cl, url, username=None, captions=None, media_urls=None):
+    """
+    Gönderinin medya bilgilerini çeker (get_media_from_link'in ağ isteği yapan kısmı).
+    
+    Args:
+        cl: Instagram client objesi
+        url: Instagram gönderi URL'si
+        username: Client'ın hesabı (insights desteği önbelleği için)
+        captions: Verilirse kısaltılmamış açıklama {shortcode: açıklama} olarak eklenir (açıklama indeksi için)
+        media_urls: Verilirse kapak görseli / video adresleri {shortcode: {"thumbnail", "video"}} olarak eklenir (medya önbelleği için)
+    
+    Returns:
+        dict: Gönderi istatistikleri veya hata bilgisi
+    """
+    from instagram_id_cache import extract_shortcode_from_url, resolve_media_pk
+    from instagram_insights import apply_insights, insights_available
+
     try:
         shortcode = extract_shortcode_from_url(url)
         if not shortcode:
@@ -53,36 +113,17 @@ def get_media_from_link(cl, url):
         
         print(f"Shortcode bulundu: {shortcode}")
         
-        # Farklı yöntemlerle medya bilgilerini çek
-        media = None
-        method_used = None
+        # Shortcode -> media_pk yerelde (ağ isteği olmadan) çözülür
+        media_pk = resolve_media_pk(shortcode)
         
-        # Yöntem 1: media_info (shortcode ile)
-        try:
-            media = cl.media_info(shortcode)
-            method_used = "media_info"
-            print(f"  ✓ Yöntem 1 başarılı: media_info")
-        except Exception as e1:
-            print(f"  ⚠ Yöntem 1 başarısız: {str(e1)[:80]}")
-            
-            # Yöntem 2: media_id ile
-            try:
-                media_id = cl.media_id(shortcode)
-                media = cl.media_info(media_id)
-                method_used = "media_info_by_id"
-                print(f"  ✓ Yöntem 2 başarılı: media_info_by_id")
-            except Exception as e2:
-                print(f"  ⚠ Yöntem 2 başarısız: {str(e2)[:80]}")
-                
-                # Yöntem 3: media_pk_from_code ile
-                try:
-                    media_pk = cl.media_pk_from_code(shortcode)
-                    media = cl.media_info(media_pk)
-                    method_used = "media_pk_from_code"
-                    print(f"  ✓ Yöntem 3 başarılı: media_pk_from_code")
-                except Exception as e3:
-                    print(f"  ⚠ Yöntem 3 başarısız: {str(e3)[:80]}")
-                    raise Exception(f"Tüm yöntemler başarısız. Instagram API'si değişmiş olabilir.")
+        # Farklı yöntemlerle medya bilgilerini çek
+        # Sıra, önceki çalıştırmalardaki başarı oranı ve gecikmeye göre belirlenir
+        method_used, media = get_selector("media_info").call({
+            "media_info": lambda: cl.media_info(media_pk),
+            "media_info_by_id": lambda: cl.media_info(cl.media_id(media_pk)),
+            "media_pk_from_code": lambda: cl.media_info(cl.media_pk_from_code(shortcode)),
+        })
+        print(f"  ✓ Başarılı: {method_used}")
         
         if not media:
             raise Exception("Medya bilgisi alınamadı.")
@@ -90,6 +131,7 @@ def get_media_from_link(cl, url):
         # İstatistikleri çıkar - hata yönetimi ile
         try:
             media_id = media.pk if hasattr(media, 'pk') else None
+            owner = getattr(getattr(media, 'user', None), 'username', None)
             media_type = getattr(media, 'media_type', None)
             taken_at = None
             if hasattr(media, 'taken_at') and media.taken_at:
@@ -101,16 +143,28 @@ def get_media_from_link(cl, url):
             caption = ""
             if hasattr(media, 'caption_text') and media.caption_text:
                 caption = media.caption_text[:200] + "..." if len(media.caption_text) > 200 else media.caption_text
+                if captions is not None:
+                    captions[shortcode] = media.caption_text
             
             likes = getattr(media, 'like_count', 0) or 0
             comments = getattr(media, 'comment_count', 0) or 0
             saves = getattr(media, 'saved_count', None) or 0
             plays = getattr(media, 'play_count', None) or 0
             
+            if media_urls is not None:
+                resources = getattr(media, 'resources', None) or []
+                thumbnail_url = getattr(media, 'thumbnail_url', None) or (resources and getattr(resources[0], 'thumbnail_url', None))
+                video_url = getattr(media, 'video_url', None)
+                media_urls[shortcode] = {
+                    "thumbnail": str(thumbnail_url) if thumbnail_url else None,
+                    "video": str(video_url) if video_url else None,
+                }
+            
         except Exception as e:
             print(f"  ⚠ İstatistik çıkarılırken hata: {str(e)[:80]}")
             # Minimum bilgilerle devam et
             media_id = None
+            owner = None
             media_type = None
             taken_at = None
             caption = ""
@@ -123,6 +177,7 @@ def get_media_from_link(cl, url):
             "shortcode": shortcode,
             "url": url,
             "media_id": media_id,
+            "owner": owner,
             "media_type": media_type,
             "taken_at": taken_at,
             "caption": caption,
@@ -136,15 +191,16 @@ def get_media_from_link(cl, url):
         }
         
         # Insights çekmeyi dene (Business/Creator hesabı gerektirir)
-        if media_id:
-            try:
-                insights = cl.media_insights(media_id)
-                if insights and isinstance(insights, dict):
-                    stats["reach"] = insights.get("reach", insights.get("accounts_engaged", None))
-                    stats["impressions"] = insights.get("impressions", insights.get("profile_visits", None))
-                    stats["saves"] = insights.get("saves", stats.get("saves", 0))
-            except Exception as e:
-                print(f"  ⚠ Insights çekilemedi: {str(e)[:80]}")
+        # Hesabın desteği bir kez tespit edilip önbelleklenir, yoksa istek atılmaz
+        username = username or getattr(cl, "username", None) or os.getenv("INSTAGRAM_USERNAME")
+        if media_id and username:
+            available, insights = insights_available(cl, username, media_id)
+            if available and insights is None:
+                try:
+                    insights = cl.media_insights(media_id)
+                except Exception as e:
+                    print(f"  ⚠ Insights çekilemedi: {str(e)[:80]}")
+            apply_insights(stats, insights)
         
         return stats
         
@@ -160,67 +216,139 @@ def get_media_from_link(cl, url):
             "saves": 0
         }
 
+def group_by_owner(records, default):
+    """
+    Kayıtları gönderi sahibinin kullanıcı adına göre gruplar.
+    
+    Metrik geçmişi ve açıklama indeksi hesap bazında tutulur; link modunda gönderiler farklı
+    hesaplara ait olabilir. Sahibi bilinmeyen (hatalı) kayıtlar `default` hesaba yazılır.
+    
+    Returns:
+        dict: {kullanıcı adı: kayıt listesi}
+    """
+    groups = {}
+    for record in records:
+        groups.setdefault(record.get("owner") or default, []).append(record)
+    return groups
+
 def login_to_instagram():
     """
     Instagram'a giriş yapar (session varsa kullanır).
-    """
-    username = os.getenv("INSTAGRAM_USERNAME")
-    password = os.getenv("INSTAGRAM_PASSWORD")
-    
-    if not username or not password:
-        raise Exception("INSTAGRAM_USERNAME ve INSTAGRAM_PASSWORD .env dosyasında tanımlı olmalıdır!")
     
-    cl = Client()
+    .env içindeki hesap(lar) için session havuzu oluşturur.
     
-    # Session dosyası varsa yükle
-    session_file = f"{username}_session.json"
-    if os.path.exists(session_file):
-        try:
-            cl.load_settings(session_file)
-            print(f"✓ Önceki session yüklendi: {username}")
-            # Session geçerli mi kontrol et
-            try:
-                cl.get_timeline_feed()
-                print(f"✓ Session geçerli, giriş yapıldı: {username}")
-                return cl
-            except:
-                print("⚠ Session geçersiz, yeni giriş yapılıyor...")
-        except:
-            print("⚠ Session yüklenemedi, yeni giriş yapılıyor...")
+    Returns:
+        SessionPool: Giriş yapılmış hesap havuzu
+    """
+    from instagram_session import SessionPool
+
+    pool = SessionPool.from_env()
+    return pool.login_all()
+
+def process_link(pool, url, index, total, captions=None, media_urls=None):
+    """
+    Tek bir linki sıradaki hesabın client'ıyla işler (istekler hesabın sınırlayıcısından geçer).
     
-    # Yeni giriş yap
-    print(f"Giriş yapılıyor: {username}...")
-    cl.login(username, password)
+    Args:
+        pool: Giriş yapılmış SessionPool
+        url: Instagram gönderi URL'si
+        index: Linkin sırası (1'den başlar)
+        total: Toplam link sayısı
+        captions: Kısaltılmamış açıklamaların toplandığı sözlük
+        media_urls: Medya adreslerinin toplandığı sözlük
     
-    # Session'ı kaydet
+    Returns:
+        dict: Gönderi istatistikleri veya hata bilgisi
+    """
+    username, cl = pool.next_client()
+    print(f"\n[{index}/{total}] İşleniyor: {url}")
     try:
-        cl.dump_settings(session_file)
-        print(f"✓ Session kaydedildi")
-    except:
-        pass
-    
-    print(f"✓ Başarıyla giriş yapıldı: {username}")
-    return cl
+        stats = get_media_from_link(cl, url, username, captions, media_urls)
+        print(f"  ✓ Beğeni: {stats['likes']}, Yorum: {stats['comments']}, Kaydedilme: {stats['saves']}")
+        return stats
+    except Exception as e:
+        print(f"  ✗ Hata: {str(e)[:100]}")
+        return {
+            "url": url,
+            "error": str(e)[:200]
+        }
 
-def main():
+def parse_args(argv=None):
+    """
+    Komut satırı argümanlarını okur.
+    """
+    parser = argparse.ArgumentParser(description="Instagram gönderi linklerinden istatistik çeker.")
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Aynı anda işlenecek link sayısı (varsayılan: 1, INSTAGRAM_WORKERS)"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=None,
+        help="Hesap başına en yüksek istek hızı, istek/sn (varsayılan: INSTAGRAM_RATE_MAX)"
+    )
+    parser.add_argument(
+        "--due", type=int, default=None, metavar="N",
+        help="Link dosyası yerine zamanlayıcıda vadesi gelen en fazla N gönderiyi yenile"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Önceki çalıştırmada başarıyla işlenen linkleri atla ve sonuc_link.ndjson dosyasına ekle"
+    )
+    parser.add_argument(
+        "--json", action="store_true",
+        help="Sonda klasik sonuc_link.json dosyasını da üret"
+    )
+    parser.add_argument(
+        "--delta", action="store_true",
+        help="Sadece yeni, değişen ve kaldırılan gönderileri sonuc_link_delta.ndjson dosyasına yaz (--db ile sadece bunlar yazılır)"
+    )
+    parser.add_argument(
+        "--delta-threshold", type=float, default=None,
+        help="Delta için göreli değişim eşiği, örn. 0.02 = %%2 (varsayılan: INSTAGRAM_DELTA_THRESHOLD veya 0)"
+    )
+    parser.add_argument(
+        "--db", action="store_true",
+        help="Sonuçları Content tablosuna toplu yaz (DATABASE_URL)"
+    )
+    parser.add_argument(
+        "--media", action="store_true",
+        help="Kapak görsellerini (INSTAGRAM_MEDIA_KINDS) instagram_media klasörüne indir"
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """
     Ana fonksiyon: Gönderi linklerinden istatistik çeker.
     """
+    args = parse_args(argv)
+    # .env ve depolama modülleri (sqlite3, hashlib ...), --help gibi ağ gerektirmeyen yollarda yüklenmez
+    from dotenv import load_dotenv
+    from instagram_caption_index import index_captions
+    from instagram_id_cache import dedupe_urls
+    from instagram_media_cache import cache_media
+    from instagram_metrics_store import record_snapshots
+    from instagram_ndjson import NdjsonWriter, completed_keys, iter_records, latest_index, latest_records, write_json
+    from instagram_rate_limiter import set_max_rate
+    load_dotenv()
     try:
         print("=" * 60)
         print("Instagram Gönderi Linkinden İstatistik Çekme")
         print("=" * 60)
         print()
         
-        # Giriş yap
-        cl = login_to_instagram()
-        
         # Gönderi linklerini al - önce dosyadan, yoksa kullanıcıdan
         urls = []
         
-        # Önce dosyadan oku
         link_file = "instagram_linkler.txt"
-        if os.path.exists(link_file):
+        if args.due is not None:
+            # Yaşına ve artış hızına göre vadesi gelen gönderiler (instagram_refresh_scheduler.py)
+            from instagram_refresh_scheduler import due_urls
+            urls = due_urls(budget=args.due)
+            print(f"⏱ Zamanlayıcıda vadesi gelen {len(urls)} gönderi yenilenecek")
+            if not urls:
+                return 0
+        # Önce dosyadan oku
+        elif os.path.exists(link_file):
             print(f"'{link_file}' dosyasından linkler okunuyor...")
             try:
                 with open(link_file, "r", encoding="utf-8") as f:
@@ -262,48 +390,111 @@ def main():
             print(f"\n💡 İPUCU: '{link_file}' dosyasına linkleri yazın, script otomatik okuyacak!")
             return 1
         
-        print(f"\n{len(urls)} gönderi işleniyor...")
+        # Aynı gönderinin /p/, /reel/, /tv/ veya sorgu dizeli kopyaları bir kez çekilir
+        unique = dedupe_urls(urls)
+        if len(unique) < len(urls):
+            print(f"\n↻ {len(urls) - len(unique)} link aynı gönderiyi tekrar gösteriyor, bir kez çekilecek")
+        urls = unique
+        
+        ndjson_file = "sonuc_link.ndjson"
+        output_file = "sonuc_link.json"
+        all_urls = urls
+        if args.resume:
+            done = completed_keys(ndjson_file, "url")
+            urls = [url for url in urls if url not in done]
+            print(f"\n↻ Devam modu: {len(all_urls) - len(urls)} link daha önce işlenmiş, atlanıyor")
+        
+        # Giriş linkler toplandıktan sonra yapılır; link yoksa instagrapi hiç yüklenmez
+        if args.rate is not None:
+            set_max_rate(args.rate)
+        pool = login_to_instagram()
+        
+        workers = max(1, args.workers if args.workers is not None else int(os.getenv("INSTAGRAM_WORKERS", "1")))
+        
+        print(f"\n{len(urls)} gönderi işleniyor... (eşzamanlı: {workers}, hesap: {len(pool.managers)})")
         print("-" * 60)
         
-        results = []
-        for i, url in enumerate(urls, 1):
-            print(f"\n[{i}/{len(urls)}] İşleniyor: {url}")
-            try:
-                stats = get_media_from_link(cl, url)
-                results.append(stats)
-                print(f"  ✓ Beğeni: {stats['likes']}, Yorum: {stats['comments']}, Kaydedilme: {stats['saves']}")
-            except Exception as e:
-                print(f"  ✗ Hata: {str(e)[:100]}")
-                results.append({
-                    "url": url,
-                    "error": str(e)[:200]
-                })
+        # Her sonuç işlendiği anda NDJSON dosyasına yazılır, çökme/ban durumunda kaybolmaz
+        total = len(urls)
+        captions = {}
+        media_urls = {} if args.media else None
+        with NdjsonWriter(ndjson_file, append=args.resume) as writer:
+            if workers == 1:
+                for i, url in enumerate(urls, 1):
+                    writer.write(process_link(pool, url, i, total, captions, media_urls))
+            else:
+                # executor.map giriş sırasını korur, çıktı sırası değişmez
+                from concurrent.futures import ThreadPoolExecutor
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    for stats in executor.map(
+                        lambda item: process_link(pool, item[1], item[0], total, captions, media_urls),
+                        enumerate(urls, 1)
+                    ):
+                        writer.write(stats)
         
-        # Sonuçları kaydet
-        output_data = {
-            "username": os.getenv("INSTAGRAM_USERNAME", "arhavalcom"),
-            "scraped_at": datetime.now().isoformat(),
-            "total_posts": len(results),
-            "method": "link_based",
-            "posts": results
-        }
+        scraped_at = datetime.now()
+        username = os.getenv("INSTAGRAM_USERNAME", "arhavalcom")
         
-        output_file = "sonuc_link.json"
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
+        # Metrik geçmişine ve açıklama indeksine gönderi sahibinin hesabıyla ekle (sadece bu çalıştırmada yazılan kayıtlar)
+        for owner, posts in group_by_owner(iter_records(ndjson_file, writer.start_offset), username).items():
+            record_snapshots(owner, posts, scraped_at)
+            index_captions(owner, posts, captions)
+        if args.media:
+            cache_media(iter_records(ndjson_file, writer.start_offset), media_urls)
+        
+        index = latest_index(ndjson_file, "url")
+        unique_urls = [url for url in dict.fromkeys(all_urls) if url in index]
         
         print("\n" + "=" * 60)
-        print(f"✓ İşlem tamamlandı! Sonuçlar '{output_file}' dosyasına kaydedildi.")
+        if args.json:
+            # Klasik JSON çıktısı (şema aynı, sıra linklerin sırası)
+            output_data = {
+                "username": username,
+                "scraped_at": scraped_at.isoformat(),
+                "total_posts": len(unique_urls),
+                "method": "link_based",
+            }
+            write_json(output_file, output_data, latest_records(ndjson_file, "url", order=unique_urls, index=index))
+            print(f"✓ İşlem tamamlandı! Sonuçlar '{output_file}' dosyasına kaydedildi.")
+        else:
+            print(f"✓ İşlem tamamlandı! Sonuçlar '{ndjson_file}' dosyasına kaydedildi.")
         print("=" * 60)
         
+        delta = None
+        if args.delta:
+            # Link dosyası tüm takip edilen gönderileri kapsar; --due ile sadece bir kısmı işlendiğinde
+            # listede olmayanlar kaldırılmış sayılmaz
+            from instagram_delta import DEFAULT_THRESHOLD, SCOPE_ALL, write_delta
+            delta = write_delta(
+                f"link:{username}", latest_records(ndjson_file, "url", order=unique_urls, index=index),
+                "sonuc_link_delta.ndjson",
+                threshold=args.delta_threshold if args.delta_threshold is not None else DEFAULT_THRESHOLD,
+                scope=SCOPE_ALL if args.due is None else None,
+            )
+        
+        if args.db:
+            from instagram_db_writer import write_to_content_table
+            if delta is not None:
+                from instagram_delta import upserts
+                write_to_content_table(upserts(delta))
+            else:
+                write_to_content_table(latest_records(ndjson_file, "url", order=unique_urls, index=index))
+        
         # Özet
-        successful = [r for r in results if "error" not in r]
-        total_likes = sum(post.get("likes", 0) for post in successful)
-        total_comments = sum(post.get("comments", 0) for post in successful)
-        total_saves = sum(post.get("saves", 0) for post in successful)
+        successful = 0
+        total_likes = 0
+        total_comments = 0
+        total_saves = 0
+        for post in latest_records(ndjson_file, "url", order=unique_urls, index=index):
+            if "error" in post:
+                continue
+            successful += 1
+            total_likes += post.get("likes", 0)
+            total_comments += post.get("comments", 0)
+            total_saves += post.get("saves", 0)
         
         print(f"\nÖzet:")
-        print(f"  Başarılı: {len(successful)}/{len(results)}")
+        print(f"  Başarılı: {successful}/{len(unique_urls)}")
         print(f"  Toplam Beğeni: {total_likes}")
         print(f"  Toplam Yorum: {total_comments}")
         print(f"  Toplam Kaydedilme: {total_saves}")
@@ -4,11 +4,10 @@ Gönderiler otomatik çekilemezse, manuel olarak girebilirsiniz.
 """
 
 import json
+import argparse
 from datetime import datetime
-from dotenv import load_dotenv
 import os
-
-load_dotenv()
+from instagram_metrics_store import record_snapshots
 
 def manuel_giris():
     """
@@ -83,9 +82,10 @@ def manuel_giris():
         print(f"✓ Gönderi {i} kaydedildi!")
     
     # Sonuçları kaydet
+    scraped_at = datetime.now()
     output_data = {
         "username": username,
-        "scraped_at": datetime.now().isoformat(),
+        "scraped_at": scraped_at.isoformat(),
         "total_posts": len(posts),
         "method": "manuel_giris",
         "posts": posts
@@ -95,6 +95,9 @@ def manuel_giris():
     with open(output_file, "w", encoding="utf-8") as f:
         json.dump(output_data, f, ensure_ascii=False, indent=2)
     
+    # Metrik geçmişine ekle (sonuç dosyası her çalıştırmada üzerine yazılır)
+    record_snapshots(username, posts, scraped_at)
+    
     print("\n" + "=" * 60)
     print(f"✓ İşlem tamamlandı! Sonuçlar '{output_file}' dosyasına kaydedildi.")
     print("=" * 60)
@@ -109,11 +112,23 @@ def manuel_giris():
     print(f"  Toplam Yorum: {total_comments}")
     print(f"  Toplam Kaydedilme: {total_saves}")
 
-if __name__ == "__main__":
+def main(argv=None):
+    """
+    Ana fonksiyon: .env'i okur ve manuel girişi başlatır.
+    """
+    argparse.ArgumentParser(description="Gönderi istatistiklerini elle girip kaydeder.").parse_args(argv)
+    from dotenv import load_dotenv
+    load_dotenv()
     try:
         manuel_giris()
     except KeyboardInterrupt:
         print("\n\nİşlem iptal edildi.")
+        return 1
     except Exception as e:
         print(f"\n✗ HATA: {str(e)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
 
@@ -0,0 +1,373 @@
+"""
+Instagram Medya Önbelleği
+Gönderilerin kapak görsellerini (ve istenirse videolarını) eşzamanlı indirip içerik adresli olarak
+saklar. Instagram CDN adresleri bir süre sonra geçersiz olduğu için panel bu dosyaları kullanabilir.
+
+- Dosyalar parça parça diske akıtılır (bellekte tamamı tutulmaz) ve SHA-256 özetleriyle
+  `instagram_media/<ilk 2 karakter>/<özet><uzantı>` olarak saklanır; aynı içerik bir kez tutulur.
+- Önbellekte olan gönderiler tekrar indirilmez.
+- Toplam boyut kotayı aşarsa en uzun süredir kullanılmayan dosyalar (LRU) silinir.
+
+Kullanım:
+    python instagram_media_cache.py stats
+    python instagram_media_cache.py path DSSpIC8Ajje
+    python instagram_media_cache.py evict --quota-mb 500
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlsplit
+
+MEDIA_DIR = os.getenv("INSTAGRAM_MEDIA_DIR", "instagram_media")
+MEDIA_DB_FILE = os.getenv("INSTAGRAM_MEDIA_DB", "instagram_media.db")
+MEDIA_QUOTA_MB = int(os.getenv("INSTAGRAM_MEDIA_QUOTA_MB", "2048"))
+MEDIA_CONCURRENCY = int(os.getenv("INSTAGRAM_MEDIA_CONCURRENCY", "8"))
+# İndirilecek medya türleri: thumbnail (kapak görseli), video
+MEDIA_KINDS = tuple(kind.strip() for kind in os.getenv("INSTAGRAM_MEDIA_KINDS", "thumbnail").split(",") if kind.strip())
+CHUNK_SIZE = 256 * 1024
+REQUEST_TIMEOUT = 30
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'image/avif,image/webp,image/*,video/*,*/*;q=0.8',
+    'Connection': 'keep-alive',
+}
+
+_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/heic": ".heic",
+    "video/mp4": ".mp4",
+}
+
+# Sorgu parametresi sınırı için IN listeleri bu boyutta parçalanır
+_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS assets (
+    shortcode TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    url TEXT,
+    hash TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (shortcode, kind)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_blobs_last_access ON blobs (last_access);
+CREATE INDEX IF NOT EXISTS idx_assets_hash ON assets (hash);
+"""
+
+
+def _extension(content_type, url):
+    ext = _EXTENSIONS.get((content_type or "").split(";")[0].strip().lower())
+    if ext:
+        return ext
+    ext = os.path.splitext(urlsplit(url).path)[1].lower()
+    return ext if ext in _EXTENSIONS.values() else ""
+
+
+def media_assets(posts, urls=None, kinds=MEDIA_KINDS):
+    """
+    Gönderilerin indirilecek medya adreslerini toplar.
+
+    Adresler `urls` sözlüğünden ({shortcode: {"thumbnail": ..., "video": ...}}), yoksa kaydın
+    `thumbnail_url` / `video_url` alanlarından alınır. Hatalı kayıtlar atlanır.
+
+    Returns:
+        list: (shortcode, tür, adres) demetleri
+    """
+    urls = urls or {}
+    assets = []
+    for post in posts:
+        shortcode = post.get("shortcode")
+        if not shortcode or shortcode == "unknown" or post.get("error"):
+            continue
+        known = urls.get(shortcode) or {}
+        for kind in kinds:
+            url = known.get(kind) or getattr(post, f"{kind}_url", None)
+            if url:
+                assets.append((shortcode, kind, str(url)))
+    return assets
+
+
+class MediaCache:
+    """
+    İçerik adresli medya dosyaları ve SQLite indeksi.
+
+    Args:
+        directory: Dosyaların saklandığı klasör
+        path: İndeks veritabanı
+        quota_mb: Toplam boyut üst sınırı (MB)
+    """
+
+    def __init__(self, directory=MEDIA_DIR, path=MEDIA_DB_FILE, quota_mb=MEDIA_QUOTA_MB):
+        self.directory = directory
+        self.quota = int(quota_mb * 1024 * 1024)
+        self._tmp_dir = os.path.join(directory, ".tmp")
+        os.makedirs(self._tmp_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._sessions = []
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def lookup(self, shortcode, kind="thumbnail"):
+        """
+        Gönderinin önbellekteki dosya yolunu döndürür (yoksa None) ve dosyayı kullanıldı sayar.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT b.hash, b.path FROM assets a JOIN blobs b ON b.hash = a.hash "
+                "WHERE a.shortcode = ? AND a.kind = ?",
+                (shortcode, kind),
+            ).fetchone()
+            if row is None:
+                return None
+            path = os.path.join(self.directory, row[1])
+            if not os.path.exists(path):
+                # Dosya elle silinmiş: kayıt da silinir, bir sonraki çalıştırmada tekrar indirilir
+                self._conn.execute("DELETE FROM blobs WHERE hash = ?", (row[0],))
+                self._conn.execute("DELETE FROM assets WHERE hash = ?", (row[0],))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE blobs SET last_access = ? WHERE hash = ?", (time.time(), row[0]))
+            self._conn.commit()
+        return path
+
+    def _cached(self, assets):
+        # Önbellekte olan gönderiler: son kullanım zamanları güncellenir, tekrar indirilmez
+        keys = {(shortcode, kind) for shortcode, kind, _ in assets}
+        shortcodes = sorted({shortcode for shortcode, _ in keys})
+        cached, hashes = set(), set()
+        with self._lock:
+            for i in range(0, len(shortcodes), _CHUNK):
+                chunk = shortcodes[i:i + _CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT a.shortcode, a.kind, a.hash FROM assets a JOIN blobs b ON b.hash = a.hash "
+                    f"WHERE a.shortcode IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+                for shortcode, kind, digest in rows:
+                    if (shortcode, kind) in keys:
+                        cached.add((shortcode, kind))
+                        hashes.add(digest)
+            now = time.time()
+            self._conn.executemany("UPDATE blobs SET last_access = ? WHERE hash = ?", ((now, h) for h in hashes))
+            self._conn.commit()
+        return cached
+
+    def _download(self, url):
+        """
+        Dosyayı geçici dosyaya parça parça indirir ve özetini hesaplar.
+
+        Returns:
+            tuple: (özet, geçici dosya, boyut, uzantı)
+        """
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = os.path.join(self._tmp_dir, f"{os.getpid()}.{threading.get_ident()}.tmp")
+        with self._session().get(url, stream=True, timeout=REQUEST_TIMEOUT) as response:
+            if response.status_code != 200:
+                raise Exception(f"HTTP {response.status_code}: Dosya alınamadı")
+            ext = _extension(response.headers.get("Content-Type"), url)
+            try:
+                with open(tmp_path, "wb") as f:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        digest.update(chunk)
+                        f.write(chunk)
+                        size += len(chunk)
+            except Exception:
+                os.remove(tmp_path)
+                raise
+        return digest.hexdigest(), tmp_path, size, ext
+
+    def _store(self, shortcode, kind, url, downloaded):
+        digest, tmp_path, size, ext = downloaded
+        relative = os.path.join(digest[:2], digest + ext)
+        now = time.time()
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone() is not None
+            exists = exists and os.path.exists(os.path.join(self.directory, relative))
+            if exists:
+                # Aynı içerik zaten var (başka gönderi veya adres): ikinci kopya tutulmaz
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.join(self.directory, digest[:2]), exist_ok=True)
+                os.replace(tmp_path, os.path.join(self.directory, relative))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO blobs (hash, path, size, last_access) VALUES (?, ?, ?, ?)",
+                (digest, relative, size, now),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO assets (shortcode, kind, url, hash, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (shortcode, kind, url, digest, now),
+            )
+            self._conn.commit()
+        return exists
+
+    def fetch(self, assets, concurrency=MEDIA_CONCURRENCY):
+        """
+        Önbellekte olmayan medyaları eşzamanlı indirir, sonra kotayı uygular.
+
+        Args:
+            assets: (shortcode, tür, adres) demetleri (bkz. media_assets)
+            concurrency: Eşzamanlı indirme sayısı
+
+        Returns:
+            dict: {"downloaded", "duplicate", "cached", "failed", "evicted"}
+        """
+        result = {"downloaded": 0, "duplicate": 0, "cached": 0, "failed": 0, "evicted": 0}
+        # Aynı gönderi ve tür bir kez indirilir
+        assets = list({(shortcode, kind): (shortcode, kind, url) for shortcode, kind, url in assets}.values())
+        cached = self._cached(assets)
+        pending = [asset for asset in assets if asset[:2] not in cached]
+        result["cached"] = len(assets) - len(pending)
+
+        def work(asset):
+            shortcode, kind, url = asset
+            try:
+                return "duplicate" if self._store(shortcode, kind, url, self._download(url)) else "downloaded"
+            except Exception as e:
+                print(f"  ⚠ {shortcode} ({kind}) indirilemedi: {str(e)[:100]}")
+                return "failed"
+
+        if pending:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="media") as executor:
+                for outcome in executor.map(work, pending):
+                    result[outcome] += 1
+        result["evicted"] = self.evict()
+        return result
+
+    def evict(self, quota=None):
+        """
+        Toplam boyut kotayı aşıyorsa en uzun süredir kullanılmayan dosyaları siler.
+
+        Args:
+            quota: Bayt cinsinden kota (varsayılan: nesnenin kotası)
+
+        Returns:
+            int: Silinen dosya sayısı
+        """
+        quota = self.quota if quota is None else quota
+        evicted = []
+        with self._lock:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= quota:
+                return 0
+            for digest, path, size in self._conn.execute(
+                "SELECT hash, path, size FROM blobs ORDER BY last_access"
+            ).fetchall():
+                if total <= quota:
+                    break
+                evicted.append((digest,))
+                total -= size
+                try:
+                    os.remove(os.path.join(self.directory, path))
+                except FileNotFoundError:
+                    pass
+            self._conn.executemany("DELETE FROM assets WHERE hash = ?", evicted)
+            self._conn.executemany("DELETE FROM blobs WHERE hash = ?", evicted)
+            self._conn.commit()
+        return len(evicted)
+
+    def stats(self):
+        with self._lock:
+            files, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+            assets = self._conn.execute("SELECT COUNT(*) FROM assets").fetchone()[0]
+        return {"files": files, "bytes": size, "assets": assets, "quota": self.quota}
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
+            self._conn.close()
+
+
+def cache_media(posts, urls=None):
+    """
+    Scriptlerin kullandığı kısayol: gönderilerin medyalarını önbelleğe indirir,
+    hata olursa sadece uyarır.
+    """
+    try:
+        assets = media_assets(posts, urls)
+        if not assets:
+            return None
+        cache = MediaCache()
+        try:
+            result = cache.fetch(assets)
+        finally:
+            cache.close()
+        print(f"✓ Medya önbelleği: {result['downloaded']} indirildi, {result['cached']} zaten vardı, "
+              f"{result['duplicate']} kopya, {result['failed']} hata"
+              + (f", {result['evicted']} eski dosya silindi" if result["evicted"] else ""))
+        return result
+    except Exception as e:
+        print(f"⚠ Medya önbelleğe alınamadı: {str(e)[:150]}")
+        return None
+
+
+def parse_args(argv=None):
+    """
+    Komut satırı argümanlarını okur.
+    """
+    parser = argparse.ArgumentParser(description="Instagram medya önbelleği (kapak görselleri / videolar).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Önbellekteki dosya sayısı ve toplam boyut")
+    path = commands.add_parser("path", help="Gönderinin önbellekteki dosya yolu")
+    path.add_argument("shortcode")
+    path.add_argument("--kind", default="thumbnail", choices=("thumbnail", "video"))
+    evict = commands.add_parser("evict", help="Kotayı aşan en eski kullanılan dosyaları sil")
+    evict.add_argument("--quota-mb", type=int, default=None, help=f"Kota (varsayılan: INSTAGRAM_MEDIA_QUOTA_MB veya {MEDIA_QUOTA_MB})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cache = MediaCache()
+    try:
+        if args.command == "stats":
+            stats = cache.stats()
+            print(f"{stats['files']} dosya ({stats['bytes'] / 1024 / 1024:.1f} MB / "
+                  f"kota {stats['quota'] / 1024 / 1024:.0f} MB), {stats['assets']} gönderi medyası")
+        elif args.command == "path":
+            path = cache.lookup(args.shortcode, args.kind)
+            if path is None:
+                print(f"⚠ {args.shortcode} önbellekte yok")
+                return 1
+            print(path)
+        elif args.command == "evict":
+            quota = args.quota_mb * 1024 * 1024 if args.quota_mb is not None else None
+            print(f"✓ {cache.evict(quota)} dosya silindi")
+    finally:
+        cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,259 @@
+"""
+Instagram Yöntem Seçici
+Aynı veriyi çeken alternatif API yöntemlerinin başarı oranını ve gecikmesini kaydeder,
+en iyi yöntemi önce dener ve sürekli hata veren yöntemleri devre kesiciyle (circuit breaker) kapatır.
+Durum `instagram_method_stats.json` dosyasında saklanır, çalıştırmalar arasında korunur.
+"""
+
+import os
+import json
+import atexit
+import threading
+import time
+from instagram_rate_limiter import is_throttle_error
+from instagram_telemetry import get_telemetry
+
+METHOD_STATS_FILE = os.getenv("INSTAGRAM_METHOD_STATS", "instagram_method_stats.json")
+# Bu kadar ardışık hatadan sonra devre açılır
+FAILURE_THRESHOLD = 3
+# Açık devre bu süre sonunda yarı-açık olur ve tek bir deneme isteğine izin verir (saniye)
+OPEN_COOLDOWN = int(os.getenv("INSTAGRAM_BREAKER_COOLDOWN", "600"))
+# Üstel hareketli ortalama katsayısı
+EWMA_ALPHA = 0.3
+# İstatistikler durum dosyasına en fazla bu sıklıkla yazılır; devre durumu değişince ve çıkışta hemen (saniye)
+SAVE_INTERVAL = 30
+
+# Yöntemle değil gönderiyle ilgili hatalar (silinmiş / gizli gönderi); yöntemin aleyhine sayılmaz
+# ve diğer yöntemlerle tekrar denenmez (instagrapi yüklenmeden, adıyla eşleştirilir)
+NOT_FOUND_ERRORS = frozenset({
+    "MediaNotFound",
+    "PrivateError",
+    "PrivateAccount",
+    "UserNotFound",
+})
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+def _new_method_stats():
+    return {
+        "success_rate": 1.0,
+        "latency": 1.0,
+        "calls": 0,
+        "failures": 0,
+        "consecutive_failures": 0,
+        "state": STATE_CLOSED,
+        "opened_at": None,
+    }
+
+
+class MethodSelector:
+    """
+    Bir yöntem grubunun (örn. user_medias / user_medias_v1 / user_medias_gql) istatistiklerini tutar.
+
+    Thread-safe; devre durumu değiştiğinde hemen, diğer sonuçlarda en fazla SAVE_INTERVAL
+    saniyede bir durum dosyasına yazılır (kalanlar süreç kapanırken).
+    """
+
+    def __init__(self, name, store):
+        self.name = name
+        self._store = store
+        self._probing = set()
+
+    def _stats(self, method):
+        group = self._store.state.setdefault(self.name, {})
+        if method not in group:
+            group[method] = _new_method_stats()
+        return group[method]
+
+    def _score(self, stats):
+        # Başarı oranı yüksek ve gecikmesi düşük yöntem önce
+        return stats["success_rate"] / max(stats["latency"], 0.05)
+
+    def order(self, methods):
+        """
+        Yöntemleri denenme sırasına dizer.
+
+        Kapalı devreler skora göre sıralanır. Bekleme süresi dolmuş açık devreler
+        yarı-açık olarak en başa alınır (aynı anda tek deneme). Diğer açık devreler atlanır;
+        hiç kullanılabilir yöntem kalmazsa tümü skora göre denenir.
+
+        Args:
+            methods: Yöntem adları (varsayılan sıra)
+
+        Returns:
+            list: Denenecek yöntem adları
+        """
+        now = time.time()
+        with self._store.lock:
+            probes = []
+            closed = []
+            for method in methods:
+                stats = self._stats(method)
+                if stats["state"] == STATE_CLOSED:
+                    closed.append(method)
+                elif method not in self._probing and now - (stats["opened_at"] or 0) >= OPEN_COOLDOWN:
+                    stats["state"] = STATE_HALF_OPEN
+                    self._probing.add(method)
+                    probes.append(method)
+
+            # sorted kararlı olduğu için eşit skorlarda varsayılan sıra korunur
+            closed.sort(key=lambda m: self._score(self._stats(m)), reverse=True)
+            ordered = probes + closed
+            if not ordered:
+                ordered = sorted(methods, key=lambda m: self._score(self._stats(m)), reverse=True)
+            return ordered
+
+    def record(self, method, success, latency):
+        """
+        Bir yöntem çağrısının sonucunu kaydeder ve devre durumunu günceller.
+        """
+        with self._store.lock:
+            stats = self._stats(method)
+            stats["calls"] += 1
+            stats["success_rate"] = (1 - EWMA_ALPHA) * stats["success_rate"] + EWMA_ALPHA * (1.0 if success else 0.0)
+            stats["latency"] = (1 - EWMA_ALPHA) * stats["latency"] + EWMA_ALPHA * latency
+            was_probe = method in self._probing
+            self._probing.discard(method)
+            previous_state = stats["state"]
+
+            if success:
+                stats["consecutive_failures"] = 0
+                if stats["state"] != STATE_CLOSED:
+                    print(f"  ✓ {self.name}/{method} tekrar çalışıyor, devre kapatıldı")
+                stats["state"] = STATE_CLOSED
+                stats["opened_at"] = None
+            else:
+                stats["failures"] += 1
+                stats["consecutive_failures"] += 1
+                if was_probe or stats["consecutive_failures"] >= FAILURE_THRESHOLD:
+                    if stats["state"] == STATE_CLOSED:
+                        print(f"  ⚠ {self.name}/{method} art arda başarısız, devre açıldı")
+                    stats["state"] = STATE_OPEN
+                    stats["opened_at"] = time.time()
+            if stats["state"] != previous_state:
+                self._store.save()
+            else:
+                self._store.mark_dirty()
+
+    def call(self, methods):
+        """
+        Yöntemleri en iyi sırayla dener, ilk başarılı sonucu döndürür.
+
+        Kısıtlama (bkz. is_throttle_error) ve bulunamadı hataları yönteme yazılmadan hemen
+        yükseltilir: kısıtlanmışken diğer yöntemleri denemek yükü artırır, silinmiş veya gizli
+        bir gönderi de sağlam bir yöntemin devresini açmamalıdır.
+
+        Args:
+            methods: {yöntem_adı: argümansız çağrılabilir} sözlüğü (varsayılan sırayla)
+
+        Returns:
+            tuple: (kullanılan yöntem adı, sonuç)
+        """
+        ordered = self.order(list(methods))
+        for i, method in enumerate(ordered):
+            started = time.monotonic()
+            try:
+                result = methods[method]()
+            except Exception as e:
+                if is_throttle_error(e) or type(e).__name__ in NOT_FOUND_ERRORS:
+                    self._release_probes(ordered[i:])
+                    raise
+                self.record(method, False, time.monotonic() - started)
+                print(f"  ⚠ {method} başarısız: {str(e)[:80]}")
+                if i < len(ordered) - 1:
+                    get_telemetry().record_retry(self.name)
+                continue
+            self.record(method, True, time.monotonic() - started)
+            self._release_probes(ordered[i + 1:])
+            return method, result
+        raise Exception("Tüm yöntemler başarısız. Instagram API'si değişmiş olabilir.")
+
+    def _release_probes(self, methods):
+        # Denenmeden kalan yarı-açık yöntemler bir sonraki çağrıda tekrar denenebilsin
+        with self._store.lock:
+            for method in methods:
+                if method in self._probing:
+                    self._probing.discard(method)
+                    self._stats(method)["state"] = STATE_OPEN
+
+
+class MethodStatsStore:
+    """
+    Tüm yöntem gruplarının durumunu JSON dosyasında saklar.
+    """
+
+    def __init__(self, path=METHOD_STATS_FILE):
+        self.path = path
+        self.lock = threading.RLock()
+        self.state = {}
+        self.dirty = False
+        self._saved_at = time.monotonic()
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.state = json.load(f)
+            except Exception:
+                print(f"⚠ '{path}' okunamadı, yöntem istatistikleri sıfırlanıyor...")
+                self.state = {}
+
+    def mark_dirty(self):
+        """
+        Kaydedilmemiş değişiklik olduğunu işaretler; son kayıttan SAVE_INTERVAL geçtiyse yazar.
+        """
+        with self.lock:
+            self.dirty = True
+            if time.monotonic() - self._saved_at >= SAVE_INTERVAL:
+                self.save()
+
+    def flush(self):
+        """
+        Kaydedilmemiş değişiklik varsa dosyaya yazar.
+        """
+        with self.lock:
+            if self.dirty:
+                self.save()
+
+    def save(self):
+        with self.lock:
+            self.dirty = False
+            self._saved_at = time.monotonic()
+            # Aynı dosyaya yazan süreçlerin geçici dosyaları çakışmasın
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self.state, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print(f"⚠ Yöntem istatistikleri kaydedilemedi: {str(e)[:80]}")
+
+
+_store = None
+_selectors = {}
+_selectors_lock = threading.Lock()
+
+
+def get_selector(name):
+    """
+    Adı verilen yöntem grubunun ortak seçicisini döndürür.
+    """
+    global _store
+    with _selectors_lock:
+        if _store is None:
+            _store = MethodStatsStore()
+            atexit.register(_store.flush)
+        selector = _selectors.get(name)
+        if selector is None:
+            selector = MethodSelector(name, _store)
+            _selectors[name] = selector
+        return selector
+
+
+def flush_selectors():
+    """
+    Kaydedilmemiş yöntem istatistiklerini yazar (atexit'in çalışmadığı alt süreçler için).
+    """
+    if _store is not None:
+        _store.flush()
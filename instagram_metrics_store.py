@@ -0,0 +1,261 @@
+"""
+Instagram Metrik Geçmişi
+Scriptlerin her çalıştırmada ürettiği gönderi metriklerini sadece ekleme yapılan (append-only)
+bir SQLite zaman serisine yazar. Eski kayıtlar sıkıştırma (compaction) ile önce saatlik,
+sonra günlük özetlere indirgenir.
+
+Kullanım:
+    python instagram_metrics_store.py history DSSpIC8Ajje
+    python instagram_metrics_store.py account arhavalcom
+    python instagram_metrics_store.py compact
+"""
+
+import os
+import sqlite3
+import argparse
+import threading
+import time
+from datetime import datetime
+
+METRICS_DB_FILE = os.getenv("INSTAGRAM_METRICS_DB", "instagram_metrics.db")
+
+METRIC_COLUMNS = ("likes", "comments", "saves", "plays", "reach", "impressions")
+
+RESOLUTION_RAW = "raw"
+RESOLUTION_HOURLY = "hourly"
+RESOLUTION_DAILY = "daily"
+
+# Bu süreden eski ham kayıtlar saatlik, saatlik kayıtlar günlük özete indirgenir (gün)
+RAW_RETENTION_DAYS = int(os.getenv("INSTAGRAM_METRICS_RAW_DAYS", "7"))
+HOURLY_RETENTION_DAYS = int(os.getenv("INSTAGRAM_METRICS_HOURLY_DAYS", "90"))
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS snapshots (
+    shortcode TEXT NOT NULL,
+    resolution TEXT NOT NULL,
+    scraped_at REAL NOT NULL,
+    username TEXT,
+    {", ".join(f"{column} INTEGER" for column in METRIC_COLUMNS)},
+    PRIMARY KEY (shortcode, resolution, scraped_at)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_snapshots_account ON snapshots (username, scraped_at);
+CREATE INDEX IF NOT EXISTS idx_snapshots_resolution ON snapshots (resolution, scraped_at);
+"""
+
+
+class MetricsStore:
+    """
+    (shortcode, scraped_at) ile indekslenmiş metrik anlık görüntüleri.
+
+    Birincil anahtar kümelenmiş (WITHOUT ROWID) olduğu için bir gönderinin geçmişi diskte
+    yan yana durur; sorgu süresi toplam satır sayısından bağımsız kalır.
+    """
+
+    def __init__(self, path=METRICS_DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def append(self, username, posts, scraped_at=None):
+        """
+        Gönderi metriklerini yeni anlık görüntüler olarak ekler.
+
+        Hatalı veya shortcode'u olmayan kayıtlar atlanır.
+
+        Args:
+            username: Hesap kullanıcı adı
+            posts: Gönderi sözlükleri (scriptlerin çıktısındaki "posts" listesi)
+            scraped_at: Çekim zamanı (datetime veya unix zamanı, varsayılan: şimdi)
+
+        Returns:
+            int: Eklenen kayıt sayısı
+        """
+        if scraped_at is None:
+            scraped_at = time.time()
+        elif isinstance(scraped_at, datetime):
+            scraped_at = scraped_at.timestamp()
+
+        rows = []
+        for post in posts:
+            shortcode = post.get("shortcode")
+            if not shortcode or shortcode == "unknown" or post.get("error"):
+                continue
+            rows.append(
+                (shortcode, RESOLUTION_RAW, scraped_at, username)
+                + tuple(post.get(column) for column in METRIC_COLUMNS)
+            )
+        if not rows:
+            return 0
+
+        placeholders = ", ".join("?" for _ in range(4 + len(METRIC_COLUMNS)))
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO snapshots (shortcode, resolution, scraped_at, username, "
+                f"{', '.join(METRIC_COLUMNS)}) VALUES ({placeholders})",
+                rows,
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def _query(self, where, params, start, end):
+        sql = f"SELECT shortcode, scraped_at, resolution, {', '.join(METRIC_COLUMNS)} FROM snapshots WHERE {where}"
+        if start is not None:
+            sql += " AND scraped_at >= ?"
+            params += (start,)
+        if end is not None:
+            sql += " AND scraped_at < ?"
+            params += (end,)
+        sql += " ORDER BY scraped_at"
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            columns = [d[0] for d in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def post_history(self, shortcode, start=None, end=None):
+        """
+        Bir gönderinin metrik geçmişini zamana göre sıralı döndürür (tüm çözünürlükler).
+
+        Args:
+            shortcode: Gönderi shortcode'u
+            start: Başlangıç (unix zamanı, dahil)
+            end: Bitiş (unix zamanı, hariç)
+
+        Returns:
+            list: Anlık görüntü sözlükleri
+        """
+        rows = []
+        # Her çözünürlük birincil anahtarın önekiyle aranır
+        for resolution in (RESOLUTION_DAILY, RESOLUTION_HOURLY, RESOLUTION_RAW):
+            rows.extend(self._query("shortcode = ? AND resolution = ?", (shortcode, resolution), start, end))
+        rows.sort(key=lambda row: row["scraped_at"])
+        return rows
+
+    def posts_history(self, shortcodes, start=None, end=None):
+        """
+        Birden çok gönderinin metrik geçmişini tek sorguda döndürür (tüm çözünürlükler).
+
+        Returns:
+            dict: {shortcode: zamana göre sıralı anlık görüntü listesi}
+        """
+        histories = {}
+        shortcodes = list(shortcodes)
+        # SQLite parametre sınırına takılmamak için parça parça sorgulanır
+        for i in range(0, len(shortcodes), 500):
+            chunk = tuple(shortcodes[i:i + 500])
+            for row in self._query(f"shortcode IN ({', '.join('?' for _ in chunk)})", chunk, start, end):
+                histories.setdefault(row["shortcode"], []).append(row)
+        return histories
+
+    def account_history(self, username, start=None, end=None):
+        """
+        Bir hesabın tüm gönderilerinin metrik geçmişini döndürür.
+        """
+        return self._query("username = ?", (username,), start, end)
+
+    def _downsample(self, source, target, bucket_seconds, older_than):
+        # Her kovada sayaçların en büyük değeri tutulur (beğeni/yorum sayıları zamanla artar)
+        bucket = f"CAST(scraped_at / {bucket_seconds} AS INTEGER) * {bucket_seconds}"
+        aggregates = ", ".join(f"MAX({column})" for column in METRIC_COLUMNS)
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO snapshots (shortcode, resolution, scraped_at, username, {', '.join(METRIC_COLUMNS)}) "
+            f"SELECT shortcode, ?, {bucket} AS bucket, MAX(username), {aggregates} "
+            f"FROM snapshots WHERE resolution = ? AND scraped_at < ? GROUP BY shortcode, bucket",
+            (target, source, older_than),
+        )
+        deleted = self._conn.execute(
+            "DELETE FROM snapshots WHERE resolution = ? AND scraped_at < ?", (source, older_than)
+        ).rowcount
+        return deleted
+
+    def compact(self, now=None):
+        """
+        Eski ham kayıtları saatlik, eski saatlik kayıtları günlük özete indirger.
+
+        Sınırlar kova boyutuna hizalanır, böylece yarım kalan saat/gün bölünmez.
+
+        Returns:
+            dict: Her aşamada silinen kaynak kayıt sayısı
+        """
+        if now is None:
+            now = time.time()
+        raw_cutoff = int((now - RAW_RETENTION_DAYS * 86400) // 3600 * 3600)
+        hourly_cutoff = int((now - HOURLY_RETENTION_DAYS * 86400) // 86400 * 86400)
+        with self._lock:
+            try:
+                raw = self._downsample(RESOLUTION_RAW, RESOLUTION_HOURLY, 3600, raw_cutoff)
+                hourly = self._downsample(RESOLUTION_HOURLY, RESOLUTION_DAILY, 86400, hourly_cutoff)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return {RESOLUTION_RAW: raw, RESOLUTION_HOURLY: hourly}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def record_snapshots(username, posts, scraped_at=None):
+    """
+    Scriptlerin kullandığı kısayol: sonuçları metrik geçmişine ekler ve gönderilerin bir sonraki
+    yenileme zamanını günceller, hata olursa sadece uyarır.
+    """
+    from instagram_refresh_scheduler import RefreshScheduler
+
+    try:
+        posts = list(posts)
+        if scraped_at is None:
+            scraped_at = time.time()
+        store = MetricsStore()
+        try:
+            count = store.append(username, posts, scraped_at)
+            scheduler = RefreshScheduler(store=store)
+            try:
+                scheduler.track(username, posts, scraped_at)
+            finally:
+                scheduler.close()
+        finally:
+            store.close()
+        print(f"✓ {count} gönderinin metrikleri geçmişe eklendi ({METRICS_DB_FILE})")
+        return count
+    except Exception as e:
+        print(f"⚠ Metrik geçmişi yazılamadı: {str(e)[:100]}")
+        return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Instagram metrik geçmişi")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    history = subparsers.add_parser("history", help="Bir gönderinin metrik geçmişi")
+    history.add_argument("shortcode")
+    account = subparsers.add_parser("account", help="Bir hesabın metrik geçmişi")
+    account.add_argument("username")
+    subparsers.add_parser("compact", help="Eski kayıtları saatlik/günlük özete indirger")
+    args = parser.parse_args(argv)
+
+    store = MetricsStore()
+    try:
+        if args.command == "compact":
+            result = store.compact()
+            print(f"✓ Sıkıştırma tamamlandı: {result[RESOLUTION_RAW]} ham, {result[RESOLUTION_HOURLY]} saatlik kayıt özetlendi")
+            return 0
+        if args.command == "history":
+            rows = store.post_history(args.shortcode)
+        else:
+            rows = store.account_history(args.username)
+        for row in rows:
+            when = datetime.fromtimestamp(row["scraped_at"]).isoformat(timespec="seconds")
+            print(f"{when}  {row['shortcode']:<14} [{row['resolution']:<6}] "
+                  f"Beğeni: {row['likes']}, Yorum: {row['comments']}, Kaydedilme: {row['saves']}")
+        print(f"\n{len(rows)} kayıt")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,297 @@
+"""
+Instagram Çoklu Hesap İstatistik Çekme
+Birden fazla hesabın (ContentCreator) son gönderilerini süreç havuzunda paralel çeker.
+Her alt süreç `INSTAGRAM_ACCOUNTS` listesinden bir giriş hesabı alır; session'ı ve hız sınırlayıcısı
+kendine aittir, böylece toplam süre hesap sayısıyla doğrusal artmaz. Sonuçlar ana süreçte tek bir
+NDJSON dosyasında birleşir (her kayıtta "account" alanı), metrik geçmişine ve istenirse
+Content tablosuna yazılır.
+
+Kullanım:
+    python instagram_multi_stats.py --accounts hesap1,hesap2 --json
+    python instagram_multi_stats.py --accounts-file hesaplar.txt --incremental
+    python instagram_multi_stats.py --from-db --db          # aktif ContentCreator'ların Instagram hesapları
+"""
+
+import time
+import argparse
+from datetime import datetime
+
+from instagram_records import PostRecord, as_dict
+from instagram_telemetry import get_telemetry
+
+NDJSON_FILE = "sonuc_multi.ndjson"
+JSON_FILE = "sonuc_multi.json"
+
+# Alt süreçteki giriş hesabı ve client'ı (süreç başına bir kez giriş yapılır)
+_account = None
+_client = None
+
+
+def load_targets(accounts=None, accounts_file=None, from_db=False, database_url=None):
+    """
+    Çekilecek hesapları okur; aynı hesap bir kez alınır.
+
+    Args:
+        accounts: Virgülle ayrılmış kullanıcı adları
+        accounts_file: Her satırda bir kullanıcı adı olan dosya (# ile başlayan satırlar atlanır)
+        from_db: Aktif ContentCreator kayıtlarının Instagram hesapları da eklensin mi
+        database_url: --from-db için veritabanı adresi (varsayılan: DATABASE_URL)
+
+    Returns:
+        list: {"username", "creator_id"} sözlükleri
+    """
+    targets = {}
+    names = []
+    if accounts:
+        names.extend(accounts.split(","))
+    if accounts_file:
+        with open(accounts_file, "r", encoding="utf-8") as f:
+            names.extend(line for line in f if not line.strip().startswith("#"))
+    for name in names:
+        username = name.strip().lstrip("@")
+        if username:
+            targets.setdefault(username.lower(), {"username": username, "creator_id": None})
+
+    if from_db:
+        from instagram_db_writer import ContentWriter, default_database_url
+        database_url = database_url or default_database_url()
+        if not database_url:
+            raise Exception("--from-db için DATABASE_URL tanımlı olmalıdır!")
+        writer = ContentWriter(database_url)
+        try:
+            creators = writer.instagram_creators()
+        finally:
+            writer.close()
+        print(f"✓ Veritabanında Instagram hesabı olan {len(creators)} içerik üreticisi bulundu")
+        for creator in creators:
+            target = targets.setdefault(creator["username"].lower(), {"username": creator["username"], "creator_id": None})
+            target["creator_id"] = creator["creator_id"]
+    return list(targets.values())
+
+
+def _init_worker(accounts):
+    """
+    Alt süreç başlarken kuyruktan kendi giriş hesabını alır.
+    """
+    global _account
+    _account = accounts.get()
+
+
+def _get_client():
+    global _client
+    if _client is None:
+        from instagram_session import SessionManager
+        _client = SessionManager(*_account).get_client()
+    return _client
+
+
+def scrape_account(task):
+    """
+    Alt süreçte tek bir hesabın gönderilerini çeker.
+
+    Args:
+        task: {"username", "limit", "incremental", "window", "checkpoint", "media"}
+
+    Returns:
+        dict: {"username", "login", "records", "captions", "media", "checkpoint", "error", "seconds", "telemetry"}
+    """
+    # instagram_stats alt süreçte yüklenir (ana süreç sadece sonuçları birleştirir)
+    from instagram_insights import apply_insights, fetch_insights_batch
+    from instagram_method_selector import flush_selectors
+    from instagram_scrape_state import update_checkpoint
+    from instagram_stats import get_user_media, get_user_media_incremental, to_records
+
+    username = task["username"]
+    started = time.perf_counter()
+    result = {"username": username, "login": _account[0], "records": [], "captions": {}, "media": {}, "checkpoint": None, "error": None}
+    try:
+        cl = _get_client()
+        state = {}
+        checkpoint = task.get("checkpoint")
+        if checkpoint:
+            state[username] = dict(checkpoint)
+            records, resume = get_user_media_incremental(cl, username, checkpoint, window=task["window"])
+        else:
+            records, resume = to_records(get_user_media(cl, username, limit=task["limit"])), None
+        if task["incremental"]:
+            result["checkpoint"] = update_checkpoint(state, username, records, resume)
+
+        posts = [record for record in records if isinstance(record, PostRecord)]
+        insights = fetch_insights_batch(cl, username, [record.media_id for record in posts])
+        for record in posts:
+            apply_insights(record, insights.get(record.media_id))
+        result["records"] = [dict(as_dict(record), account=username) for record in records]
+        # Kısaltılmamış açıklamalar çıktıya yazılmaz, ana süreçte indekslenir
+        result["captions"] = {record.shortcode: record.full_caption for record in posts if record.full_caption}
+        if task.get("media"):
+            # Dosyalar ana süreçte indirilir (önbelleğe tek süreç yazar)
+            result["media"] = {
+                record.shortcode: {"thumbnail": record.thumbnail_url, "video": record.video_url} for record in posts
+            }
+    except Exception as e:
+        result["error"] = str(e)[:200]
+    finally:
+        # Havuzdaki alt süreçler atexit çalıştırmadan kapanır
+        flush_selectors()
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    # Alt sürecin telemetrisi ana sürecin dosyalarına eklenir
+    result["telemetry"] = get_telemetry().snapshot(reset=True)
+    return result
+
+
+def parse_args(argv=None):
+    """
+    Komut satırı argümanlarını okur.
+    """
+    parser = argparse.ArgumentParser(description="Birden fazla Instagram hesabının istatistiklerini paralel çeker.")
+    parser.add_argument("--accounts", default=None, help="Virgülle ayrılmış kullanıcı adları")
+    parser.add_argument("--accounts-file", default=None, help="Her satırda bir kullanıcı adı olan dosya")
+    parser.add_argument(
+        "--from-db", action="store_true",
+        help="Aktif ContentCreator kayıtlarının channelUrl alanındaki Instagram hesaplarını çek"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Alt süreç sayısı (varsayılan ve üst sınır: INSTAGRAM_ACCOUNTS'taki giriş hesabı sayısı)"
+    )
+    parser.add_argument("--limit", type=int, default=5, help="Hesap başına çekilecek gönderi sayısı (varsayılan: 5)")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Checkpoint'i olan hesaplarda sadece yeni gönderileri ve son --window gönderiyi çek"
+    )
+    parser.add_argument(
+        "--window", type=int, default=5,
+        help="Artımlı modda metrikleri tekrar çekilecek eski gönderi sayısı (varsayılan: 5)"
+    )
+    parser.add_argument("--json", action="store_true", help=f"Sonda {JSON_FILE} dosyasını da üret")
+    parser.add_argument(
+        "--db", action="store_true",
+        help="Sonuçları Content tablosuna yaz (--from-db ile gelen gönderiler üreticisine atanır)"
+    )
+    parser.add_argument(
+        "--media", action="store_true",
+        help="Kapak görsellerini (INSTAGRAM_MEDIA_KINDS) instagram_media klasörüne indir"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Ana fonksiyon: hesapları süreç havuzunda çeker ve sonuçları tek dosyada birleştirir.
+    """
+    args = parse_args(argv)
+    # .env ve depolama modülleri (sqlite3, hashlib ...), --help gibi ağ gerektirmeyen yollarda yüklenmez
+    from dotenv import load_dotenv
+    from instagram_caption_index import index_captions
+    from instagram_media_cache import cache_media
+    from instagram_metrics_store import record_snapshots
+    from instagram_ndjson import NdjsonWriter, latest_index, latest_records, write_json
+    from instagram_scrape_state import load_state, save_state, get_checkpoint
+    load_dotenv()
+    try:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        from instagram_session import load_accounts_from_env
+
+        targets = load_targets(args.accounts, args.accounts_file, args.from_db)
+        if not targets:
+            raise Exception("Çekilecek hesap yok: --accounts, --accounts-file veya --from-db kullanın!")
+        logins = load_accounts_from_env()
+        # Her alt süreç ayrı bir giriş hesabı kullanır
+        workers = max(1, min(args.workers or len(logins), len(logins), len(targets)))
+
+        print("=" * 50)
+        print("Instagram Çoklu Hesap İstatistik Çekme")
+        print("=" * 50)
+        print(f"Hesap: {len(targets)}, alt süreç: {workers} ({', '.join(username for username, _ in logins[:workers])})")
+        print("-" * 50)
+
+        state = load_state() if args.incremental else {}
+        creators = {target["username"]: target["creator_id"] for target in targets}
+        content_writer = None
+        if args.db:
+            from instagram_db_writer import ContentWriter, default_database_url
+            database_url = default_database_url()
+            if database_url:
+                content_writer = ContentWriter(database_url)
+            else:
+                print("⚠ DATABASE_URL tanımlı değil, veritabanına yazılmayacak")
+
+        context = multiprocessing.get_context()
+        queue = context.Queue()
+        for login in logins[:workers]:
+            queue.put(login)
+
+        started = time.perf_counter()
+        scraped_at = datetime.now()
+        failed = []
+        # Artımlı modda önceki kayıtlar korunur; her gönderinin son kaydı geçerlidir
+        with NdjsonWriter(NDJSON_FILE, append=args.incremental) as writer, ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(queue,)
+        ) as pool:
+            futures = [
+                pool.submit(scrape_account, {
+                    "username": target["username"],
+                    "limit": args.limit,
+                    "incremental": args.incremental,
+                    "window": args.window,
+                    "checkpoint": get_checkpoint(state, target["username"]) if args.incremental else None,
+                    "media": args.media,
+                })
+                for target in targets
+            ]
+            for i, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                username = result["username"]
+                get_telemetry().merge(result["telemetry"])
+                if result["error"]:
+                    failed.append(username)
+                    print(f"[{i}/{len(targets)}] ✗ {username}: {result['error']}")
+                    continue
+
+                records = result["records"]
+                for record in records:
+                    writer.write(record)
+                writer.checkpoint()
+                record_snapshots(username, records, scraped_at)
+                index_captions(username, records, result["captions"])
+                if args.media:
+                    cache_media(records, result["media"])
+                if result["checkpoint"] is not None:
+                    state[username] = result["checkpoint"]
+                    save_state(state)
+                if content_writer is not None:
+                    try:
+                        content_writer.upsert(records, creator_id=creators.get(username))
+                    except Exception as e:
+                        print(f"⚠ {username} veritabanına yazılamadı: {str(e)[:150]}")
+                print(f"[{i}/{len(targets)}] ✓ {username}: {len(records)} gönderi "
+                      f"({result['seconds']:.1f} sn, {result['login']})")
+        if content_writer is not None:
+            content_writer.close()
+
+        elapsed = time.perf_counter() - started
+        index = latest_index(NDJSON_FILE, "shortcode")
+        print("\n" + "=" * 50)
+        if args.json:
+            write_json(JSON_FILE, {
+                "accounts": [target["username"] for target in targets if target["username"] not in failed],
+                "scraped_at": scraped_at.isoformat(),
+                "total_posts": len(index),
+            }, latest_records(NDJSON_FILE, "shortcode", index=index))
+            print(f"✓ İşlem tamamlandı! Sonuçlar '{JSON_FILE}' dosyasına kaydedildi.")
+        else:
+            print(f"✓ İşlem tamamlandı! Sonuçlar '{NDJSON_FILE}' dosyasına kaydedildi.")
+        print(f"  {len(targets) - len(failed)}/{len(targets)} hesap, {elapsed:.1f} sn")
+        if failed:
+            print(f"  ⚠ Çekilemeyen hesaplar: {', '.join(failed)}")
+        print("=" * 50)
+        return 1 if len(failed) == len(targets) else 0
+
+    except Exception as e:
+        print(f"\n✗ HATA: {str(e)}")
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
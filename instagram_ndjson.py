@@ -0,0 +1,216 @@
+"""
+Instagram NDJSON Çıktısı
+Sonuçları bellekte biriktirmek yerine kayıt kayıt NDJSON dosyasına yazar ve belirli aralıklarla
+fsync ile diske sabitler. Script yarıda kesilirse `--resume` ile kalınan yerden devam edilir;
+klasik JSON çıktısı istenirse sonda NDJSON'dan üretilir.
+"""
+
+import os
+import json
+import time
+from instagram_records import as_dict
+
+# Bu kadar kayıtta veya bu kadar saniyede bir fsync yapılır
+FSYNC_EVERY = 25
+FSYNC_INTERVAL = 5.0
+
+
+class NdjsonWriter:
+    """
+    Kayıtları satır satır JSON olarak yazar.
+
+    Args:
+        path: NDJSON dosya yolu
+        append: True ise mevcut dosyaya eklenir (resume), False ise dosya sıfırlanır
+    """
+
+    def __init__(self, path, append=False, fsync_every=FSYNC_EVERY, fsync_interval=FSYNC_INTERVAL):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        if append:
+            _repair_tail(path)
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+        # Bu çalıştırmada yazılan kayıtlar bu konumdan başlar
+        self.start_offset = os.path.getsize(path)
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self.count = 0
+
+    def write(self, record):
+        """
+        Kaydı (sözlük veya PostRecord) tek satır olarak yazar.
+        """
+        self._file.write(json.dumps(as_dict(record), ensure_ascii=False) + "\n")
+        self.count += 1
+        self._pending += 1
+        if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """
+        Yazılanları diske sabitler; bu noktaya kadarki kayıtlar çökmeye karşı güvendedir.
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.checkpoint()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _repair_tail(path):
+    """
+    Çökme sırasında yarım yazılmış son satırı atar, böylece eklenen kayıtlar bozulmaz.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Son satır sonunu bul
+        position = size - 1
+        chunk = 4096
+        while position > 0:
+            start = max(0, position - chunk)
+            f.seek(start)
+            data = f.read(position - start)
+            index = data.rfind(b"\n")
+            if index != -1:
+                f.truncate(start + index + 1)
+                return
+            position = start
+        f.truncate(0)
+
+
+def iter_records(path, offset=0):
+    """
+    NDJSON dosyasındaki kayıtları sırayla döndürür; bozuk satırlar atlanır.
+
+    Args:
+        path: NDJSON dosya yolu
+        offset: Okumaya başlanacak bayt konumu (örn. NdjsonWriter.start_offset)
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def completed_keys(path, key):
+    """
+    Hatasız tamamlanmış kayıtların anahtarlarını döndürür (`--resume` için).
+
+    Args:
+        path: NDJSON dosya yolu
+        key: Kayıt anahtarı ("url" veya "shortcode")
+
+    Returns:
+        set: Tamamlanmış anahtarlar
+    """
+    return {
+        record.get(key) for record in iter_records(path)
+        if record.get(key) and not record.get("error")
+    }
+
+
+def latest_index(path, key):
+    """
+    Her anahtarın son kaydının dosyadaki konumunu döndürür.
+
+    Returns:
+        dict: {anahtar: bayt konumu}
+    """
+    offsets = {}
+    if not os.path.exists(path):
+        return offsets
+    with open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            try:
+                offsets[json.loads(line).get(key)] = offset
+            except ValueError:
+                pass
+            offset += len(line)
+    return offsets
+
+
+def latest_records(path, key, order=None, index=None):
+    """
+    Her anahtarın en son kaydını döndürür; dosya boyutundan bağımsız olarak bellekte sadece
+    anahtar -> dosya konumu tutulur.
+
+    Args:
+        path: NDJSON dosya yolu
+        key: Kayıt anahtarı
+        order: İstenen anahtar sırası (None ise dosyadaki sıra)
+        index: Önceden hesaplanmış latest_index sonucu
+
+    Yields:
+        dict: Kayıt
+    """
+    offsets = index if index is not None else latest_index(path, key)
+    if not offsets:
+        return
+    keys = order if order is not None else sorted(offsets, key=offsets.get)
+    emitted = set()
+    with open(path, "rb") as f:
+        for record_key in keys:
+            if record_key not in offsets or record_key in emitted:
+                continue
+            emitted.add(record_key)
+            f.seek(offsets[record_key])
+            yield json.loads(f.readline())
+
+
+def write_json(path, header, records):
+    """
+    Klasik (indent=2) JSON çıktısını kayıtları tek tek yazarak üretir.
+
+    Çıktı `json.dump({**header, "posts": [...]}, indent=2)` ile aynıdır;
+    "total_posts" alanı header'da verilmelidir.
+
+    Args:
+        path: JSON dosya yolu
+        header: "posts" dışındaki alanlar (sırası korunur)
+        records: Gönderi kayıtları (iterable, sözlük veya PostRecord)
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("{\n")
+        for name, value in header.items():
+            f.write(f"  {json.dumps(name, ensure_ascii=False)}: {_indent(json.dumps(value, ensure_ascii=False, indent=2), 2)},\n")
+        f.write('  "posts": [')
+        first = True
+        for record in records:
+            f.write("\n    " if first else ",\n    ")
+            f.write(_indent(json.dumps(as_dict(record), ensure_ascii=False, indent=2), 4))
+            first = False
+        f.write("]\n}" if first else "\n  ]\n}")
+    os.replace(tmp_path, path)
+
+
+def _indent(text, spaces):
+    return text.replace("\n", "\n" + " " * spaces)
@@ -5,89 +5,87 @@ Web scraping ile Instagram'dan direkt veri çeker (instagrapi olmadan)
 
 import os
 import json
-import re
-import requests
+import argparse
 from datetime import datetime
-from dotenv import load_dotenv
+from instagram_embed_fetcher import DEFAULT_CONCURRENCY, embed_url, fetch_embeds
+from instagram_embed_parser import parse_embed
+from instagram_id_cache import dedupe_urls, extract_shortcode_from_url
+from instagram_metrics_store import record_snapshots
 
-load_dotenv()
+def build_stats(url, shortcode, response):
+    """
+    Embed sayfası yanıtından gönderi istatistiklerini oluşturur.
+    """
+    if not response.ok:
+        return {"error": response.error or "Sayfa alınamadı"}
+    
+    # Embed sayfası sadece herkese açık sayıları verir; kaydedilme ve insights için Graph API gerekir
+    parsed = parse_embed(response.body)
+    if parsed["likes"] is None and parsed["comments"] is None:
+        return {"error": "Embed sayfasında metrik bulunamadı (gönderi gizli veya kaldırılmış olabilir)"}
+    
+    caption = parsed["caption"] or ""
+    return {
+        "shortcode": shortcode,
+        "url": url,
+        "taken_at": parsed["taken_at"],
+        "caption": caption[:100] + "..." if len(caption) > 100 else caption,
+        "likes": parsed["likes"] or 0,
+        "comments": parsed["comments"] or 0,
+        "plays": parsed["plays"],
+        # Bilinmiyor: 0 yazılırsa veritabanındaki gerçek kaydedilme sayısının üzerine yazılır
+        "saves": None
+    }
+
+def get_media_stats_from_urls(urls, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Instagram gönderi URL'lerinden web scraping ile veri çeker.
+    
+    Embed sayfaları keep-alive bağlantılarla eşzamanlı ve koşullu (ETag/Last-Modified) isteklerle çekilir.
+    
+    Returns:
+        list: Her URL için istatistik sözlüğü (giriş sırasıyla)
+    """
+    shortcodes = [extract_shortcode_from_url(url) for url in urls]
+    embed_urls = [embed_url(shortcode) for shortcode in shortcodes if shortcode]
+    responses = iter(fetch_embeds(embed_urls, concurrency=concurrency))
+    
+    results = []
+    for url, shortcode in zip(urls, shortcodes):
+        if not shortcode:
+            results.append({"error": "URL'den shortcode çıkarılamadı"})
+            continue
+        try:
+            response = next(responses)
+            results.append(build_stats(url, shortcode, response))
+        except Exception as e:
+            results.append({"error": str(e)[:200]})
+    return results
 
 def get_media_stats_from_url(url):
     """
     Instagram gönderi URL'sinden web scraping ile veri çeker.
     """
-    try:
-        # URL'den shortcode çıkar
-        shortcode = None
-        patterns = [
-            r'/p/([A-Za-z0-9_-]+)',
-            r'/reel/([A-Za-z0-9_-]+)',
-            r'/tv/([A-Za-z0-9_-]+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                shortcode = match.group(1)
-                break
-        
-        if not shortcode:
-            return {"error": "URL'den shortcode çıkarılamadı"}
-        
-        # Instagram public sayfasına istek at
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-        }
-        
-        # Instagram embed endpoint'i kullan
-        embed_url = f"https://www.instagram.com/p/{shortcode}/embed/"
-        
-        print(f"Veri çekiliyor: {shortcode}...")
-        response = requests.get(embed_url, headers=headers, timeout=10)
-        
-        if response.status_code != 200:
-            return {"error": f"HTTP {response.status_code}: Sayfa alınamadı"}
-        
-        html = response.text
-        
-        # JSON-LD veya script tag'lerinden veri çıkar
-        # Instagram embed sayfasında meta tag'ler var
-        stats = {
-            "shortcode": shortcode,
-            "url": url,
-            "likes": 0,
-            "comments": 0,
-            "saves": 0,
-            "error": None
-        }
-        
-        # Meta tag'lerden veri çekmeyi dene
-        # Instagram embed sayfası sınırlı bilgi verir
-        # Daha iyi sonuç için Instagram Graph API gerekir
-        
-        # Alternatif: Instagram Graph API kullan
-        # Bu için Facebook Developer hesabı ve uygulama gerekiyor
-        
-        return {
-            "shortcode": shortcode,
-            "url": url,
-            "note": "Web scraping ile sınırlı veri çekilebilir. Instagram Graph API önerilir.",
-            "likes": 0,
-            "comments": 0,
-            "saves": 0
-        }
-        
-    except Exception as e:
-        return {"error": str(e)[:200]}
+    return get_media_stats_from_urls([url], concurrency=1)[0]
+
+def parse_args(argv=None):
+    """
+    Komut satırı argümanlarını okur.
+    """
+    parser = argparse.ArgumentParser(description="Instagram embed sayfalarından (girişsiz) istatistik çeker.")
+    parser.add_argument(
+        "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+        help="Aynı anda çekilecek sayfa sayısı (varsayılan: INSTAGRAM_EMBED_CONCURRENCY)"
+    )
+    return parser.parse_args(argv)
 
-def main():
+def main(argv=None):
     """
     Ana fonksiyon
     """
+    args = parse_args(argv)
+    from dotenv import load_dotenv
+    load_dotenv()
     print("=" * 60)
     print("Instagram Otomatik Veri Çekme - Alternatif Yöntem")
     print("=" * 60)
@@ -118,23 +116,29 @@ def main():
         print("⚠ 'instagram_linkler.txt' dosyasında link bulunamadı!")
         return 1
     
+    # Aynı gönderinin /p/, /reel/, /tv/ veya sorgu dizeli kopyaları bir kez çekilir
+    unique = dedupe_urls(urls)
+    if len(unique) < len(urls):
+        print(f"↻ {len(urls) - len(unique)} link aynı gönderiyi tekrar gösteriyor, bir kez çekilecek")
+    urls = unique
+    
     print(f"{len(urls)} link işleniyor...")
     print("-" * 60)
     
-    results = []
-    for i, url in enumerate(urls, 1):
+    results = get_media_stats_from_urls(urls, concurrency=args.concurrency)
+    for i, (url, stats) in enumerate(zip(urls, results), 1):
         print(f"\n[{i}/{len(urls)}] {url}")
-        stats = get_media_stats_from_url(url)
-        results.append(stats)
         if "error" not in stats:
-            print(f"  ✓ İşlendi")
+            print(f"  ✓ Beğeni: {stats['likes']}, Yorum: {stats['comments']}")
         else:
             print(f"  ✗ Hata: {stats.get('error', 'Bilinmeyen hata')}")
     
     # Sonuçları kaydet
+    username = os.getenv("INSTAGRAM_USERNAME", "arhavalcom")
+    scraped_at = datetime.now()
     output_data = {
-        "username": os.getenv("INSTAGRAM_USERNAME", "arhavalcom"),
-        "scraped_at": datetime.now().isoformat(),
+        "username": username,
+        "scraped_at": scraped_at.isoformat(),
         "total_posts": len(results),
         "method": "web_scraping_alternative",
         "note": "Bu yöntem sınırlıdır. Instagram Graph API kullanılmalıdır.",
@@ -145,6 +149,8 @@ def main():
     with open(output_file, "w", encoding="utf-8") as f:
         json.dump(output_data, f, ensure_ascii=False, indent=2)
     
+    record_snapshots(username, results, scraped_at)
+    
     print("\n" + "=" * 60)
     print(f"Sonuçlar '{output_file}' dosyasına kaydedildi.")
     print("=" * 60)
@@ -0,0 +1,277 @@
+"""
+Instagram İstek Hız Sınırlayıcı
+Giriş yapılmış her hesap için, tüm iş parçacıklarının paylaştığı uyarlanabilir (AIMD) token-bucket.
+İstekler başarılı oldukça hız azar azar artar, kısıtlama sinyalinde (PleaseWaitFewMinutes,
+HTTP 429 ...) yarıya iner ve tüm istekler rastgele sapmalı bir süre durdurulur.
+Hız ve bekleme durumu `instagram_rate_state.json` dosyasında saklanır, çalıştırmalar arasında korunur.
+"""
+
+import os
+import json
+import atexit
+import random
+import threading
+import time
+from instagram_telemetry import get_telemetry
+
+RATE_STATE_FILE = os.getenv("INSTAGRAM_RATE_STATE", "instagram_rate_state.json")
+
+# Kayıtlı durum yoksa başlangıç hızı: saniyede 1 istek, en fazla 3 isteklik ani yüklenme
+DEFAULT_RATE = float(os.getenv("INSTAGRAM_RATE", "1.0"))
+DEFAULT_BURST = int(os.getenv("INSTAGRAM_BURST", "3"))
+# Hızın inip çıkabileceği sınırlar (istek/sn)
+MIN_RATE = float(os.getenv("INSTAGRAM_RATE_MIN", "0.05"))
+MAX_RATE = float(os.getenv("INSTAGRAM_RATE_MAX", "3.0"))
+# Her başarılı istekte hıza eklenen miktar ve kısıtlamada hızın çarpıldığı oran
+ADDITIVE_INCREASE = float(os.getenv("INSTAGRAM_RATE_INCREASE", "0.02"))
+MULTIPLICATIVE_DECREASE = 0.5
+# Kısıtlamadan sonra isteklerin durduğu temel süre; art arda kısıtlamalarda ikiye katlanır (saniye)
+BACKOFF_BASE = float(os.getenv("INSTAGRAM_BACKOFF_BASE", "30"))
+BACKOFF_MAX = 900.0
+# Durum dosyasına başarılı isteklerde en fazla bu sıklıkla yazılır (saniye)
+SAVE_INTERVAL = 30
+
+# Kısıtlama sinyali sayılan instagrapi hataları (instagrapi yüklenmeden, adıyla eşleştirilir)
+THROTTLE_ERRORS = frozenset({
+    "PleaseWaitFewMinutes",
+    "RateLimitError",
+    "ClientThrottledError",
+    "FeedbackRequired",
+    "SentryBlock",
+    "ProxyAddressIsBlocked",
+})
+
+
+def is_throttle_error(error):
+    """
+    Hatanın Instagram'ın hız kısıtlaması olup olmadığını döndürür.
+
+    Sadece hata türüne ve HTTP 429 durum koduna bakılır; mesaj içeriği (gönderi açıklaması,
+    kullanıcı adı ...) yanlış alarm verebileceği için kullanılmaz.
+    """
+    if type(error).__name__ in THROTTLE_ERRORS:
+        return True
+    # instagrapi ClientError `code`, requests HTTPError `response.status_code` taşır
+    return 429 in (getattr(error, "code", None), getattr(getattr(error, "response", None), "status_code", None))
+
+
+class TokenBucket:
+    """
+    Thread-safe, uyarlanabilir token-bucket.
+
+    Kova `burst` kadar token tutar ve saniyede `rate` token dolar.
+    Her istek bir token harcar; token yoksa çağıran bekler.
+    Başarılı isteklerde `rate` toplamsal artar (en fazla `max_rate`), kısıtlamada
+    çarpımsal azalır (en az `min_rate`) ve kova belirli bir süre kilitlenir.
+    Bekleme süreleri `name` (hesap) adıyla telemetriye yazılır.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, name=None,
+                 min_rate=MIN_RATE, max_rate=MAX_RATE, store=None):
+        if rate <= 0:
+            raise Exception("Hız (rate) sıfırdan büyük olmalıdır!")
+        self.min_rate = min(float(min_rate), float(max_rate))
+        self.max_rate = float(max_rate)
+        self.rate = min(max(float(rate), self.min_rate), self.max_rate)
+        self.burst = max(1, int(burst))
+        self.name = name
+        self.blocked_until = 0.0
+        self.consecutive_throttles = 0
+        self._store = store
+        self._saved_at = 0.0
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def acquire(self, tokens=1):
+        """
+        Token alınana kadar bekler; kova kısıtlama nedeniyle kilitliyse kilit açılana kadar bekler.
+
+        Args:
+            tokens: Harcanacak token sayısı (varsayılan: 1)
+
+        Returns:
+            float: Toplam bekleme süresi (saniye)
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                blocked = self.blocked_until - time.time()
+                if blocked > 0:
+                    wait_time = blocked
+                else:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._tokens >= tokens:
+                        self._tokens -= tokens
+                        if waited and self.name:
+                            get_telemetry().record_limiter_wait(self.name, waited)
+                        return waited
+                    wait_time = (tokens - self._tokens) / self.rate
+            time.sleep(wait_time)
+            waited += wait_time
+
+    def record_success(self):
+        """
+        Başarılı isteği kaydeder: hız toplamsal olarak artar.
+        """
+        with self._lock:
+            self.consecutive_throttles = 0
+            self.rate = min(self.max_rate, self.rate + ADDITIVE_INCREASE)
+            save = time.time() - self._saved_at >= SAVE_INTERVAL
+        if save:
+            self._save()
+
+    def record_throttle(self, error=None):
+        """
+        Kısıtlama sinyalini kaydeder: hız yarıya iner, kova rastgele sapmalı bir süre kilitlenir.
+
+        Art arda gelen kısıtlamalarda bekleme süresi ikiye katlanır (en fazla BACKOFF_MAX).
+
+        Args:
+            error: Sinyali veren hata (sadece mesaj için)
+
+        Returns:
+            float: Kilit süresi (saniye)
+        """
+        with self._lock:
+            self.consecutive_throttles += 1
+            self.rate = max(self.min_rate, self.rate * MULTIPLICATIVE_DECREASE)
+            pause = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self.consecutive_throttles - 1))
+            pause *= random.uniform(0.5, 1.5)
+            self.blocked_until = max(self.blocked_until, time.time() + pause)
+            self._tokens = 0.0
+            self._updated = time.monotonic()
+            rate = self.rate
+        reason = f" ({type(error).__name__})" if error is not None else ""
+        print(f"⏳ {self.name or 'istek'} kısıtlandı{reason}: hız {rate:.2f} istek/sn, {pause:.0f} sn bekleniyor")
+        self._save()
+        return pause
+
+    def record_error(self, error):
+        """
+        Başarısız isteği kaydeder; sadece kısıtlama sinyalleri hızı düşürür.
+
+        Returns:
+            bool: Hata kısıtlama sinyaliyse True
+        """
+        if is_throttle_error(error):
+            self.record_throttle(error)
+            return True
+        return False
+
+    def set_max_rate(self, max_rate):
+        with self._lock:
+            self.max_rate = max(float(max_rate), self.min_rate)
+            self.rate = min(self.rate, self.max_rate)
+
+    def state(self):
+        with self._lock:
+            return {
+                "rate": round(self.rate, 4),
+                "blocked_until": self.blocked_until,
+                "consecutive_throttles": self.consecutive_throttles,
+            }
+
+    def _save(self):
+        if self._store is not None and self.name:
+            self._saved_at = time.time()
+            self._store.update(self.name, self.state())
+
+
+class RateStateStore:
+    """
+    Hesapların sınırlayıcı durumunu JSON dosyasında saklar.
+    """
+
+    def __init__(self, path=RATE_STATE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.state = json.load(f)
+            except Exception:
+                print(f"⚠ '{path}' okunamadı, hız durumu sıfırlanıyor...")
+                self.state = {}
+
+    def update(self, username, state):
+        with self.lock:
+            # Farklı hesaplarla çalışan süreçler aynı dosyaya yazar: diğer hesapların güncel durumu korunur
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.state.update({name: value for name, value in json.load(f).items() if name != username})
+            except Exception:
+                pass
+            self.state[username] = dict(state, updated_at=time.time())
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self.state, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print(f"⚠ Hız durumu kaydedilemedi: {str(e)[:80]}")
+
+
+_store = None
+_max_rate = None
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def set_max_rate(rate):
+    """
+    Tüm hesapların (mevcut ve sonradan oluşturulacak) en yüksek hızını ayarlar (--rate).
+    """
+    global _max_rate
+    with _limiters_lock:
+        _max_rate = float(rate)
+        for limiter in _limiters.values():
+            limiter.set_max_rate(_max_rate)
+
+
+def get_limiter(username, rate=None, burst=None):
+    """
+    Hesaba ait ortak sınırlayıcıyı döndürür (yoksa kayıtlı durumundan oluşturur).
+
+    Aynı hesapla çalışan tüm iş parçacıkları aynı kovayı paylaşır.
+
+    Args:
+        username: Instagram kullanıcı adı
+        rate: Kayıtlı durum yoksa başlangıç hızı (varsayılan: INSTAGRAM_RATE)
+        burst: Kova kapasitesi (varsayılan: INSTAGRAM_BURST)
+
+    Returns:
+        TokenBucket: Hesabın sınırlayıcısı
+    """
+    global _store
+    with _limiters_lock:
+        limiter = _limiters.get(username)
+        if limiter is None:
+            if _store is None:
+                _store = RateStateStore()
+                atexit.register(_save_at_exit)
+            saved = _store.state.get(username, {})
+            limiter = TokenBucket(
+                saved.get("rate") or (rate if rate is not None else DEFAULT_RATE),
+                burst if burst is not None else DEFAULT_BURST,
+                name=username,
+                max_rate=_max_rate if _max_rate is not None else MAX_RATE,
+                store=_store,
+            )
+            limiter.blocked_until = float(saved.get("blocked_until") or 0.0)
+            limiter.consecutive_throttles = int(saved.get("consecutive_throttles") or 0)
+            _limiters[username] = limiter
+        return limiter
+
+
+def _save_at_exit():
+    for limiter in list(_limiters.values()):
+        limiter._save()
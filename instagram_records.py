@@ -0,0 +1,132 @@
+"""
+Instagram Gönderi Kaydı
+Gönderi istatistikleri için `__slots__` kullanan küçük bir kayıt tipi. instagrapi `Media`
+objeleri (pydantic) çekildikleri anda bu kayda çevrilip bırakılır; on binlerce gönderilik
+geriye dönük taramalarda bellekte sadece gereken alanlar kalır.
+
+Kayıt, scriptlerin kullandığı sözlük arayüzünü (`record["likes"]`, `record.get(...)`) destekler;
+NDJSON/JSON yazıcıları kaydı doğrudan yazar. Alan sırası klasik çıktıyla aynıdır.
+"""
+
+import json
+from datetime import datetime
+
+# Çıktıdaki alan sırası (sonuc.json şeması)
+FIELDS = (
+    "media_id",
+    "shortcode",
+    "url",
+    "taken_at",
+    "caption",
+    "likes",
+    "comments",
+    "saves",
+    "reach",
+    "impressions",
+)
+_FIELD_SET = frozenset(FIELDS)
+# Açıklamanın çıktıda tutulan uzunluğu
+CAPTION_LENGTH = 100
+
+
+class PostRecord:
+    """
+    Tek bir gönderinin istatistikleri.
+
+    `full_caption` kısaltılmamış açıklamadır; çıktıya yazılmaz, açıklama indeksine
+    (instagram_caption_index.py) aktarılır. `thumbnail_url` ve `video_url` de çıktıya yazılmaz,
+    medya önbelleği (instagram_media_cache.py) için tutulur.
+    """
+
+    __slots__ = FIELDS + ("full_caption", "thumbnail_url", "video_url")
+
+    def __init__(self, media_id, shortcode, url, taken_at, caption, likes, comments, saves,
+                 reach=None, impressions=None, full_caption=None, thumbnail_url=None, video_url=None):
+        self.media_id = media_id
+        self.shortcode = shortcode
+        self.url = url
+        self.taken_at = taken_at
+        self.caption = caption
+        self.likes = likes
+        self.comments = comments
+        self.saves = saves
+        self.reach = reach
+        self.impressions = impressions
+        self.full_caption = full_caption
+        self.thumbnail_url = thumbnail_url
+        self.video_url = video_url
+
+    @classmethod
+    def from_media(cls, media):
+        """
+        instagrapi `Media` objesinden kayıt oluşturur; Media objesine referans tutulmaz.
+        """
+        full_caption = media.caption_text or ""
+        caption = full_caption
+        if len(caption) > CAPTION_LENGTH:
+            caption = caption[:CAPTION_LENGTH] + "..."
+        taken_at = media.taken_at
+        if taken_at:
+            # instagrapi datetime döndürür, kayıtlı örnekler unix zamanı tutar
+            if not isinstance(taken_at, datetime):
+                taken_at = datetime.fromtimestamp(taken_at)
+            taken_at = taken_at.isoformat()
+        # Albümlerde kapak görseli ilk öğeninkidir
+        resources = getattr(media, "resources", None) or []
+        thumbnail_url = getattr(media, "thumbnail_url", None) or (resources and getattr(resources[0], "thumbnail_url", None))
+        video_url = getattr(media, "video_url", None)
+        return cls(
+            media.pk,
+            media.code,
+            f"https://www.instagram.com/p/{media.code}/",
+            taken_at or None,
+            caption,
+            media.like_count or 0,
+            media.comment_count or 0,
+            getattr(media, "saved_count", None) or 0,
+            full_caption=full_caption or None,
+            thumbnail_url=str(thumbnail_url) if thumbnail_url else None,
+            video_url=str(video_url) if video_url else None,
+        )
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        return default
+
+    def __getitem__(self, key):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in _FIELD_SET
+
+    def keys(self):
+        return FIELDS
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in FIELDS}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    def __eq__(self, other):
+        if isinstance(other, PostRecord):
+            return all(getattr(self, field) == getattr(other, field) for field in FIELDS)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"PostRecord({self.shortcode!r}, likes={self.likes}, comments={self.comments})"
+
+
+def as_dict(record):
+    """
+    Kaydı JSON'a yazılabilir sözlüğe çevirir (sözlükler olduğu gibi döner).
+    """
+    return record.to_dict() if isinstance(record, PostRecord) else record
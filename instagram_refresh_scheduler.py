@@ -0,0 +1,363 @@
+"""
+Instagram Yenileme Zamanlayıcısı
+Takip edilen her gönderiye yaşına ve metriklerinin artış hızına göre bir sonraki yenileme
+zamanı verir. Yeni reel'ler sık, aylık gönderiler seyrek yenilenir; aynı istek bütçesiyle
+aktif içerik daha taze tutulur.
+
+Zamanlama metrik geçmişiyle aynı veritabanında (`instagram_metrics.db`) tutulur ve
+scriptler sonuçları geçmişe yazdıkça (record_snapshots) güncellenir.
+
+Kullanım:
+    python instagram_refresh_scheduler.py tick --budget 50                 # vadesi gelen linkler
+    python instagram_refresh_scheduler.py tick --budget 50 --output instagram_due.txt
+    python instagram_refresh_scheduler.py show DSSpIC8Ajje
+    python instagram_link_cekici.py --due 50                               # vadesi gelenleri yenile
+"""
+
+import os
+import sqlite3
+import argparse
+import threading
+import time
+from datetime import datetime
+
+from instagram_metrics_store import METRICS_DB_FILE, MetricsStore
+
+# Yenileme aralığı sınırları (saniye)
+MIN_INTERVAL = int(os.getenv("INSTAGRAM_REFRESH_MIN_INTERVAL", "900"))
+MAX_INTERVAL = int(os.getenv("INSTAGRAM_REFRESH_MAX_INTERVAL", str(14 * 86400)))
+
+# (gönderi yaşı üst sınırı, temel yenileme aralığı), saniye
+AGE_TIERS = (
+    (6 * 3600, 900),
+    (86400, 3600),
+    (3 * 86400, 3 * 3600),
+    (7 * 86400, 12 * 3600),
+    (30 * 86400, 2 * 86400),
+)
+OLD_POST_INTERVAL = 7 * 86400
+# Bu yaştan genç reel'lerin aralığı yarıya iner
+REEL_BOOST_AGE = 7 * 86400
+
+# Saatlik göreli artış eşikleri: (eşik, aralık çarpanı)
+VELOCITY_STEPS = ((0.05, 0.25), (0.01, 0.5))
+# Son iki ölçüm arasında hiç değişmeyen gönderilerin aralığı bu kadar uzar
+STALE_FACTOR = 2.0
+# Çekilemeyen (silinmiş, gizli ...) gönderilerin aralığı her başarısızlıkta bu kadar uzar;
+# aralık MAX_INTERVAL'a ulaştıktan sonra da çekilemezse gönderi takipten çıkarılır
+FAILURE_BACKOFF = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS refresh_schedule (
+    shortcode TEXT PRIMARY KEY,
+    username TEXT,
+    url TEXT,
+    is_reel INTEGER NOT NULL DEFAULT 0,
+    taken_at REAL,
+    first_seen_at REAL NOT NULL,
+    last_refreshed_at REAL NOT NULL,
+    refresh_interval REAL NOT NULL,
+    next_refresh_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_refresh_schedule_next ON refresh_schedule (next_refresh_at);
+"""
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def _engagement(snapshot):
+    return sum(snapshot.get(column) or 0 for column in ("likes", "comments", "saves"))
+
+
+def metric_velocity(history):
+    """
+    Son iki ölçüm arasındaki saatlik göreli artışı hesaplar.
+
+    Beğeni+yorum+kaydedilme ve izlenme ayrı ayrı ölçülür, büyük olanı alınır.
+
+    Args:
+        history: Zamana göre sıralı anlık görüntüler (MetricsStore.post_history)
+
+    Returns:
+        float: Saatlik göreli artış (0.02 = saatte %2), geçmiş yetersizse None
+    """
+    if len(history) < 2:
+        return None
+    previous, latest = history[-2], history[-1]
+    hours = (latest["scraped_at"] - previous["scraped_at"]) / 3600
+    if hours <= 0:
+        return None
+    rates = []
+    for before, after in (
+        (_engagement(previous), _engagement(latest)),
+        (previous.get("plays") or 0, latest.get("plays") or 0),
+    ):
+        if after or before:
+            rates.append(max(0, after - before) / max(before, 1) / hours)
+    return max(rates) if rates else 0.0
+
+
+def refresh_interval(age, velocity=None, is_reel=False):
+    """
+    Gönderinin bir sonraki yenilemesine kadar geçecek süreyi hesaplar.
+
+    Args:
+        age: Gönderinin yaşı (saniye)
+        velocity: Saatlik göreli metrik artışı (metric_velocity), bilinmiyorsa None
+        is_reel: Gönderi reel/video mu
+
+    Returns:
+        float: Yenileme aralığı (saniye)
+    """
+    interval = OLD_POST_INTERVAL
+    for max_age, tier_interval in AGE_TIERS:
+        if age < max_age:
+            interval = tier_interval
+            break
+    if is_reel and age < REEL_BOOST_AGE:
+        interval /= 2
+    if velocity is not None:
+        if velocity == 0:
+            interval *= STALE_FACTOR
+        else:
+            for threshold, factor in VELOCITY_STEPS:
+                if velocity >= threshold:
+                    interval *= factor
+                    break
+    return float(min(max(interval, MIN_INTERVAL), MAX_INTERVAL))
+
+
+class RefreshScheduler:
+    """
+    Takip edilen gönderilerin yenileme zamanlarını tutar ve vadesi gelenleri döndürür.
+    """
+
+    def __init__(self, path=None, store=None):
+        self._owns_store = store is None
+        self.store = store if store is not None else MetricsStore(path or METRICS_DB_FILE)
+        self.path = self.store.path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def track(self, username, posts, scraped_at=None):
+        """
+        Yeni çekilen gönderilerin bir sonraki yenileme zamanını hesaplar.
+
+        Shortcode'u olmayan kayıtlar atlanır. Hatalı kayıtların gönderisi zaten takip ediliyorsa
+        aralığı FAILURE_BACKOFF kadar uzatılarak ertelenir (yoksa eklenmez); ölü gönderiler
+        vadesi geçmiş kalıp --due bütçesini doldurmaz.
+
+        Args:
+            username: Hesap kullanıcı adı
+            posts: Gönderi sözlükleri
+            scraped_at: Çekim zamanı (datetime veya unix zamanı, varsayılan: şimdi)
+
+        Returns:
+            int: Zamanlanan gönderi sayısı
+        """
+        now = _timestamp(scraped_at) or time.time()
+        rows = []
+        failed = []
+        for post in posts:
+            shortcode = post.get("shortcode")
+            if not shortcode or shortcode == "unknown":
+                continue
+            if post.get("error"):
+                failed.append(shortcode)
+                continue
+            url = post.get("url") or f"https://www.instagram.com/p/{shortcode}/"
+            is_reel = "/reel/" in url or bool(post.get("plays")) or post.get("media_type") == 2
+            taken_at = _timestamp(post.get("taken_at"))
+            rows.append((shortcode, url, is_reel, taken_at))
+        fetched = {row[0] for row in rows}
+        self._back_off([shortcode for shortcode in dict.fromkeys(failed) if shortcode not in fetched], now)
+        if not rows:
+            return 0
+
+        existing = {}
+        with self._lock:
+            # SQLite parametre sınırına takılmamak için parça parça sorgulanır
+            for i in range(0, len(rows), 500):
+                chunk = [row[0] for row in rows[i:i + 500]]
+                for row in self._conn.execute(
+                    f"SELECT shortcode, first_seen_at, taken_at, is_reel FROM refresh_schedule "
+                    f"WHERE shortcode IN ({', '.join('?' for _ in chunk)})",
+                    chunk,
+                ):
+                    existing[row[0]] = row[1:]
+
+        # Tüm gönderilerin son 30 günlük geçmişi tek sorguyla alınır
+        histories = self.store.posts_history([row[0] for row in rows], start=now - 30 * 86400)
+        scheduled = []
+        for shortcode, url, is_reel, taken_at in rows:
+            first_seen_at, known_taken_at, known_reel = existing.get(shortcode, (now, None, 0))
+            taken_at = taken_at or known_taken_at
+            is_reel = is_reel or bool(known_reel)
+            # Paylaşım zamanı bilinmiyorsa ilk görülme zamanı kullanılır
+            age = max(0.0, now - (taken_at or first_seen_at))
+            velocity = metric_velocity(histories.get(shortcode, []))
+            interval = refresh_interval(age, velocity, is_reel)
+            scheduled.append((
+                shortcode, username, url, int(is_reel), taken_at, first_seen_at, now, interval, now + interval
+            ))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO refresh_schedule (shortcode, username, url, is_reel, taken_at, "
+                "first_seen_at, last_refreshed_at, refresh_interval, next_refresh_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                scheduled,
+            )
+            self._conn.commit()
+        return len(scheduled)
+
+    def _back_off(self, shortcodes, now):
+        """
+        Çekilemeyen takipli gönderileri erteler; aralığı zaten en uzun olanları takipten çıkarır.
+        """
+        if not shortcodes:
+            return
+        with self._lock:
+            removed = self._conn.executemany(
+                "DELETE FROM refresh_schedule WHERE shortcode = ? AND refresh_interval >= ?",
+                [(shortcode, MAX_INTERVAL) for shortcode in shortcodes],
+            ).rowcount
+            # SET ifadeleri satırın eski değerlerini görür: iki MIN aynı yeni aralığı verir
+            self._conn.executemany(
+                "UPDATE refresh_schedule SET last_refreshed_at = ?, refresh_interval = MIN(refresh_interval * ?, ?), "
+                "next_refresh_at = ? + MIN(refresh_interval * ?, ?) WHERE shortcode = ?",
+                [(now, FAILURE_BACKOFF, MAX_INTERVAL, now, FAILURE_BACKOFF, MAX_INTERVAL, shortcode) for shortcode in shortcodes],
+            )
+            self._conn.commit()
+        if removed > 0:
+            print(f"⚠ {removed} gönderi art arda çekilemediği için yenileme takibinden çıkarıldı")
+
+    def due(self, now=None, budget=None, username=None):
+        """
+        Vadesi gelmiş gönderileri döndürür (tick).
+
+        Aralığına göre en çok geciken gönderi önce gelir; böylece bütçe yetmediğinde
+        kısa aralıklı (yeni/hızlı) gönderiler öne geçer.
+
+        Args:
+            now: Şimdiki zaman (unix zamanı, varsayılan: şimdi)
+            budget: Döndürülecek en fazla gönderi sayısı (None ise hepsi)
+            username: Sadece bu hesabın gönderileri
+
+        Returns:
+            list: shortcode, url, username, next_refresh_at, overdue (saniye) alanlı sözlükler
+        """
+        if now is None:
+            now = time.time()
+        sql = (
+            "SELECT shortcode, url, username, next_refresh_at, refresh_interval FROM refresh_schedule "
+            "WHERE next_refresh_at <= ?"
+        )
+        params = [now]
+        if username:
+            sql += " AND username = ?"
+            params.append(username)
+        sql += " ORDER BY (? - next_refresh_at) / refresh_interval DESC"
+        params.append(now)
+        if budget is not None:
+            sql += " LIMIT ?"
+            params.append(int(budget))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                "shortcode": shortcode,
+                "url": url,
+                "username": account,
+                "next_refresh_at": next_refresh_at,
+                "overdue": round(now - next_refresh_at, 1),
+            }
+            for shortcode, url, account, next_refresh_at, _ in rows
+        ]
+
+    def get(self, shortcode):
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM refresh_schedule WHERE shortcode = ?", (shortcode,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return dict(zip([d[0] for d in cursor.description], row))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+        if self._owns_store:
+            self.store.close()
+
+
+def due_urls(budget=None, username=None):
+    """
+    Scriptlerin kullandığı kısayol: vadesi gelen gönderilerin linklerini döndürür.
+    """
+    scheduler = RefreshScheduler()
+    try:
+        return [item["url"] for item in scheduler.due(budget=budget, username=username)]
+    finally:
+        scheduler.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Instagram gönderi yenileme zamanlayıcısı")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    tick = subparsers.add_parser("tick", help="Vadesi gelen gönderileri listeler")
+    tick.add_argument("--budget", type=int, default=None, help="En fazla gönderi sayısı (istek bütçesi)")
+    tick.add_argument("--username", default=None, help="Sadece bu hesabın gönderileri")
+    tick.add_argument("--output", default=None, help="Linkleri bu dosyaya yaz (instagram_link_cekici.py formatı)")
+    show = subparsers.add_parser("show", help="Bir gönderinin yenileme zamanı")
+    show.add_argument("shortcode")
+    args = parser.parse_args(argv)
+
+    scheduler = RefreshScheduler()
+    try:
+        if args.command == "show":
+            row = scheduler.get(args.shortcode)
+            if row is None:
+                print(f"⚠ {args.shortcode} takip edilmiyor")
+                return 1
+            for key in ("last_refreshed_at", "next_refresh_at"):
+                print(f"{key:<18} {datetime.fromtimestamp(row[key]).isoformat(timespec='seconds')}")
+            print(f"{'refresh_interval':<18} {row['refresh_interval'] / 3600:.2f} saat")
+            print(f"{'is_reel':<18} {bool(row['is_reel'])}")
+            return 0
+
+        items = scheduler.due(budget=args.budget, username=args.username)
+    finally:
+        scheduler.close()
+
+    if args.output:
+        tmp_file = f"{args.output}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            f.write(f"# {datetime.now().isoformat(timespec='seconds')} - vadesi gelen {len(items)} gönderi\n")
+            for item in items:
+                f.write(item["url"] + "\n")
+        os.replace(tmp_file, args.output)
+        print(f"✓ {len(items)} link {args.output} dosyasına yazıldı")
+    else:
+        for item in items:
+            print(f"{item['url']}  (gecikme: {item['overdue'] / 60:.0f} dk)")
+        print(f"\n{len(items)} gönderinin vadesi geldi")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,121 @@
+"""
+Instagram Tarama Durumu
+Her hesap için en yeni görülen gönderi pk'sını ve sayfalama cursor'unu saklar,
+böylece sonraki çalıştırmalar sadece yeni gönderileri çeker. Geriye dönük taramanın
+(--backfill) cursor'u da burada tutulur; kesilen tarama kaldığı sayfadan devam eder.
+Durum `instagram_scrape_state.json` dosyasında tutulur.
+"""
+
+import os
+import json
+import threading
+from datetime import datetime
+
+SCRAPE_STATE_FILE = os.getenv("INSTAGRAM_SCRAPE_STATE", "instagram_scrape_state.json")
+
+_lock = threading.Lock()
+
+
+def load_state(path=SCRAPE_STATE_FILE):
+    """
+    Tarama durumunu dosyadan okur.
+
+    Returns:
+        dict: {username: checkpoint} sözlüğü
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠ '{path}' okunamadı, tarama durumu sıfırlanıyor: {str(e)[:80]}")
+        return {}
+
+
+def save_state(state, path=SCRAPE_STATE_FILE):
+    """
+    Tarama durumunu dosyaya atomik olarak yazar.
+    """
+    with _lock:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+
+def get_checkpoint(state, username):
+    """
+    Hesabın kayıtlı checkpoint'ini döndürür (yoksa None).
+    """
+    checkpoint = state.get(username)
+    if checkpoint and checkpoint.get("newest_pk"):
+        return checkpoint
+    return None
+
+
+def update_checkpoint(state, username, media_list, resume=None):
+    """
+    Çekilen gönderilere göre hesabın checkpoint'ini günceller.
+
+    Args:
+        state: load_state ile okunan durum sözlüğü
+        username: Instagram kullanıcı adı
+        media_list: Bu çalıştırmada çekilen gönderiler (Media objeleri veya PostRecord kayıtları)
+        resume: Artımlı taramanın devam bilgisi ({"end_cursor", "resume_pk"}; boş sözlük yarım
+            kalan taramanın tamamlandığını belirtir, None ise mevcut bilgi korunur)
+    """
+    checkpoint = state.setdefault(username, {})
+    newest_pk = int(checkpoint.get("newest_pk") or 0)
+    for media in media_list:
+        pk = getattr(media, "pk", None) or getattr(media, "media_id", None)
+        if not str(pk or "").isdigit():
+            continue
+        if int(pk) > newest_pk:
+            newest_pk = int(pk)
+    if newest_pk:
+        checkpoint["newest_pk"] = str(newest_pk)
+    if resume is not None:
+        checkpoint.pop("end_cursor", None)
+        checkpoint.pop("resume_pk", None)
+        checkpoint.update(resume)
+    checkpoint["updated_at"] = datetime.now().isoformat()
+    return checkpoint
+
+
+def get_backfill(state, username):
+    """
+    Hesabın yarım kalmış geriye dönük taramasını döndürür (yoksa veya tamamlandıysa None).
+    """
+    backfill = (state.get(username) or {}).get("backfill")
+    if backfill and not backfill.get("done"):
+        return backfill
+    return None
+
+
+def start_backfill(state, username):
+    """
+    Hesap için en yeni gönderiden başlayan yeni bir geriye dönük tarama başlatır.
+    """
+    backfill = {"cursor": "", "fetched": 0, "done": False, "started_at": datetime.now().isoformat()}
+    state.setdefault(username, {})["backfill"] = backfill
+    return backfill
+
+
+def update_backfill(state, username, cursor, fetched, done=False):
+    """
+    Bir sayfa yazıldıktan sonra taramanın cursor'unu ilerletir.
+
+    Args:
+        state: load_state ile okunan durum sözlüğü
+        username: Instagram kullanıcı adı
+        cursor: Sonraki sayfanın cursor'u
+        fetched: Bu sayfada çekilen gönderi sayısı
+        done: Son sayfa mı
+    """
+    backfill = state.setdefault(username, {}).setdefault("backfill", {})
+    backfill["cursor"] = cursor or ""
+    backfill["fetched"] = int(backfill.get("fetched") or 0) + fetched
+    backfill["done"] = done
+    backfill["updated_at"] = datetime.now().isoformat()
+    return backfill
@@ -0,0 +1,385 @@
+"""
+Instagram Session Yöneticisi
+Session dosyalarını kilitleyerek paylaşır, son doğrulamayı TTL ile önbellekler,
+session'ları süresi dolmadan arka planda yeniler ve hesap havuzundan sırayla client verir.
+
+instagrapi `Client` thread-safe değildir (son yanıt `last_json` / `last_response` olarak nesnede
+tutulur). Havuz her iş parçacığına aynı session ile kendi client'ını verir.
+"""
+
+import os
+import json
+import time
+import random
+import threading
+from contextlib import contextmanager
+from instagram_rate_limiter import get_limiter, is_throttle_error
+from instagram_telemetry import get_telemetry, instrument_client
+
+# Son doğrulama bu süre boyunca geçerli sayılır (saniye)
+DEFAULT_SESSION_TTL = int(os.getenv("INSTAGRAM_SESSION_TTL", "1800"))
+# Arka plan yenilemesi TTL dolmadan bu kadar önce yapılır (saniye)
+REFRESH_MARGIN = 120
+# Kısıtlama olmayan giriş hatalarında denemeler arası temel bekleme; her denemede ikiye katlanır (saniye)
+LOGIN_RETRY_BASE = float(os.getenv("INSTAGRAM_LOGIN_RETRY_BASE", "5"))
+
+
+def clone_client(cl, on_login_required=None):
+    """
+    Aynı session ayarlarıyla yeni bir client döndürür (ağ isteği yapmaz).
+
+    Kopya aynı hesabın hız sınırlayıcısını kullanır; eşzamanlı iş parçacıklarının her biri
+    kendi kopyasıyla çalışır.
+    """
+    from instagrapi import Client
+
+    clone = instrument_client(Client(), limiter=getattr(cl, "_limiter", None), on_login_required=on_login_required)
+    clone.set_settings(cl.get_settings())
+    clone.username = getattr(cl, "username", None)
+    return clone
+
+
+@contextmanager
+def session_file_lock(session_file):
+    """
+    Session dosyasını süreçler arası kilitler (`<session_file>.lock`).
+
+    Aynı hesabı kullanan birden fazla script aynı anda session yazıp okuyamaz.
+    """
+    lock_path = f"{session_file}.lock"
+    with open(lock_path, "a+") as lock_file:
+        if os.name == "nt":
+            import msvcrt
+            while True:
+                try:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK ~10 saniye sonra vazgeçer, tekrar dene
+                    continue
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class SessionManager:
+    """
+    Tek bir hesabın session'ını yönetir.
+
+    Session dosyası: `{username}_session.json`
+    Doğrulama bilgisi: `{username}_session_check.json` (son doğrulama zamanı)
+    """
+
+    def __init__(self, username, password, ttl=DEFAULT_SESSION_TTL):
+        self.username = username
+        self.password = password
+        self.ttl = ttl
+        self.refresh_margin = min(REFRESH_MARGIN, ttl / 4)
+        self.session_file = f"{username}_session.json"
+        self.check_file = f"{username}_session_check.json"
+        self.client = None
+        # Client her değiştiğinde (giriş, yenileme) artar; iş parçacıklarının kopyaları yenilenir
+        self._generation = 0
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._refresh_thread = None
+        self._stop_event = threading.Event()
+
+    def _read_validated_at(self):
+        try:
+            with open(self.check_file, "r", encoding="utf-8") as f:
+                return float(json.load(f).get("validated_at", 0))
+        except Exception:
+            return 0.0
+
+    def _write_validated_at(self, validated_at):
+        try:
+            with open(self.check_file, "w", encoding="utf-8") as f:
+                json.dump({"validated_at": validated_at}, f)
+        except Exception:
+            pass
+
+    def _is_fresh(self, validated_at):
+        return time.time() - validated_at < self.ttl
+
+    def _login(self, cl):
+        """
+        Yeni giriş yapar - retry mekanizması ile.
+        """
+        from instagrapi.exceptions import PleaseWaitFewMinutes, ChallengeRequired
+
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                print(f"Giriş denemesi {attempt + 1}/{max_retries}...")
+                cl.login(self.username, self.password)
+                try:
+                    cl.dump_settings(self.session_file)
+                    print(f"✓ Session kaydedildi: {self.session_file}")
+                except Exception:
+                    pass
+                self._write_validated_at(time.time())
+                print(f"✓ Başarıyla giriş yapıldı: {self.username}")
+                return cl
+            except (ChallengeRequired, PleaseWaitFewMinutes):
+                # Bu hatalarda tekrar denemek durumu kötüleştirir
+                raise
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    print(f"⚠ Hata: {str(e)}")
+                    # Kısıtlama hataları client sarmalayıcısında sınırlayıcıya bildirilir, sonraki
+                    # login çağrısı kilit açılana kadar bekler. Diğer hatalar (yanlış şifre, ağ ...)
+                    # hesabın hızını düşürmez; rastgele sapmalı ve ikiye katlanan yerel bir süre beklenir.
+                    if not is_throttle_error(e):
+                        time.sleep(LOGIN_RETRY_BASE * 2 ** attempt * random.uniform(0.5, 1.5))
+                    get_telemetry().record_retry("login")
+                else:
+                    raise
+
+    def _load_or_login(self, force_check=False):
+        """
+        Kilit altında session'ı yükler; gerekirse doğrular veya yeniden giriş yapar.
+        """
+        # instagrapi (pydantic modelleriyle) ağırdır, sadece giriş gerektiğinde yüklenir
+        from instagrapi import Client
+
+        # Scriptlerin tüm Client çağrıları telemetriye kaydedilir ve hesabın sınırlayıcısından geçer;
+        # TTL içinde session düşerse (LoginRequired) bir kez yeniden giriş yapılır
+        cl = instrument_client(
+            Client(), limiter=get_limiter(self.username), on_login_required=lambda: self._relogin(cl)
+        )
+        with session_file_lock(self.session_file):
+            if os.path.exists(self.session_file):
+                try:
+                    cl.load_settings(self.session_file)
+                    print(f"✓ Önceki session yüklendi: {self.username}")
+                    validated_at = self._read_validated_at()
+                    if not force_check and self._is_fresh(validated_at):
+                        # Son doğrulama hâlâ geçerli, timeline isteğine gerek yok
+                        print(f"✓ Session {int(time.time() - validated_at)} sn önce doğrulandı: {self.username}")
+                        return cl
+                    try:
+                        cl.get_timeline_feed()
+                        self._write_validated_at(time.time())
+                        print(f"✓ Session geçerli, giriş yapıldı: {self.username}")
+                        return cl
+                    except Exception:
+                        print("⚠ Session geçersiz, yeni giriş yapılıyor...")
+                except Exception:
+                    print("⚠ Session yüklenemedi, yeni giriş yapılıyor...")
+            return self._login(cl)
+
+    def get_client(self):
+        """
+        Giriş yapılmış client'ı döndürür.
+
+        Returns:
+            Client: Giriş yapılmış Instagram client objesi
+        """
+        with self._lock:
+            if self.client is None:
+                from instagrapi.exceptions import PleaseWaitFewMinutes, ChallengeRequired
+                try:
+                    self.client = self._load_or_login()
+                except ChallengeRequired as e:
+                    raise Exception(f"Güvenlik doğrulaması gerekli. Lütfen Instagram uygulamasından giriş yapın ve tekrar deneyin. Hata: {str(e)}")
+                except PleaseWaitFewMinutes as e:
+                    raise Exception(f"Çok fazla deneme yapıldı. Lütfen birkaç dakika bekleyin. Hata: {str(e)}")
+                except Exception as e:
+                    error_msg = str(e)
+                    if "blacklist" in error_msg.lower() or "ip address" in error_msg.lower():
+                        raise Exception(f"IP adresiniz geçici olarak engellenmiş. ÇÖZÜM: 1) VPN kullanın, 2) Birkaç saat bekleyin, 3) Farklı bir ağ kullanın. Detaylar: INSTAGRAM_GIRIS_SORUNLARI.md")
+                    raise Exception(f"Giriş yapılamadı: {error_msg}")
+                self._generation += 1
+            return self.client
+
+    def _relogin(self, stale_client):
+        """
+        Gerçek bir çağrı LoginRequired ile başarısız olduğunda çağrılır: önbellekteki doğrulama
+        geçersiz sayılır ve yeniden giriş yapılır (başka bir iş parçacığı zaten yaptıysa tekrarlanmaz).
+
+        Args:
+            stale_client: Hatayı alan client'ın kaynağı olan giriş yapılmış client
+
+        Returns:
+            dict: Yeni session ayarları veya giriş yapılamazsa None
+        """
+        with self._lock:
+            try:
+                if self.client is None or self.client is stale_client:
+                    print(f"⚠ Session geçersiz (LoginRequired), yeniden giriş yapılıyor: {self.username}")
+                    self._write_validated_at(0)
+                    self.client = self._load_or_login(force_check=True)
+                    self._generation += 1
+                return self.client.get_settings()
+            except Exception as e:
+                print(f"⚠ Yeniden giriş yapılamadı ({self.username}): {str(e)[:100]}")
+                return None
+
+    def thread_client(self):
+        """
+        Çağıran iş parçacığına ait client'ı döndürür (ilk çağrıda giriş yapılmış client'tan kopyalanır).
+
+        Returns:
+            Client: Bu iş parçacığının Instagram client objesi
+        """
+        with self._lock:
+            client = self.get_client()
+            generation = self._generation
+        local = self._local
+        if getattr(local, "generation", None) != generation:
+            local.client = clone_client(client, on_login_required=lambda: self._relogin(client))
+            local.generation = generation
+        return local.client
+
+    def refresh(self):
+        """
+        Session'ı doğrular ve gerekirse yeniler.
+
+        Başka bir süreç session'ı yakın zamanda yenilediyse sadece dosyadan tekrar yükler.
+        """
+        with self._lock:
+            with session_file_lock(self.session_file):
+                validated_at = self._read_validated_at()
+                if self.client is not None and time.time() - validated_at < self.ttl - self.refresh_margin:
+                    try:
+                        self.client.load_settings(self.session_file)
+                        self._generation += 1
+                        return
+                    except Exception:
+                        pass
+            self.client = self._load_or_login(force_check=True)
+            self._generation += 1
+
+    def _refresh_loop(self):
+        while True:
+            next_refresh = self._read_validated_at() + self.ttl - self.refresh_margin
+            if self._stop_event.wait(max(1, next_refresh - time.time())):
+                return
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠ Session arka planda yenilenemedi ({self.username}): {str(e)[:100]}")
+                # Hemen tekrar denememek için biraz bekle
+                if self._stop_event.wait(self.refresh_margin):
+                    return
+
+    def start_background_refresh(self):
+        """
+        Session'ı TTL dolmadan önce yenileyen arka plan iş parçacığını başlatır.
+        """
+        if self._refresh_thread is None or not self._refresh_thread.is_alive():
+            self._stop_event.clear()
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_loop, name=f"session-refresh-{self.username}", daemon=True
+            )
+            self._refresh_thread.start()
+
+    def stop_background_refresh(self):
+        self._stop_event.set()
+
+
+def load_accounts_from_env():
+    """
+    Hesap listesini .env dosyasından okur.
+
+    INSTAGRAM_ACCOUNTS="kullanici1:sifre1,kullanici2:sifre2" tanımlıysa onu,
+    yoksa INSTAGRAM_USERNAME / INSTAGRAM_PASSWORD çiftini kullanır.
+
+    Returns:
+        list: (username, password) listesi
+    """
+    accounts = []
+    raw = os.getenv("INSTAGRAM_ACCOUNTS", "").strip()
+    if raw:
+        for item in raw.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            if ":" not in item:
+                raise Exception(f"INSTAGRAM_ACCOUNTS formatı hatalı: '{item}' (kullanici:sifre olmalı)")
+            username, password = item.split(":", 1)
+            accounts.append((username.strip(), password))
+    else:
+        username = os.getenv("INSTAGRAM_USERNAME")
+        password = os.getenv("INSTAGRAM_PASSWORD")
+        if username and password:
+            accounts.append((username, password))
+
+    if not accounts:
+        raise Exception("INSTAGRAM_USERNAME ve INSTAGRAM_PASSWORD (veya INSTAGRAM_ACCOUNTS) .env dosyasında tanımlı olmalıdır!")
+    return accounts
+
+
+class SessionPool:
+    """
+    Birden fazla hesabın session'larını tutar ve client'ları sırayla (round-robin) dağıtır.
+    """
+
+    def __init__(self, accounts, ttl=DEFAULT_SESSION_TTL, background_refresh=True):
+        self.managers = [SessionManager(username, password, ttl) for username, password in accounts]
+        self.background_refresh = background_refresh
+        self._index = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        return cls(load_accounts_from_env(), **kwargs)
+
+    @property
+    def usernames(self):
+        return [m.username for m in self.managers]
+
+    def login_all(self):
+        """
+        Tüm hesaplara giriş yapar; giriş yapılamayan hesaplar havuzdan çıkarılır.
+        """
+        active = []
+        for manager in self.managers:
+            try:
+                manager.get_client()
+                if self.background_refresh:
+                    manager.start_background_refresh()
+                active.append(manager)
+            except Exception as e:
+                print(f"⚠ {manager.username} hesabına giriş yapılamadı: {str(e)[:150]}")
+        if not active:
+            raise Exception("Havuzdaki hiçbir hesaba giriş yapılamadı!")
+        self.managers = active
+        return self
+
+    def next_client(self):
+        """
+        Sıradaki hesabın client'ını döndürür (çağıran iş parçacığına ait kopya).
+
+        Returns:
+            tuple: (username, Client)
+        """
+        with self._lock:
+            manager = self.managers[self._index % len(self.managers)]
+            self._index += 1
+        return manager.username, manager.thread_client()
+
+    def client_for(self, username):
+        """
+        Havuzda olan hesabın kendi client'ını (çağıran iş parçacığına ait kopya) döndürür;
+        hesap havuzda yoksa None.
+        """
+        for manager in self.managers:
+            if manager.username == username:
+                return manager.thread_client()
+        return None
+
+    def close(self):
+        for manager in self.managers:
+            manager.stop_background_refresh()
@@ -4,19 +4,20 @@ instagrapi kütüphanesini kullanarak Instagram hesabından detaylı istatistik
 """
 
 import os
-import json
+import argparse
 from datetime import datetime
-from dotenv import load_dotenv
-from instagrapi import Client
-from instagrapi.exceptions import LoginRequired, PleaseWaitFewMinutes, ChallengeRequired
+from instagram_method_selector import get_selector
+from instagram_records import PostRecord
 
-# .env dosyasını yükle
-load_dotenv()
+# Geriye dönük taramada sayfa başına gönderi sayısı
+BACKFILL_PAGE_SIZE = int(os.getenv("INSTAGRAM_BACKFILL_PAGE_SIZE", "50"))
 
 def login_to_instagram(username, password):
     """
     Instagram hesabına giriş yapar.
     
+    Session yönetimi (kilit, doğrulama önbelleği, yeniden giriş) SessionManager'dadır.
+    
     Args:
         username: Instagram kullanıcı adı
         password: Instagram şifresi
@@ -24,63 +25,9 @@ def login_to_instagram(username, password):
     Returns:
         Client: Giriş yapılmış Instagram client objesi
     """
-    try:
-        # Client ayarları - daha az şüpheli görünmek için
-        cl = Client()
-        
-        # Delay ekle (çok hızlı istek göndermemek için)
-        import time
-        time.sleep(2)
-        
-        # Session dosyası varsa yükle (daha önce başarılı giriş yapıldıysa)
-        session_file = f"{username}_session.json"
-        if os.path.exists(session_file):
-            try:
-                cl.load_settings(session_file)
-                print(f"✓ Önceki session yüklendi: {username}")
-                # Session geçerli mi kontrol et
-                try:
-                    cl.get_timeline_feed()
-                    print(f"✓ Session geçerli, giriş yapıldı: {username}")
-                    return cl
-                except:
-                    print("⚠ Session geçersiz, yeni giriş yapılıyor...")
-            except:
-                print("⚠ Session yüklenemedi, yeni giriş yapılıyor...")
-        
-        # Yeni giriş yap - retry mekanizması ile
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                print(f"Giriş denemesi {attempt + 1}/{max_retries}...")
-                cl.login(username, password)
-                
-                # Session'ı kaydet (bir sonraki sefer için)
-                try:
-                    cl.dump_settings(session_file)
-                    print(f"✓ Session kaydedildi: {session_file}")
-                except:
-                    pass
-                
-                print(f"✓ Başarıyla giriş yapıldı: {username}")
-                return cl
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    wait_time = (attempt + 1) * 5  # 5, 10, 15 saniye bekle
-                    print(f"⚠ Hata: {str(e)}")
-                    print(f"⏳ {wait_time} saniye bekleyip tekrar denenecek...")
-                    time.sleep(wait_time)
-                else:
-                    raise e
-    except ChallengeRequired as e:
-        raise Exception(f"Güvenlik doğrulaması gerekli. Lütfen Instagram uygulamasından giriş yapın ve tekrar deneyin. Hata: {str(e)}")
-    except PleaseWaitFewMinutes as e:
-        raise Exception(f"Çok fazla deneme yapıldı. Lütfen birkaç dakika bekleyin. Hata: {str(e)}")
-    except Exception as e:
-        error_msg = str(e)
-        if "blacklist" in error_msg.lower() or "ip address" in error_msg.lower():
-            raise Exception(f"IP adresiniz geçici olarak engellenmiş. ÇÖZÜM: 1) VPN kullanın, 2) Birkaç saat bekleyin, 3) Farklı bir ağ kullanın. Detaylar: INSTAGRAM_GIRIS_SORUNLARI.md")
-        raise Exception(f"Giriş yapılamadı: {str(e)}")
+    from instagram_session import SessionManager
+
+    return SessionManager(username, password).get_client()
 
 def get_user_media(cl, username, limit=5):
     """
@@ -94,117 +41,310 @@ def get_user_media(cl, username, limit=5):
     Returns:
         list: Gönderi listesi
     """
+    from instagram_id_cache import resolve_user_id
+
     try:
-        # Önce user_id'yi al
-        try:
-            user_id = cl.user_id_from_username(username)
-        except Exception as e:
-            print(f"⚠ user_id_from_username hatası: {str(e)}")
-            # Alternatif yöntem dene
-            try:
-                user_info = cl.user_info_by_username(username)
-                user_id = user_info.pk
-            except Exception as e2:
-                raise Exception(f"Kullanıcı bilgisi alınamadı: {str(e2)}")
+        # Önce user_id'yi al (kalıcı önbellekten, yoksa API'den)
+        user_id = resolve_user_id(cl, username)
         
         # Farklı yöntemlerle gönderileri çekmeyi dene
-        media = None
-        
-        # Yöntem 1: user_medias (varsayılan)
-        try:
-            media = cl.user_medias(user_id, amount=limit)
-            print(f"✓ {len(media)} gönderi bulundu (yöntem 1)")
-            return media
-        except Exception as e1:
-            print(f"⚠ Yöntem 1 başarısız: {str(e1)[:100]}")
-        
-        # Yöntem 2: user_medias_v1
-        try:
-            media = cl.user_medias_v1(user_id, amount=limit)
-            print(f"✓ {len(media)} gönderi bulundu (yöntem 2)")
-            return media
-        except Exception as e2:
-            print(f"⚠ Yöntem 2 başarısız: {str(e2)[:100]}")
-        
-        # Yöntem 3: user_medias_gql
-        try:
-            media = cl.user_medias_gql(user_id, amount=limit)
-            print(f"✓ {len(media)} gönderi bulundu (yöntem 3)")
-            return media
-        except Exception as e3:
-            print(f"⚠ Yöntem 3 başarısız: {str(e3)[:100]}")
-        
-        # Hiçbiri çalışmadıysa hata fırlat
-        if media is None or len(media) == 0:
-            raise Exception("Tüm yöntemler başarısız oldu. Instagram API'si değişmiş olabilir.")
-        
+        # Sıra, önceki çalıştırmalardaki başarı oranı ve gecikmeye göre belirlenir
+        method, media = get_selector("user_medias").call({
+            "user_medias": lambda: cl.user_medias(user_id, amount=limit),
+            "user_medias_v1": lambda: cl.user_medias_v1(user_id, amount=limit),
+            "user_medias_gql": lambda: cl.user_medias_gql(user_id, amount=limit),
+        })
+        print(f"✓ {len(media)} gönderi bulundu ({method})")
         return media
     except Exception as e:
         print(f"⚠ Gönderiler çekilemedi: {str(e)}")
         # Boş liste döndür, script devam etsin
         return []
 
-def get_media_insights(cl, media_id):
+def _walk_user_media(cl, user_id, floor_pk, window, end_cursor, page_size, max_pages, collected):
     """
-    Bir gönderinin detaylı istatistiklerini çeker.
+    `end_cursor` sayfasından başlayıp `floor_pk`'dan yeni gönderilere ve sınırın altındaki ilk
+    `window` gönderiye kadar iner; her sayfa hemen PostRecord'a çevrilip `collected`'a eklenir.
+    
+    Returns:
+        tuple: (eski gönderi sayısı, sayfa sayısı, yöntem, cursor) - cursor yarıda kalınan sayfanındır,
+        tarama tamamlandıysa None
+    """
+    selector = get_selector("user_medias_paginated")
+    old_count = 0
+    method = None
+    for page in range(max_pages):
+        try:
+            method, (medias, next_cursor) = selector.call({
+                "user_medias_paginated": lambda: cl.user_medias_paginated(user_id, page_size, end_cursor=end_cursor),
+                "user_medias_paginated_gql": lambda: cl.user_medias_paginated_gql(user_id, page_size, end_cursor=end_cursor),
+                "user_medias_paginated_v1": lambda: cl.user_medias_paginated_v1(user_id, page_size, end_cursor=end_cursor),
+            })
+        except Exception as e:
+            print(f"⚠ Gönderiler çekilemedi ({page + 1}. sayfa): {str(e)}")
+            return old_count, page, method, end_cursor
+        page_media = []
+        for media in medias:
+            if int(media.pk) > floor_pk:
+                page_media.append(media)
+            elif old_count < window:
+                page_media.append(media)
+                old_count += 1
+        collected.extend(to_records(page_media))
+        if not medias or not next_cursor:
+            break
+        if old_count >= window and int(medias[-1].pk) <= floor_pk:
+            break
+        end_cursor = next_cursor
+        # Sayfanın Media objeleri bir sonraki sayfa gelmeden bırakılır
+        medias = page_media = None
+    return old_count, page + 1, method, None
+
+def get_user_media_incremental(cl, username, checkpoint, window=5, page_size=12, max_pages=20):
+    """
+    Sadece checkpoint'ten yeni gönderileri ve metrikleri hâlâ değişen son `window` eski gönderiyi çeker.
+    
+    Sabitlenmiş (pinned) eski gönderiler sayfanın başında gelebileceği için ilk eski gönderide
+    durulmaz; sayfanın son gönderisi de checkpoint'ten eskiyse sayfalama biter.
+    
+    Sayfalama yarıda kalırsa o ana kadar çekilenler döndürülür ve kalınan sayfanın cursor'u,
+    eski sınırla (resume_pk) birlikte checkpoint'e yazılmak üzere döndürülür; sonraki çalıştırma
+    en yeni gönderileri çektikten sonra kalan sayfaları bu cursor'dan devam ederek çeker.
     
     Args:
         cl: Instagram client objesi
-        media_id: Gönderi ID'si
+        username: Instagram kullanıcı adı
+        checkpoint: Hesabın kayıtlı checkpoint'i (newest_pk, yarım kaldıysa end_cursor ve resume_pk)
+        window: Tekrar çekilecek eski gönderi sayısı (varsayılan: 5)
+        page_size: Sayfa başına gönderi sayısı
+        max_pages: En fazla çekilecek sayfa sayısı
     
     Returns:
-        dict: İstatistik verileri
+        tuple: (kayıt listesi, devam bilgisi) - devam bilgisi update_checkpoint'e verilir;
+        tarama tamamlandıysa boş sözlük, hiç başlayamadıysa None
     """
+    from instagram_id_cache import resolve_user_id
+
+    newest_pk = int(checkpoint["newest_pk"])
+    # Eski checkpoint'lerdeki end_cursor tamamlanmış taramanındır; sadece resume_pk ile birlikte devam edilir
+    resume_pk = int(checkpoint.get("resume_pk") or 0)
+    resume_cursor = checkpoint.get("end_cursor") if resume_pk else None
     try:
-        insights = cl.media_insights(media_id)
-        return insights
+        user_id = resolve_user_id(cl, username)
     except Exception as e:
-        # Eğer insights çekilemezse, temel bilgileri döndür
-        print(f"⚠ Gönderi {media_id} için insights çekilemedi: {str(e)}")
-        return None
+        print(f"⚠ Gönderiler çekilemedi: {str(e)}")
+        return [], None
+    
+    collected = []
+    old_count, pages, method, cursor = _walk_user_media(cl, user_id, newest_pk, window, "", page_size, max_pages, collected)
+    if cursor is not None:
+        # Önceki yarım tarama da varsa ikisi birden kalınan sayfadan eski sınıra inilerek tamamlanır
+        resume = {"end_cursor": cursor, "resume_pk": str(resume_pk if resume_cursor is not None else newest_pk)}
+    elif resume_cursor is not None:
+        print(f"Yarım kalan sayfalama devam ettiriliyor (gönderi {resume_pk}'a kadar)...")
+        _, resumed, _, cursor = _walk_user_media(cl, user_id, resume_pk, 0, resume_cursor, page_size, max_pages, collected)
+        pages += resumed
+        resume = {"end_cursor": cursor, "resume_pk": str(resume_pk)} if cursor is not None else {}
+    else:
+        resume = {}
+    
+    new_count = len(collected) - old_count
+    status = ", yarım kaldı" if resume else ""
+    print(f"✓ {new_count} yeni, {old_count} güncellenecek gönderi bulundu ({pages} sayfa, {method}{status})")
+    return collected, resume
 
-def extract_media_stats(cl, media):
+def iter_user_media(cl, username, end_cursor="", page_size=BACKFILL_PAGE_SIZE):
+    """
+    Kullanıcının tüm gönderilerini en yeniden eskiye doğru sayfa sayfa çeker.
+    
+    Her sayfa hemen PostRecord'a çevrilip döndürülür; hesap ne kadar büyük olursa olsun
+    bellekte bir sayfa tutulur. Kesilen tarama son döndürülen cursor ile devam ettirilir.
+    
+    Args:
+        cl: Instagram client objesi
+        username: Instagram kullanıcı adı
+        end_cursor: Başlanacak sayfanın cursor'u ("" ise en yeni gönderiler)
+        page_size: Sayfa başına gönderi sayısı
+    
+    Yields:
+        tuple: (sayfanın kayıtları, sonraki sayfanın cursor'u - son sayfada None)
+    """
+    from instagram_id_cache import resolve_user_id
+
+    user_id = resolve_user_id(cl, username)
+    selector = get_selector("user_medias_paginated")
+    while True:
+        method, (medias, next_cursor) = selector.call({
+            "user_medias_paginated": lambda: cl.user_medias_paginated(user_id, page_size, end_cursor=end_cursor),
+            "user_medias_paginated_gql": lambda: cl.user_medias_paginated_gql(user_id, page_size, end_cursor=end_cursor),
+            "user_medias_paginated_v1": lambda: cl.user_medias_paginated_v1(user_id, page_size, end_cursor=end_cursor),
+        })
+        records = to_records(medias)
+        medias = None
+        if not records:
+            next_cursor = None
+        yield records, next_cursor or None
+        if not next_cursor:
+            return
+        end_cursor = next_cursor
+
+def backfill_user_media(cl, username, writer, state, page_size=BACKFILL_PAGE_SIZE, media=False):
+    """
+    Hesabın tüm geçmişini sayfa sayfa çeker ve kayıtları akış halinde yazar.
+    
+    Her sayfa insights ile tamamlanıp NDJSON'a yazılır ve diske sabitlenir, metrik geçmişine
+    eklenir; ancak ondan sonra cursor kaydedilir. Kesilen tarama en fazla bir sayfayı tekrar çeker
+    (NDJSON'da her gönderinin son kaydı geçerlidir).
+    
+    Args:
+        cl: Instagram client objesi
+        username: Instagram kullanıcı adı
+        writer: NdjsonWriter
+        state: load_state ile okunan durum sözlüğü (cursor burada tutulur)
+        page_size: Sayfa başına gönderi sayısı
+        media: Her sayfanın kapak görselleri medya önbelleğine indirilsin mi
+    
+    Returns:
+        int: Bu çalıştırmada yazılan gönderi sayısı
+    """
+    from instagram_caption_index import index_captions
+    from instagram_insights import apply_insights, fetch_insights_batch
+    from instagram_media_cache import cache_media
+    from instagram_metrics_store import record_snapshots
+    from instagram_scrape_state import get_backfill, save_state, start_backfill, update_backfill, update_checkpoint
+
+    backfill = get_backfill(state, username)
+    if backfill:
+        print(f"↻ Geriye dönük tarama kaldığı yerden devam ediyor ({backfill['fetched']} gönderi daha önce çekildi)")
+    else:
+        backfill = start_backfill(state, username)
+        print("Geriye dönük tarama başlatılıyor (en yeni gönderiden en eskiye)...")
+    
+    written = 0
+    for page, (records, next_cursor) in enumerate(iter_user_media(cl, username, backfill["cursor"], page_size), 1):
+        posts = [record for record in records if isinstance(record, PostRecord)]
+        insights = fetch_insights_batch(cl, username, [record.media_id for record in posts])
+        for record in records:
+            if isinstance(record, PostRecord):
+                apply_insights(record, insights.get(record.media_id))
+            writer.write(record)
+        # Önce kayıtlar diske, sonra cursor: çökmede sayfa kaybolmaz
+        writer.checkpoint()
+        record_snapshots(username, records, datetime.now())
+        index_captions(username, records)
+        if media:
+            cache_media(records)
+        update_checkpoint(state, username, posts)
+        backfill = update_backfill(state, username, next_cursor, len(records), done=next_cursor is None)
+        save_state(state)
+        written += len(records)
+        print(f"  Sayfa {page}: {len(records)} gönderi (toplam {backfill['fetched']})")
+    print(f"✓ Geriye dönük tarama tamamlandı: {backfill['fetched']} gönderi")
+    return written
+
+def extract_media_stats(cl, media, insights=None):
     """
     Gönderi verilerinden istatistikleri çıkarır.
     
+    Insights ayrı bir aşamada (fetch_insights_batch) toplu çekilir; burada ağ isteği yapılmaz.
+    
     Args:
         cl: Instagram client objesi
         media: Gönderi objesi
+        insights: Gönderinin insights verisi (Business/Creator hesabı gerektirir, yoksa None)
     
     Returns:
-        dict: İstatistik verileri
+        PostRecord: İstatistik verileri (sözlük gibi okunabilir)
     """
-    stats = {
-        "media_id": media.pk,
-        "shortcode": media.code,
-        "url": f"https://www.instagram.com/p/{media.code}/",
-        "taken_at": datetime.fromtimestamp(media.taken_at).isoformat() if media.taken_at else None,
-        "caption": media.caption_text[:100] + "..." if media.caption_text and len(media.caption_text) > 100 else (media.caption_text or ""),
-        "likes": media.like_count or 0,
-        "comments": media.comment_count or 0,
-        "saves": getattr(media, 'saved_count', None) or 0,
-        "reach": None,
-        "impressions": None
-    }
+    from instagram_insights import apply_insights
+
+    return apply_insights(PostRecord.from_media(media), insights)
+
+def to_records(media_list):
+    """
+    Gönderi objelerini hemen küçük kayıtlara (PostRecord) çevirir; Media objeleri tutulmaz.
     
-    # Insights çekmeyi dene (Business/Creator hesabı gerektirir)
-    try:
-        insights = get_media_insights(cl, media.pk)
-        if insights:
-            # Insights formatı değişebilir, bu yüzden farklı formatları kontrol et
-            if isinstance(insights, dict):
-                stats["reach"] = insights.get("reach", insights.get("accounts_engaged", None))
-                stats["impressions"] = insights.get("impressions", insights.get("profile_visits", None))
-                stats["saves"] = insights.get("saves", stats.get("saves", 0))
-    except Exception as e:
-        print(f"⚠ Gönderi {media.code} için insights alınamadı (Business/Creator hesabı gerekebilir): {str(e)}")
+    Çevrilemeyen gönderiler için hata kaydı (sözlük) döndürülür.
+    
+    Args:
+        media_list: Gönderi objeleri veya zaten çevrilmiş kayıtlar
     
-    return stats
+    Returns:
+        list: PostRecord veya hata sözlükleri
+    """
+    records = []
+    for i, media in enumerate(media_list, 1):
+        if isinstance(media, PostRecord):
+            records.append(media)
+            continue
+        try:
+            records.append(PostRecord.from_media(media))
+        except Exception as e:
+            media_code = getattr(media, 'code', getattr(media, 'shortcode', f"post_{i}"))
+            records.append({
+                "media_id": getattr(media, 'pk', getattr(media, 'id', f"unknown_{i}")),
+                "shortcode": media_code,
+                "url": f"https://www.instagram.com/p/{media_code}/" if media_code else None,
+                "error": str(e)[:200]
+            })
+    return records
 
-def main():
+def parse_args(argv=None):
+    """
+    Komut satırı argümanlarını okur.
     """
-    Ana fonksiyon: Instagram istatistiklerini çeker ve JSON dosyasına kaydeder.
+    parser = argparse.ArgumentParser(description="Instagram hesabından gönderi istatistikleri çeker.")
+    parser.add_argument("--limit", type=int, default=5, help="İlk çalıştırmada çekilecek gönderi sayısı (varsayılan: 5)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--incremental", action="store_true",
+        help="Sadece son çalıştırmadan beri yeni gönderileri ve son --window gönderiyi çek"
+    )
+    mode.add_argument(
+        "--backfill", action="store_true",
+        help="Hesabın tüm gönderilerini sayfa sayfa çek; kesilirse kaldığı sayfadan devam eder"
+    )
+    parser.add_argument(
+        "--window", type=int, default=5,
+        help="Artımlı modda metrikleri tekrar çekilecek eski gönderi sayısı (varsayılan: 5)"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Önceki çalıştırmada başarıyla işlenen gönderileri atla ve sonuc.ndjson dosyasına ekle"
+    )
+    parser.add_argument("--json", action="store_true", help="Sonda klasik sonuc.json dosyasını da üret")
+    parser.add_argument(
+        "--delta", action="store_true",
+        help="Sadece yeni, değişen ve kaldırılan gönderileri sonuc_delta.ndjson dosyasına yaz (--db ile sadece bunlar yazılır)"
+    )
+    parser.add_argument(
+        "--delta-threshold", type=float, default=None,
+        help="Delta için göreli değişim eşiği, örn. 0.02 = %%2 (varsayılan: INSTAGRAM_DELTA_THRESHOLD veya 0)"
+    )
+    parser.add_argument(
+        "--db", action="store_true",
+        help="Sonuçları Content tablosuna toplu yaz (DATABASE_URL)"
+    )
+    parser.add_argument(
+        "--media", action="store_true",
+        help="Kapak görsellerini (INSTAGRAM_MEDIA_KINDS) instagram_media klasörüne indir"
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """
+    Ana fonksiyon: Instagram istatistiklerini çeker ve NDJSON (istenirse JSON) dosyasına kaydeder.
+    """
+    args = parse_args(argv)
+    # .env ve depolama modülleri (sqlite3, hashlib ...), --help gibi ağ gerektirmeyen yollarda yüklenmez
+    from dotenv import load_dotenv
+    from instagram_caption_index import index_captions
+    from instagram_insights import apply_insights, fetch_insights_batch
+    from instagram_media_cache import cache_media
+    from instagram_metrics_store import record_snapshots
+    from instagram_ndjson import NdjsonWriter, completed_keys, iter_records, latest_index, latest_records, write_json
+    from instagram_scrape_state import load_state, save_state, get_checkpoint, update_checkpoint
+    load_dotenv()
     try:
         # .env dosyasından bilgileri oku
         username = os.getenv("INSTAGRAM_USERNAME")
@@ -222,79 +362,138 @@ def main():
         # Giriş yap
         cl = login_to_instagram(username, password)
         
-        # Son 5 gönderiyi çek
-        media_list = get_user_media(cl, username, limit=5)
-        
-        if not media_list or len(media_list) == 0:
-            print("\n⚠ Hiç gönderi bulunamadı!")
-            print("Bu durum şu nedenlerden kaynaklanabilir:")
-            print("1. Hesapta gönderi yok")
-            print("2. Instagram API'si değişmiş olabilir")
-            print("3. Hesap gizli olabilir")
-            print("\nTemel kullanıcı bilgilerini çekmeyi deniyoruz...")
-            
-            # En azından kullanıcı bilgilerini çek
-            try:
-                user_info = cl.user_info_by_username(username)
-                results = [{
-                    "username": username,
-                    "follower_count": getattr(user_info, 'follower_count', None),
-                    "following_count": getattr(user_info, 'following_count', None),
-                    "media_count": getattr(user_info, 'media_count', None),
-                    "note": "Gönderiler çekilemedi, sadece kullanıcı bilgileri alındı"
-                }]
-            except Exception as e:
-                print(f"⚠ Kullanıcı bilgileri de alınamadı: {str(e)}")
-                results = []
+        # Artımlı modda checkpoint varsa sadece yeni gönderileri, yoksa son `limit` gönderiyi çek
+        state = load_state() if args.incremental or args.backfill else {}
+        checkpoint = get_checkpoint(state, username) if args.incremental else None
+        resume = None
+        media_list = []
+        if args.backfill:
+            # Geriye dönük taramada gönderiler yazılırken sayfa sayfa çekilir
+            pass
+        elif checkpoint:
+            print(f"Artımlı mod: son görülen gönderi {checkpoint['newest_pk']}")
+            media_list, resume = get_user_media_incremental(cl, username, checkpoint, window=args.window)
         else:
-            # Her gönderi için istatistikleri çek
-            results = []
-            print("\nGönderiler işleniyor...")
-            print("-" * 50)
-            
-            for i, media in enumerate(media_list, 1):
+            media_list = get_user_media(cl, username, limit=args.limit)
+        
+        ndjson_file = "sonuc.ndjson"
+        output_file = "sonuc.json"
+        # Artımlı, devam ve geriye dönük modlarda önceki kayıtlar korunur; her gönderinin son kaydı geçerlidir
+        append = args.resume or args.incremental or args.backfill
+        done = completed_keys(ndjson_file, "shortcode") if args.resume else set()
+        records = []
+        
+        with NdjsonWriter(ndjson_file, append=append) as writer:
+            if args.backfill:
+                backfill_user_media(cl, username, writer, state, media=args.media)
+            elif not media_list or len(media_list) == 0:
+                print("\n⚠ Hiç gönderi bulunamadı!")
+                print("Bu durum şu nedenlerden kaynaklanabilir:")
+                print("1. Hesapta gönderi yok")
+                print("2. Instagram API'si değişmiş olabilir")
+                print("3. Hesap gizli olabilir")
+                print("\nTemel kullanıcı bilgilerini çekmeyi deniyoruz...")
+                
+                # En azından kullanıcı bilgilerini çek
                 try:
-                    media_code = getattr(media, 'code', getattr(media, 'shortcode', f"post_{i}"))
-                    print(f"[{i}/{len(media_list)}] Gönderi işleniyor: {media_code}")
-                    stats = extract_media_stats(cl, media)
-                    results.append(stats)
-                    print(f"  ✓ Beğeni: {stats['likes']}, Yorum: {stats['comments']}, Kaydedilme: {stats['saves']}")
+                    user_info = cl.user_info_by_username(username)
+                    writer.write({
+                        "username": username,
+                        "follower_count": getattr(user_info, 'follower_count', None),
+                        "following_count": getattr(user_info, 'following_count', None),
+                        "media_count": getattr(user_info, 'media_count', None),
+                        "note": "Gönderiler çekilemedi, sadece kullanıcı bilgileri alındı"
+                    })
                 except Exception as e:
-                    print(f"  ✗ Hata: {str(e)[:100]}")
-                    try:
-                        media_id = getattr(media, 'pk', getattr(media, 'id', f"unknown_{i}"))
-                        media_code = getattr(media, 'code', getattr(media, 'shortcode', f"post_{i}"))
-                        results.append({
-                            "media_id": media_id,
-                            "shortcode": media_code,
-                            "url": f"https://www.instagram.com/p/{media_code}/" if media_code else None,
-                            "error": str(e)[:200]
-                        })
-                    except:
-                        results.append({
-                            "error": f"Gönderi {i} işlenemedi: {str(e)[:200]}"
-                        })
+                    print(f"⚠ Kullanıcı bilgileri de alınamadı: {str(e)}")
+            else:
+                # Media objeleri hemen küçük kayıtlara çevrilip bırakılır (geriye dönük taramalarda bellek)
+                if args.incremental:
+                    update_checkpoint(state, username, media_list, resume)
+                records = to_records(media_list)
+                media_list = None
+                
+                # Insights ayrı ve eşzamanlı bir aşamada çekilir (hesapta yoksa hiç istek atılmaz)
+                pending = [record for record in records if isinstance(record, PostRecord) and record.shortcode not in done]
+                insights = fetch_insights_batch(cl, username, [record.media_id for record in pending])
+                
+                # Her gönderinin kaydı insights ile tamamlanıp anında NDJSON'a yazılır
+                print("\nGönderiler işleniyor...")
+                print("-" * 50)
+                
+                for i, record in enumerate(records, 1):
+                    media_code = record.get("shortcode")
+                    if record.get("error"):
+                        print(f"[{i}/{len(records)}] ✗ Hata: {record['error'][:100]}")
+                        writer.write(record)
+                        continue
+                    if media_code in done:
+                        print(f"[{i}/{len(records)}] Daha önce işlendi, atlanıyor: {media_code}")
+                        continue
+                    print(f"[{i}/{len(records)}] Gönderi işleniyor: {media_code}")
+                    apply_insights(record, insights.get(record.media_id))
+                    writer.write(record)
+                    print(f"  ✓ Beğeni: {record.likes}, Yorum: {record.comments}, Kaydedilme: {record.saves}")
         
-        # Sonuçları JSON dosyasına kaydet
-        output_data = {
-            "username": username,
-            "scraped_at": datetime.now().isoformat(),
-            "total_posts": len(results),
-            "posts": results
-        }
+        if args.incremental and records:
+            save_state(state)
         
-        output_file = "sonuc.json"
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
+        scraped_at = datetime.now()
+        
+        # Metrik geçmişine ekle (sadece bu çalıştırmada yazılan kayıtlar; geriye dönük taramada sayfa sayfa eklendi)
+        if not args.backfill:
+            record_snapshots(username, iter_records(ndjson_file, writer.start_offset), scraped_at)
+            # Kısaltılmamış açıklamalar hashtag / bahsetme indeksine eklenir
+            index_captions(username, records)
+            if args.media:
+                cache_media(records)
+        
+        index = latest_index(ndjson_file, "shortcode")
         
         print("\n" + "=" * 50)
-        print(f"✓ İşlem tamamlandı! Sonuçlar '{output_file}' dosyasına kaydedildi.")
+        if args.json:
+            posts = latest_records(ndjson_file, "shortcode", index=index)
+            if append and not args.backfill:
+                # Farklı çalıştırmalardan gelen kayıtlar gönderi tarihine göre sıralanır
+                # (geriye dönük taramada dosya zaten yeniden eskiye yazıldığı için bellekte sıralanmaz)
+                posts = sorted(posts, key=lambda post: post.get("taken_at") or "", reverse=True)
+            output_data = {
+                "username": username,
+                "scraped_at": scraped_at.isoformat(),
+                "total_posts": len(index),
+            }
+            write_json(output_file, output_data, posts)
+            print(f"✓ İşlem tamamlandı! Sonuçlar '{output_file}' dosyasına kaydedildi.")
+        else:
+            print(f"✓ İşlem tamamlandı! Sonuçlar '{ndjson_file}' dosyasına kaydedildi.")
         print("=" * 50)
         
+        delta = None
+        if args.delta:
+            # Son N gönderi çekildiği için kaldırılma sadece en eski gönderiden yeni olanlarda aranır
+            from instagram_delta import DEFAULT_THRESHOLD, SCOPE_WINDOW, write_delta
+            delta = write_delta(
+                f"stats:{username}", latest_records(ndjson_file, "shortcode", index=index), "sonuc_delta.ndjson",
+                threshold=args.delta_threshold if args.delta_threshold is not None else DEFAULT_THRESHOLD,
+                scope=SCOPE_WINDOW,
+            )
+        
+        if args.db:
+            from instagram_db_writer import write_to_content_table
+            if delta is not None:
+                from instagram_delta import upserts
+                write_to_content_table(upserts(delta))
+            else:
+                write_to_content_table(latest_records(ndjson_file, "shortcode", index=index))
+        
         # Özet bilgileri göster
-        total_likes = sum(post.get("likes", 0) for post in results)
-        total_comments = sum(post.get("comments", 0) for post in results)
-        total_saves = sum(post.get("saves", 0) for post in results)
+        total_likes = 0
+        total_comments = 0
+        total_saves = 0
+        for post in latest_records(ndjson_file, "shortcode", index=index):
+            total_likes += post.get("likes", 0)
+            total_comments += post.get("comments", 0)
+            total_saves += post.get("saves", 0)
         
         print(f"\nÖzet:")
         print(f"  Toplam Beğeni: {total_likes}")
@@ -7,44 +7,39 @@ Selenium ile Instagram'dan veri çeker.
 import os
 import json
 import time
+import argparse
 from datetime import datetime
-from dotenv import load_dotenv
-
-# .env dosyasını yükle
-load_dotenv()
+from importlib.util import find_spec
 
 def check_selenium_alternative():
     """
     Selenium alternatifini kontrol eder ve kurulum talimatları verir.
+    
+    Selenium sadece kurulu olup olmadığı için yüklenmez (find_spec), script hızlı açılır.
     """
-    try:
-        from selenium import webdriver
-        from selenium.webdriver.common.by import By
-        from selenium.webdriver.support.ui import WebDriverWait
-        from selenium.webdriver.support import expected_conditions as EC
-        from selenium.webdriver.chrome.service import Service
-        from selenium.webdriver.chrome.options import Options
+    if find_spec("selenium") is not None:
         return True
-    except ImportError:
-        print("=" * 60)
-        print("SELENIUM ALTERNATIFI")
-        print("=" * 60)
-        print()
-        print("instagrapi yüklenemedi. Alternatif olarak Selenium kullanabilirsiniz.")
-        print()
-        print("KURULUM:")
-        print("1. pip install selenium")
-        print("2. ChromeDriver indirin: https://chromedriver.chromium.org/")
-        print("3. ChromeDriver'ı PATH'e ekleyin veya script klasörüne koyun")
-        print()
-        print("NOT: Selenium daha yavaş çalışır ve Chrome gerektirir.")
-        print("=" * 60)
-        return False
+    
+    print("=" * 60)
+    print("SELENIUM ALTERNATIFI")
+    print("=" * 60)
+    print()
+    print("instagrapi yüklenemedi. Alternatif olarak Selenium kullanabilirsiniz.")
+    print()
+    print("KURULUM:")
+    print("1. pip install selenium")
+    print("2. ChromeDriver indirin: https://chromedriver.chromium.org/")
+    print("3. ChromeDriver'ı PATH'e ekleyin veya script klasörüne koyun")
+    print()
+    print("NOT: Selenium daha yavaş çalışır ve Chrome gerektirir.")
+    print("=" * 60)
+    return False
 
-def main():
+def main(argv=None):
     """
     Ana fonksiyon - Selenium alternatifi için talimatlar
     """
+    argparse.ArgumentParser(description="Selenium alternatifi için kurulum talimatları").parse_args(argv)
     print("=" * 60)
     print("Instagram İstatistik Scripti - Alternatif Yöntem")
     print("=" * 60)
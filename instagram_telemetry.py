@@ -0,0 +1,404 @@
+"""
+Instagram Telemetri
+Scriptlerin yaptığı her Instagram `Client` çağrısı için gecikme histogramı, hata türüne göre
+sayaç ve tekrar deneme sayısı tutar. Çalıştırma sonunda (süreç kapanırken) sonuçlar
+Prometheus metin dosyasına (node_exporter textfile collector ile okunabilir) ve JSON özetine yazılır.
+
+Çıktılar:
+    instagram_telemetry.prom          (INSTAGRAM_TELEMETRY_PROM)
+    instagram_run_summary.json        (INSTAGRAM_TELEMETRY_SUMMARY)
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import argparse
+import threading
+from datetime import datetime
+
+PROM_FILE = os.getenv("INSTAGRAM_TELEMETRY_PROM", "instagram_telemetry.prom")
+SUMMARY_FILE = os.getenv("INSTAGRAM_TELEMETRY_SUMMARY", "instagram_run_summary.json")
+
+# Histogram kova üst sınırları (saniye)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Ölçülen Client metodları ("user_medias" ile başlayanların hepsi de ölçülür)
+INSTRUMENTED_METHODS = frozenset({
+    "login",
+    "load_settings",
+    "dump_settings",
+    "get_timeline_feed",
+    "user_id_from_username",
+    "user_info_by_username",
+    "media_info",
+    "media_id",
+    "media_user",
+    "media_pk_from_code",
+    "media_insights",
+})
+INSTRUMENTED_PREFIXES = ("user_medias",)
+# Ağ isteği yapmayan (session dosyası okuma/yazma) metodlar hız sınırlayıcıdan geçmez
+LOCAL_METHODS = frozenset({"load_settings", "dump_settings"})
+# Session'ı kuran / doğrulayan metodlar; LoginRequired hatalarında yeniden giriş denenmez
+SESSION_METHODS = LOCAL_METHODS | {"login", "get_timeline_feed"}
+
+
+class Histogram:
+    """
+    Sabit kovalı gecikme histogramı (Prometheus formatında kümülatif yazılır).
+    """
+
+    __slots__ = ("counts", "total", "count", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def observe(self, seconds):
+        index = 0
+        while index < len(LATENCY_BUCKETS) and seconds > LATENCY_BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.total += seconds
+        self.count += 1
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def quantile(self, q):
+        """
+        Yüzdelik değerin tahmini (içine düştüğü kovanın üst sınırı).
+        """
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else self.max
+        return self.max
+
+
+class Telemetry:
+    """
+    Süreç genelindeki telemetri kayıtları (thread-safe).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.latency = {}
+        self.requests = {}
+        self.errors = {}
+        self.retries = {}
+        self.limiter_wait = {}
+
+    def observe(self, method, seconds, error=None):
+        """
+        Bir çağrının süresini ve sonucunu kaydeder.
+
+        Args:
+            method: Client metodu
+            seconds: Çağrı süresi
+            error: Hata olduysa exception objesi
+        """
+        outcome = "error" if error is not None else "success"
+        with self._lock:
+            histogram = self.latency.get(method)
+            if histogram is None:
+                histogram = self.latency[method] = Histogram()
+            histogram.observe(seconds)
+            self.requests[(method, outcome)] = self.requests.get((method, outcome), 0) + 1
+            if error is not None:
+                key = (method, type(error).__name__)
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def record_retry(self, operation):
+        """
+        Bir işlemin tekrar denendiğini kaydeder (giriş tekrarı, yedek yönteme geçiş).
+        """
+        with self._lock:
+            self.retries[operation] = self.retries.get(operation, 0) + 1
+
+    def record_limiter_wait(self, account, seconds):
+        """
+        Hız sınırlayıcıda beklenen süreyi kaydeder.
+        """
+        with self._lock:
+            self.limiter_wait[account] = self.limiter_wait.get(account, 0.0) + seconds
+
+    def snapshot(self, reset=False):
+        """
+        Kayıtların süreçler arası taşınabilir kopyasını döndürür (alt süreçler ana sürece gönderir).
+
+        Args:
+            reset: Kopyalanan kayıtlar sıfırlansın mı (aynı kayıt iki kez gönderilmez)
+        """
+        with self._lock:
+            snapshot = {
+                "latency": self.latency,
+                "requests": self.requests,
+                "errors": self.errors,
+                "retries": self.retries,
+                "limiter_wait": self.limiter_wait,
+            }
+            if reset:
+                self.latency, self.requests, self.errors, self.retries, self.limiter_wait = {}, {}, {}, {}, {}
+            else:
+                snapshot = {name: dict(values) for name, values in snapshot.items()}
+            return snapshot
+
+    def merge(self, snapshot):
+        """
+        Başka bir sürecin `snapshot` kayıtlarını bu kayda ekler.
+        """
+        with self._lock:
+            for method, other in snapshot["latency"].items():
+                histogram = self.latency.get(method)
+                if histogram is None:
+                    histogram = self.latency[method] = Histogram()
+                histogram.counts = [a + b for a, b in zip(histogram.counts, other.counts)]
+                histogram.total += other.total
+                histogram.count += other.count
+                if other.min is not None:
+                    histogram.min = other.min if histogram.min is None else min(histogram.min, other.min)
+                    histogram.max = other.max if histogram.max is None else max(histogram.max, other.max)
+            for name in ("requests", "errors", "retries", "limiter_wait"):
+                counters = getattr(self, name)
+                for key, value in snapshot[name].items():
+                    counters[key] = counters.get(key, 0) + value
+
+    @property
+    def empty(self):
+        return not self.latency and not self.retries and not self.limiter_wait
+
+    def summary(self):
+        """
+        Çalıştırmanın JSON özetini döndürür.
+        """
+        with self._lock:
+            methods = {}
+            for method, histogram in sorted(self.latency.items()):
+                methods[method] = {
+                    "calls": histogram.count,
+                    "errors": self.requests.get((method, "error"), 0),
+                    "error_types": {
+                        error: count for (m, error), count in sorted(self.errors.items()) if m == method
+                    },
+                    "total_seconds": round(histogram.total, 3),
+                    "mean_seconds": round(histogram.total / histogram.count, 4),
+                    "min_seconds": round(histogram.min, 4),
+                    "max_seconds": round(histogram.max, 4),
+                    "p50_seconds": histogram.quantile(0.5),
+                    "p95_seconds": histogram.quantile(0.95),
+                }
+            finished_at = time.time()
+            return {
+                "script": os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else None,
+                "started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+                "finished_at": datetime.fromtimestamp(finished_at).isoformat(),
+                "duration_seconds": round(finished_at - self.started_at, 3),
+                "api_seconds": round(sum(h.total for h in self.latency.values()), 3),
+                "methods": methods,
+                "retries": dict(sorted(self.retries.items())),
+                "rate_limiter_wait_seconds": {
+                    account: round(seconds, 3) for account, seconds in sorted(self.limiter_wait.items())
+                },
+            }
+
+    def prometheus_text(self):
+        """
+        Kayıtları Prometheus metin formatında döndürür.
+        """
+        lines = []
+        with self._lock:
+            lines.append("# HELP instagram_api_request_duration_seconds Instagram Client çağrı süresi")
+            lines.append("# TYPE instagram_api_request_duration_seconds histogram")
+            for method, histogram in sorted(self.latency.items()):
+                label = _labels(method=method)
+                cumulative = 0
+                for bound, bucket_count in zip(LATENCY_BUCKETS, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f"instagram_api_request_duration_seconds_bucket{_labels(method=method, le=repr(bound))} {cumulative}")
+                lines.append(f"instagram_api_request_duration_seconds_bucket{_labels(method=method, le='+Inf')} {histogram.count}")
+                lines.append(f"instagram_api_request_duration_seconds_sum{label} {histogram.total:.6f}")
+                lines.append(f"instagram_api_request_duration_seconds_count{label} {histogram.count}")
+
+            lines.append("# HELP instagram_api_requests_total Instagram Client çağrı sayısı")
+            lines.append("# TYPE instagram_api_requests_total counter")
+            for (method, outcome), count in sorted(self.requests.items()):
+                lines.append(f"instagram_api_requests_total{_labels(method=method, outcome=outcome)} {count}")
+
+            lines.append("# HELP instagram_api_errors_total Hata türüne göre başarısız Client çağrısı sayısı")
+            lines.append("# TYPE instagram_api_errors_total counter")
+            for (method, error), count in sorted(self.errors.items()):
+                lines.append(f"instagram_api_errors_total{_labels(method=method, error=error)} {count}")
+
+            lines.append("# HELP instagram_retries_total Tekrar deneme sayısı")
+            lines.append("# TYPE instagram_retries_total counter")
+            for operation, count in sorted(self.retries.items()):
+                lines.append(f"instagram_retries_total{_labels(operation=operation)} {count}")
+
+            lines.append("# HELP instagram_rate_limiter_wait_seconds_total Hız sınırlayıcıda beklenen toplam süre")
+            lines.append("# TYPE instagram_rate_limiter_wait_seconds_total counter")
+            for account, seconds in sorted(self.limiter_wait.items()):
+                lines.append(f"instagram_rate_limiter_wait_seconds_total{_labels(account=account)} {seconds:.6f}")
+
+            lines.append("# HELP instagram_run_duration_seconds Son çalıştırmanın süresi")
+            lines.append("# TYPE instagram_run_duration_seconds gauge")
+            lines.append(f"instagram_run_duration_seconds {time.time() - self.started_at:.3f}")
+            lines.append("# HELP instagram_run_last_timestamp_seconds Son çalıştırmanın bitiş zamanı")
+            lines.append("# TYPE instagram_run_last_timestamp_seconds gauge")
+            lines.append(f"instagram_run_last_timestamp_seconds {time.time():.0f}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, prom_path=PROM_FILE, summary_path=SUMMARY_FILE):
+        """
+        Prometheus dosyasını ve JSON özetini yazar (atomik olarak).
+        """
+        try:
+            _write_atomic(prom_path, self.prometheus_text())
+            _write_atomic(summary_path, json.dumps(self.summary(), ensure_ascii=False, indent=2))
+        except Exception as e:
+            print(f"⚠ Telemetri yazılamadı: {str(e)[:80]}")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class InstrumentedClient:
+    """
+    Instagram `Client` sarmalayıcısı: ölçülen metodların süresini ve hatalarını kaydeder,
+    diğer tüm öznitelikleri olduğu gibi client'a iletir.
+
+    Sadece scriptlerin yaptığı çağrılar ölçülür; instagrapi'nin kendi içindeki çağrılar
+    (örn. user_medias -> user_medias_gql) iki kez sayılmaz.
+
+    `limiter` verilirse ağ isteği yapan her çağrı önce sınırlayıcıdan geçer ve sonucu
+    (başarı / kısıtlama) sınırlayıcıya bildirilir.
+
+    `on_login_required` verilirse bir çağrı LoginRequired ile başarısız olduğunda çağrılır; yeni
+    session ayarlarını döndürürse ayarlar client'a yüklenir ve çağrı bir kez tekrarlanır.
+    """
+
+    def __init__(self, client, telemetry=None, limiter=None, on_login_required=None):
+        object.__setattr__(self, "_client", client)
+        object.__setattr__(self, "_telemetry", telemetry or get_telemetry())
+        object.__setattr__(self, "_limiter", limiter)
+        object.__setattr__(self, "_on_login_required", on_login_required)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if not callable(attribute) or not (name in INSTRUMENTED_METHODS or name.startswith(INSTRUMENTED_PREFIXES)):
+            return attribute
+        telemetry = self._telemetry
+        limiter = None if name in LOCAL_METHODS else self._limiter
+        on_login_required = None if name in SESSION_METHODS else self._on_login_required
+
+        def call(*args, **kwargs):
+            if limiter is not None:
+                limiter.acquire()
+            started = time.perf_counter()
+            try:
+                result = attribute(*args, **kwargs)
+            except Exception as e:
+                telemetry.observe(name, time.perf_counter() - started, e)
+                if limiter is not None:
+                    limiter.record_error(e)
+                raise
+            telemetry.observe(name, time.perf_counter() - started)
+            if limiter is not None:
+                limiter.record_success()
+            return result
+
+        if on_login_required is None:
+            return call
+
+        def instrumented(*args, **kwargs):
+            try:
+                return call(*args, **kwargs)
+            except Exception as e:
+                if type(e).__name__ != "LoginRequired":
+                    raise
+                settings = on_login_required()
+                if settings is None:
+                    raise
+            self._client.set_settings(settings)
+            telemetry.record_retry("login_required")
+            return call(*args, **kwargs)
+
+        return instrumented
+
+    def __setattr__(self, name, value):
+        setattr(self._client, name, value)
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry():
+    """
+    Süreç genelindeki telemetri kaydını döndürür; ilk kullanımda çıkışta dışa aktarılmak üzere kaydedilir.
+    """
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = Telemetry()
+            atexit.register(_export_at_exit)
+        return _telemetry
+
+
+def _export_at_exit():
+    if _telemetry is not None and not _telemetry.empty:
+        _telemetry.export()
+
+
+def instrument_client(client, limiter=None, on_login_required=None):
+    """
+    Client'ı telemetri (ve varsa hız sınırlayıcı) sarmalayıcısıyla döndürür.
+    """
+    return InstrumentedClient(client, limiter=limiter, on_login_required=on_login_required)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Son çalıştırmanın telemetri özetini yazdırır")
+    parser.add_argument("summary", nargs="?", default=SUMMARY_FILE, help="JSON özet dosyası")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.summary):
+        print(f"⚠ '{args.summary}' bulunamadı")
+        return 1
+    with open(args.summary, "r", encoding="utf-8") as f:
+        summary = json.load(f)
+    print(f"{summary['script']}  {summary['started_at']}  süre: {summary['duration_seconds']} sn, API: {summary['api_seconds']} sn")
+    for method, stats in summary["methods"].items():
+        errors = ", ".join(f"{error}: {count}" for error, count in stats["error_types"].items())
+        print(f"  {method:<28} {stats['calls']:>5} çağrı  ort: {stats['mean_seconds']:.3f} sn  "
+              f"p95: {stats['p95_seconds']} sn  toplam: {stats['total_seconds']} sn" + (f"  hatalar: {errors}" if errors else ""))
+    for operation, count in summary["retries"].items():
+        print(f"  ↻ {operation}: {count} tekrar")
+    for account, seconds in summary["rate_limiter_wait_seconds"].items():
+        print(f"  ⏳ {account}: hız sınırında {seconds} sn beklendi")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
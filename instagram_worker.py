@@ -0,0 +1,456 @@
+"""
+Instagram Worker Servisi
+Giriş yapılmış client'ları sıcak tutan, sürekli çalışan bir süreç. İşler (link listesi veya
+hesap taraması) yerel HTTP API'si üzerinden alınır; her istekte yeni Python süreci, import
+ve giriş maliyeti ödenmez. Tek bir link için gecikme tek bir API isteğine iner.
+
+Varsayılan olarak sadece 127.0.0.1 dinlenir. INSTAGRAM_WORKER_TOKEN tanımlıysa istekler
+`Authorization: Bearer <token>` başlığı taşımalıdır.
+
+API:
+    POST /jobs                {"type": "links", "urls": [...]}  veya
+                              {"type": "account", "username": "...", "limit": 5}
+                              ?wait=1 ile iş bitene kadar bekler ve sonuçları döndürür
+    GET  /jobs/<id>           İşin durumu ve o ana kadarki sonuçlar
+    GET  /jobs/<id>/stream    Sonuçlar hazır oldukça NDJSON olarak akıtılır
+    GET  /status              Kuyruk derinliği, işlenen iş sayısı, hesaplar
+    GET  /metrics             Prometheus metinleri (telemetri + kuyruk)
+
+Kullanım:
+    python instagram_worker.py --port 8765 --workers 2
+    curl -s -X POST "http://127.0.0.1:8765/jobs?wait=1" -d '{"type": "links", "urls": ["https://www.instagram.com/p/DSSpIC8Ajje/"]}'
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import argparse
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qs
+
+DEFAULT_HOST = os.getenv("INSTAGRAM_WORKER_HOST", "127.0.0.1")
+DEFAULT_PORT = int(os.getenv("INSTAGRAM_WORKER_PORT", "8765"))
+DEFAULT_WORKERS = int(os.getenv("INSTAGRAM_WORKER_THREADS", "2"))
+WORKER_TOKEN = os.getenv("INSTAGRAM_WORKER_TOKEN")
+# Bitmiş işlerden bellekte tutulacak en fazla sayı
+MAX_FINISHED_JOBS = 1000
+MAX_URLS_PER_JOB = 500
+MAX_BODY_BYTES = 1024 * 1024
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+JOB_TYPES = ("links", "account")
+
+
+class Job:
+    """
+    Kuyruktaki bir iş; sonuçlar geldikçe eklenir, bekleyen akışlar uyandırılır.
+    """
+
+    def __init__(self, job_type, params):
+        self.id = uuid.uuid4().hex[:16]
+        self.type = job_type
+        self.params = params
+        self.status = JOB_QUEUED
+        self.results = []
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._condition = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+    def start(self):
+        with self._condition:
+            self.status = JOB_RUNNING
+            self.started_at = time.time()
+
+    def add_result(self, result):
+        with self._condition:
+            self.results.append(result)
+            self._condition.notify_all()
+
+    def finish(self, error=None):
+        with self._condition:
+            self.status = JOB_FAILED if error else JOB_DONE
+            self.error = error
+            self.finished_at = time.time()
+            self._condition.notify_all()
+
+    def wait(self, timeout=None):
+        """
+        İş bitene kadar bekler.
+
+        Returns:
+            bool: İş bittiyse True, süre dolduysa False
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self.finished, timeout)
+
+    def iter_results(self, timeout=None):
+        """
+        Sonuçları hazır oldukça döndürür; iş bitince durur.
+        """
+        index = 0
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self.results) > index or self.finished, timeout)
+                pending = self.results[index:]
+                finished = self.finished
+            for result in pending:
+                yield result
+            index += len(pending)
+            if finished and index >= len(self.results):
+                return
+
+    def to_dict(self, include_results=True):
+        with self._condition:
+            data = {
+                "id": self.id,
+                "type": self.type,
+                "status": self.status,
+                "error": self.error,
+                "created_at": datetime.fromtimestamp(self.created_at).isoformat(),
+                "started_at": datetime.fromtimestamp(self.started_at).isoformat() if self.started_at else None,
+                "finished_at": datetime.fromtimestamp(self.finished_at).isoformat() if self.finished_at else None,
+                "completed": len(self.results),
+            }
+            if include_results:
+                data["results"] = list(self.results)
+        return data
+
+
+class InstagramWorker:
+    """
+    İşleri sıcak client havuzuyla işleyen iş parçacıkları.
+
+    Args:
+        pool: Giriş yapılmış SessionPool
+        workers: Aynı anda işlenecek iş sayısı
+    """
+
+    def __init__(self, pool, workers=DEFAULT_WORKERS):
+        self.pool = pool
+        self.started_at = time.time()
+        self._queue = queue.Queue()
+        self._jobs = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._threads = [
+            threading.Thread(target=self._run, name=f"instagram-worker-{i + 1}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, job_type, params):
+        """
+        İşi doğrular ve kuyruğa ekler.
+
+        Returns:
+            Job: Kuyruğa eklenen iş
+        """
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"Bilinmeyen iş türü: {job_type} ({', '.join(JOB_TYPES)})")
+        if job_type == "links":
+            urls = params.get("urls")
+            if isinstance(urls, str):
+                urls = [urls]
+            if not urls or not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+                raise ValueError("'urls' bir link listesi olmalıdır")
+            if len(urls) > MAX_URLS_PER_JOB:
+                raise ValueError(f"Bir işte en fazla {MAX_URLS_PER_JOB} link olabilir")
+            from instagram_id_cache import dedupe_urls
+            # Aynı gönderinin farklı linkleri bir kez çekilir; farklı işlerdeki eşzamanlı çekimler
+            # get_media_from_link içinde birleştirilir
+            params = {"urls": dedupe_urls(urls)}
+        else:
+            username = params.get("username")
+            if not username or not isinstance(username, str):
+                raise ValueError("'username' gereklidir")
+            try:
+                limit = int(params.get("limit", 5))
+            except (TypeError, ValueError):
+                limit = 0
+            if limit < 1:
+                raise ValueError("'limit' pozitif bir tam sayı olmalıdır")
+            params = {"username": username, "limit": limit}
+
+        job = Job(job_type, params)
+        with self._jobs_lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._queue.put(job)
+        return job
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def status(self):
+        with self._jobs_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "workers": len(self._threads),
+                "accounts": self.pool.usernames,
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+            }
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            with self._jobs_lock:
+                self._in_flight += 1
+            job.start()
+            try:
+                if job.type == "links":
+                    self._run_links(job)
+                else:
+                    self._run_account(job)
+                job.finish()
+            except Exception as e:
+                print(f"✗ İş {job.id} başarısız: {str(e)[:150]}")
+                job.finish(str(e)[:200])
+            finally:
+                with self._jobs_lock:
+                    self._in_flight -= 1
+                    if job.status == JOB_FAILED:
+                        self._failed += 1
+                    else:
+                        self._completed += 1
+                self._queue.task_done()
+
+    def _run_links(self, job):
+        from instagram_link_cekici import group_by_owner, process_link
+        from instagram_metrics_store import record_snapshots
+
+        urls = job.params["urls"]
+        for i, url in enumerate(urls, 1):
+            job.add_result(process_link(self.pool, url, i, len(urls)))
+        for owner, posts in group_by_owner(job.results, os.getenv("INSTAGRAM_USERNAME", "arhavalcom")).items():
+            record_snapshots(owner, posts)
+
+    def _run_account(self, job):
+        from instagram_insights import fetch_insights_batch
+        from instagram_metrics_store import record_snapshots
+        from instagram_stats import extract_media_stats, get_user_media
+
+        username = job.params["username"]
+        # Havuzdaki (kendi) hesaplar kendi client'ıyla taranır; insights sadece onlar için alınabilir
+        own_client = self.pool.client_for(username)
+        cl = own_client if own_client is not None else self.pool.next_client()[1]
+        media_list = get_user_media(cl, username, limit=job.params["limit"])
+        insights = {}
+        if own_client is not None:
+            insights = fetch_insights_batch(cl, username, [media.pk for media in media_list])
+        for media in media_list:
+            try:
+                job.add_result(extract_media_stats(cl, media, insights.get(media.pk)).to_dict())
+            except Exception as e:
+                job.add_result({"shortcode": getattr(media, "code", None), "error": str(e)[:200]})
+        record_snapshots(username, job.results)
+
+    def prometheus_text(self):
+        status = self.status()
+        lines = [
+            "# HELP instagram_worker_queue_depth Kuyrukta bekleyen iş sayısı",
+            "# TYPE instagram_worker_queue_depth gauge",
+            f"instagram_worker_queue_depth {status['queue_depth']}",
+            "# HELP instagram_worker_in_flight İşlenmekte olan iş sayısı",
+            "# TYPE instagram_worker_in_flight gauge",
+            f"instagram_worker_in_flight {status['in_flight']}",
+            "# HELP instagram_worker_jobs_total Biten iş sayısı",
+            "# TYPE instagram_worker_jobs_total counter",
+            f'instagram_worker_jobs_total{{status="done"}} {status["completed"]}',
+            f'instagram_worker_jobs_total{{status="failed"}} {status["failed"]}',
+        ]
+        return "\n".join(lines) + "\n"
+
+    def stop(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+
+class WorkerRequestHandler:
+    """
+    Yerel iş API'si. `self.server.worker` üzerinden InstagramWorker'a erişir.
+
+    http.server açılışı yavaşlattığı için BaseHTTPRequestHandler ile main'de birleştirilir.
+    """
+
+    server_version = "InstagramWorker/1.0"
+
+    def _authorized(self):
+        if not WORKER_TOKEN:
+            return True
+        if self.headers.get("Authorization") == f"Bearer {WORKER_TOKEN}":
+            return True
+        self._send_json(401, {"error": "Yetkisiz istek"})
+        return False
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_text(self, status, text):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, job):
+        # Akış bağlantı kapanınca biter (HTTP/1.0), böylece istemci satır satır okuyabilir
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.end_headers()
+        for result in job.iter_results():
+            self.wfile.write((json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8"))
+            self.wfile.flush()
+        summary = job.to_dict(include_results=False)
+        self.wfile.write((json.dumps({"job": summary}, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        parts = [part for part in urlsplit(self.path).path.split("/") if part]
+        worker = self.server.worker
+        if parts == ["status"]:
+            self._send_json(200, worker.status())
+        elif parts == ["metrics"]:
+            from instagram_telemetry import get_telemetry
+            self._send_text(200, get_telemetry().prometheus_text() + worker.prometheus_text())
+        elif len(parts) in (2, 3) and parts[0] == "jobs":
+            job = worker.get(parts[1])
+            if job is None:
+                self._send_json(404, {"error": "İş bulunamadı"})
+            elif len(parts) == 3 and parts[2] == "stream":
+                self._stream(job)
+            elif len(parts) == 2:
+                self._send_json(200, job.to_dict())
+            else:
+                self._send_json(404, {"error": "Bulunamadı"})
+        else:
+            self._send_json(404, {"error": "Bulunamadı"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        url = urlsplit(self.path)
+        if url.path.rstrip("/") != "/jobs":
+            self._send_json(404, {"error": "Bulunamadı"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {"error": "İstek çok büyük"})
+            return
+        query = parse_qs(url.query)
+        try:
+            timeout = float(query.get("timeout", ["300"])[0])
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            job = self.server.worker.submit(payload.get("type", "links"), payload)
+        except (ValueError, TypeError, AttributeError) as e:
+            self._send_json(400, {"error": str(e)[:200]})
+            return
+
+        if query.get("wait", ["0"])[0] not in ("0", "false", ""):
+            job.wait(timeout)
+            self._send_json(200 if job.finished else 202, job.to_dict())
+        else:
+            self._send_json(202, job.to_dict(include_results=False))
+
+    def log_message(self, format, *args):
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {self.address_string()} {format % args}")
+
+
+def parse_args(argv=None):
+    """
+    Komut satırı argümanlarını okur.
+    """
+    parser = argparse.ArgumentParser(description="Giriş yapılmış client'ları sıcak tutan Instagram worker servisi.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Dinlenecek adres (varsayılan: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Dinlenecek port (varsayılan: 8765)")
+    parser.add_argument(
+        "--workers", type=int, default=DEFAULT_WORKERS,
+        help="Aynı anda işlenecek iş sayısı (varsayılan: 2, INSTAGRAM_WORKER_THREADS)"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=None,
+        help="Hesap başına en yüksek istek hızı, istek/sn (varsayılan: INSTAGRAM_RATE_MAX)"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Ana fonksiyon: hesaplara bir kez giriş yapar ve API'yi dinler.
+    """
+    args = parse_args(argv)
+    from dotenv import load_dotenv
+    load_dotenv()
+    from instagram_rate_limiter import set_max_rate
+    from instagram_session import SessionPool
+
+    if args.rate is not None:
+        set_max_rate(args.rate)
+    print("=" * 60)
+    print("Instagram Worker Servisi")
+    print("=" * 60)
+    try:
+        pool = SessionPool.from_env().login_all()
+    except Exception as e:
+        print(f"\n✗ HATA: {str(e)}")
+        return 1
+
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    handler = type("Handler", (WorkerRequestHandler, BaseHTTPRequestHandler), {})
+    worker = InstagramWorker(pool, workers=args.workers)
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    server.worker = worker
+    print(f"✓ http://{args.host}:{args.port} dinleniyor (hesap: {', '.join(pool.usernames)}, eşzamanlı iş: {args.workers})")
+    if args.host not in ("127.0.0.1", "localhost", "::1") and not WORKER_TOKEN:
+        print("⚠ Yerel olmayan bir adres dinleniyor ama INSTAGRAM_WORKER_TOKEN tanımlı değil!")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n\nServis durduruluyor...")
+    finally:
+        server.server_close()
+        worker.stop()
+        pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,7 @@
+-- Migration: Index Instagram shortcodes extracted from "Content".url
+-- instagram_db_writer.py matches staged posts to existing content by this exact expression
+-- Run this SQL directly in Supabase SQL Editor
+
+CREATE INDEX IF NOT EXISTS "Content_instagram_shortcode_idx"
+    ON "Content" ((substring(url from 'instagram\.com/(?:p|reel|tv)/([A-Za-z0-9_-]+)')))
+    WHERE platform = 'Instagram';
@@ -0,0 +1,38 @@
+-- Migration: Add InstagramCreatorRollup and InstagramWeeklyRollup tables
+-- Precomputed Instagram engagement rollups written by instagram_analytics.py --db
+-- Run this SQL directly in Supabase SQL Editor
+
+CREATE TABLE IF NOT EXISTS "InstagramCreatorRollup" (
+    "username" TEXT NOT NULL,
+    "creatorId" TEXT,
+    "posts" INTEGER NOT NULL,
+    "totalEngagement" INTEGER NOT NULL,
+    "meanEngagement" DOUBLE PRECISION NOT NULL,
+    "medianEngagement" DOUBLE PRECISION NOT NULL,
+    "p90Engagement" DOUBLE PRECISION NOT NULL,
+    "meanEngagementRate" DOUBLE PRECISION,
+    "meanVelocity" DOUBLE PRECISION,
+    "topPosts" JSONB NOT NULL,
+    "fastestPosts" JSONB NOT NULL,
+    "computedAt" TIMESTAMP(6) NOT NULL,
+    CONSTRAINT "InstagramCreatorRollup_pkey" PRIMARY KEY ("username")
+);
+
+CREATE INDEX IF NOT EXISTS "InstagramCreatorRollup_creatorId_idx" ON "InstagramCreatorRollup"("creatorId");
+
+CREATE TABLE IF NOT EXISTS "InstagramWeeklyRollup" (
+    "username" TEXT NOT NULL,
+    "week" TEXT NOT NULL,
+    "posts" INTEGER NOT NULL,
+    "totalEngagement" INTEGER NOT NULL,
+    "meanEngagement" DOUBLE PRECISION NOT NULL,
+    "rollingMeanEngagement" DOUBLE PRECISION NOT NULL,
+    "medianEngagement" DOUBLE PRECISION NOT NULL,
+    "p90Engagement" DOUBLE PRECISION NOT NULL,
+    "meanEngagementRate" DOUBLE PRECISION,
+    "topPosts" JSONB NOT NULL,
+    "computedAt" TIMESTAMP(6) NOT NULL,
+    CONSTRAINT "InstagramWeeklyRollup_pkey" PRIMARY KEY ("username", "week")
+);
+
+CREATE INDEX IF NOT EXISTS "InstagramWeeklyRollup_week_idx" ON "InstagramWeeklyRollup"("week");